@@ -5,21 +5,31 @@ Role based access control implemented through dependencies...
 SQLModel Session passed as dependency
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response, Query, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
+from fastapi_pagination import Page, Params
 from uuid import UUID
 import os
-import shutil
-from app.db.session import db_session_manager
+import logging
+from app.db.session import db_session_manager, async_db_session_manager
 from app.auth.deps import *
 from app.models.user import User
 from app.models.job import Job
 from app.core.enum import UserRole
-from app.schemas.application import ApplicationResponse
+from app.schemas.application import ApplicationResponse, ApplicationBulkStatusUpdate, ApplicationBulkStatusResult
 from app.crud.application import *
-from app.crud.job import get_job_by_id
-from app.crud.company import get_company_by_id
+from app.crud.job import get_job_by_id, get_job_by_id_async
+from app.crud.company import get_company_by_id_async
 from app.core.config import Config
+from app.core.upload import validate_upload
+from app.core.resume_store import claim_resume_blob, store_resume
+from app.core.storage import get_storage
+from app.core.download import resume_response
+from app.core.export import ExportFormat, MEDIA_TYPES, export_stream
+from app.models.application import Application
+
+logger = logging.getLogger(__name__)
 
 # router instance for the application API endpoints.
 router = APIRouter(prefix="/applications", tags=["Applications"])
@@ -34,80 +44,120 @@ def create_application_api(
     session: Session = Depends(db_session_manager.get_session),
 ):
     if is_candidate(current_user): # only a user who is candidate can apply for any job.
-        job = get_job_by_id(job_id, session)
-        if not job:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
-        for application in job.applications:
-            if current_user.id == application.user_id: # prevent duplicate applications from same user.
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User already applied...")
-        company = get_company_by_id(job.company_id, session)
-        if not company:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Company not found")
-        uploads_dir = Config.UPLOAD_RESUME_DIR
-        os.makedirs(uploads_dir, exist_ok=True)
-        resume_filename = f"{current_user.id}_{job_id}_{resume.filename}" # generating resume filename
-        resume_path = os.path.join(uploads_dir, resume_filename) # generating storage path
-        with open(resume_path, "wb") as buffer:
-            shutil.copyfileobj(resume.file, buffer) # store actual resume
-        application_data = ApplicationCreate(message=message)
-        application = create_application(application_data, current_user.id, job_id, resume_filename, resume_path, session) # crete application object
+        validate_upload(resume) # content type and size checked before any database work
+        resume_filename = f"{current_user.id}_{job_id}_{os.path.basename(resume.filename or 'resume')}" # generating resume filename, client paths stripped
+        stored = store_resume(resume) # chunked, atomic write of the resume, stored once per distinct content (unreferenced blobs are swept)
+        resume_path = claim_resume_blob(resume, stored, session).path # a re-used blob is kept from the sweep until the commit below
+        try:
+            application = apply_to_job(ApplicationCreate(message=message), current_user.id, job_id, resume_filename, resume_path, session) # single INSERT and commit
+        except DuplicateApplicationError: # prevent duplicate applications from same user.
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User already applied...")
         if not application:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to create application")
-        added_to_job= add_application_to_job(application.id, job_id, session) # link application to the job
-        if not added_to_job:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to link application to job")
-        added_to_user= add_application_to_user(application.id, current_user.id, session) # link application to the user
-        if not added_to_user:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to link application to user")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
         return application
     else:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only candidate can create application...")
 
-# Application access endpoint
-@router.get("/{application_id}", response_model=ApplicationResponse, status_code=status.HTTP_200_OK)
-def get_application_api(application_id: UUID, current_user: User = Depends(get_current_user), session: Session = Depends(db_session_manager.get_session)):
-    application = get_application_by_id(application_id, session)
-    if not application:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Application not found")
+# Raise unless the user may access the application: the candidate itself, a recruiter of the job's company, or an admin
+def check_application_access(application: ApplicationResponse | Application, current_user: User | TokenClaims, session: Session):
     if is_candidate(current_user):
-        print("Is candidate, checking ID...")
         if application.user_id != current_user.id:  # allow the user to access its own application only.
-            print("ID mismatch of candidate...")
+            logger.debug("Candidate denied access to another user's application", extra={"application_id": str(application.id)})
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="A candidate can only access its own application...")
-        return application
+        return
     if is_recruiter(current_user): # allow recruiter access
-        print("Is recruiter.... Getting Job...")
         job=get_job_by_id(application.job_id, session)
-        print("Checking company ID...")
-        print("User organization: ", current_user.current_organization)
-        print("Company ID: ", job.company_id)
         if current_user.current_organization != job.company_id:
-            print("Company ID mismatch...")
+            logger.debug("Recruiter denied access to another organization's application", extra={"application_id": str(application.id), "organization": str(current_user.current_organization), "company_id": str(job.company_id)})
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="A recruiter can only view applications of its own organization...") 
-        return application
-    if is_admin(current_user):
-        print("Is Admin... sending application...") # allow admin access
-        return application
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only rcruiter, the candidate itself or admin can retrieve application")
+        return
+    if is_admin(current_user): # allow admin access
+        return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only rcruiter, the candidate itself or admin can retrieve application")
+
+# Application access endpoint
+@router.get("/{application_id}", response_model=ApplicationResponse, status_code=status.HTTP_200_OK)
+def get_application_api(application_id: UUID, current_user: TokenClaims = Depends(get_token_claims), session: Session = Depends(db_session_manager.get_session)):
+    application = get_application_by_id(application_id, session)
+    if not application:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Application not found")
+    check_application_access(application, current_user, session)
+    return application
 
-@router.get("/jobs/{job_id}", response_model=list[ApplicationResponse], status_code=status.HTTP_200_OK)
-def get_applications_by_job_api(job_id: UUID, current_user: User = Depends(get_current_user), session: Session = Depends(db_session_manager.get_session)):
+# Resume download endpoint, same access rules as the application. Supports Range, If-None-Match (ETag) and client caching
+@router.get("/{application_id}/resume", status_code=status.HTTP_200_OK, response_class=Response)
+def download_resume_api(application_id: UUID, request: Request, current_user: TokenClaims = Depends(get_token_claims), session: Session = Depends(db_session_manager.get_session)):
+    application = get_application_model_instance(application_id, session)
+    if not application:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Application not found")
+    check_application_access(application, current_user, session)
+    return resume_response(get_storage(), application.resume_path, application.resume_filename, request.headers)
+
+# Applications of a job, paginated in the database (page/size, bounded size), filterable by status and sortable by applied_at or updated_at
+@router.get("/jobs/{job_id}", response_model=Page[ApplicationResponse], status_code=status.HTTP_200_OK)
+def get_applications_by_job_api(
+    job_id: UUID,
+    status_filter: Optional[ApplicationStatus] = Query(None, alias="status"),
+    order_by: str = Query("applied_at", pattern="^(applied_at|updated_at)$"),
+    order_type: str = Query("desc", pattern="^(asc|desc)$"),
+    params: Params = Depends(),
+    current_user: TokenClaims = Depends(get_token_claims),
+    session: Session = Depends(db_session_manager.get_session),
+):
     if is_recruiter(current_user) or is_admin(current_user):
         job = get_job_by_id(job_id, session)
         if not job:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
-        applications = get_application_by_job_id(job_id, session)
+        applications = get_application_by_job_id(job_id, session, status=status_filter, order_by=order_by, order_type=order_type, params=params)
         return applications
     else:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only recruiters or admin can view applications for this job")
 
-# Access application through user id
-@router.get("/users/{user_id}", response_model=list[ApplicationResponse], status_code=status.HTTP_200_OK)
-def get_applications_by_user_api(user_id: UUID, current_user: User = Depends(get_current_user), session: Session = Depends(db_session_manager.get_session)):
+# streamed export response of the applications of a job or company. The request session stays open until the response is sent (dependency exit runs after the stream)
+def _applications_export_response(session: AsyncSession, export_format: ExportFormat, filename: str, job_id: Optional[UUID] = None, company_id: Optional[UUID] = None) -> StreamingResponse:
+    records = stream_applications_async(session, job_id=job_id, company_id=company_id)
+    fields = list(ApplicationResponse.model_fields)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'}
+    return StreamingResponse(export_stream(records, export_format, fields), media_type=MEDIA_TYPES[export_format], headers=headers)
+
+# Export of all the applications of a job as NDJSON or CSV, streamed (constant memory whatever the number of applicants). Recruiters of the job's company and admins only.
+@router.get("/jobs/{job_id}/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+async def export_applications_by_job_api(job_id: UUID, format: ExportFormat = Query(ExportFormat.NDJSON), current_user: User = Depends(get_current_user_async), session: AsyncSession = Depends(async_db_session_manager.get_session)):
+    if not is_recruiter(current_user) and not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only recruiters or admin can export applications")
+    job = await get_job_by_id_async(job_id, session)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if is_recruiter(current_user) and current_user.current_organization != job.company_id: # prevent other company's recruiters from exporting this job's applications
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="A recruiter can only export applications of its own organization...")
+    return _applications_export_response(session, format, f"applications-{job_id}", job_id=job_id)
+
+# Export of the applications of every job of a company as NDJSON or CSV, streamed. Recruiters of the company and admins only.
+@router.get("/companies/{company_id}/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+async def export_applications_by_company_api(company_id: UUID, format: ExportFormat = Query(ExportFormat.NDJSON), current_user: User = Depends(get_current_user_async), session: AsyncSession = Depends(async_db_session_manager.get_session)):
+    if not is_recruiter(current_user) and not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only recruiters or admin can export applications")
+    if is_recruiter(current_user) and current_user.current_organization != company_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="A recruiter can only export applications of its own organization...")
+    company = await get_company_by_id_async(company_id, session)
+    if not company:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Company not found")
+    return _applications_export_response(session, format, f"applications-company-{company_id}", company_id=company_id)
+
+# Access application through user id, paginated, filterable and sortable as the applications of a job
+@router.get("/users/{user_id}", response_model=Page[ApplicationResponse], status_code=status.HTTP_200_OK)
+def get_applications_by_user_api(
+    user_id: UUID,
+    status_filter: Optional[ApplicationStatus] = Query(None, alias="status"),
+    order_by: str = Query("applied_at", pattern="^(applied_at|updated_at)$"),
+    order_type: str = Query("desc", pattern="^(asc|desc)$"),
+    params: Params = Depends(),
+    current_user: TokenClaims = Depends(get_token_claims),
+    session: Session = Depends(db_session_manager.get_session),
+):
     if not is_recruiter(current_user) and not is_admin(current_user): # prevent candidates from accessing created applications
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
-    applications = get_application_by_user_id(user_id, session)
+    applications = get_application_by_user_id(user_id, session, status=status_filter, order_by=order_by, order_type=order_type, params=params)
     return applications
 
 # Application Update logic (Only status update happens)
@@ -126,6 +176,22 @@ def update_application_status_api(application_id: UUID, new_status: ApplicationS
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to update application")
     return updated_application
 
+# Bulk application status update, for recruiters of the job's company and admins. Authorized once for the job, all applications updated by one statement.
+# Ids unknown or belonging to another job are reported in not_found and left untouched.
+@router.patch("/jobs/{job_id}/status", response_model=ApplicationBulkStatusResult, status_code=status.HTTP_200_OK)
+def update_application_status_bulk_api(job_id: UUID, update: ApplicationBulkStatusUpdate, current_user: User = Depends(get_current_user), session: Session = Depends(db_session_manager.get_session)):
+    if not is_recruiter(current_user) and not is_admin(current_user): # allow only recruiters and admin to update application status
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only recruiters can update application status")
+    job = get_job_by_id(job_id, session)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if is_recruiter(current_user) and current_user.current_organization != job.company_id: # prevent other company's recruiters from updating this job's applications
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="A recruiter can only update applications of its own organization...")
+    application_ids = list(dict.fromkeys(update.application_ids)) # duplicates dropped, request order kept
+    updated_ids = set(update_application_status_bulk(job_id, application_ids, update.status, session))
+    logger.info("Bulk application status update", extra={"job_id": str(job_id), "status": update.status.value, "requested": len(application_ids), "updated": len(updated_ids)})
+    return ApplicationBulkStatusResult(job_id=job_id, status=update.status, updated=len(updated_ids), not_found=[application_id for application_id in application_ids if application_id not in updated_ids])
+
 # Application Deletion Endpoint
 @router.delete("/{application_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_application_api(application_id: UUID, current_user: User = Depends(get_current_user), session: Session = Depends(db_session_manager.get_session)):
@@ -3,13 +3,15 @@ APIs to handle CRUD for companies on the portal.
 
 Only Admin and Recruiter allowed to access them.
 Role based access control implemented through dependencies...
-SQLModel Session passed as dependency
+SQLModel Session passed as dependency, public read endpoints run on the async request path (AsyncSession)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session
+from typing import Optional
+from fastapi_pagination import Page, Params
 from uuid import UUID
-from app.db.session import db_session_manager
+from app.db.session import db_session_manager, async_db_session_manager
 from app.auth.deps import *
 from app.models.user import User
 from app.core.enum import UserRole
@@ -33,8 +35,8 @@ def create_company_api(company: CompanyCreate, current_user: User = Depends(get_
 
 # Retrive company through id, all users allowed to see companies
 @router.get("/{company_id}", response_model=CompanyResponse, status_code=status.HTTP_200_OK)
-def get_company_api(company_id: UUID, session: Session = Depends(db_session_manager.get_session)):
-    company = get_company_by_id(company_id, session)
+async def get_company_api(company_id: UUID, session: AsyncSession = Depends(async_db_session_manager.get_session)):
+    company = await get_company_by_id_async(company_id, session)
     if not company:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Company not found")
     return company
@@ -61,8 +63,16 @@ def delete_company_api(company_id: UUID, current_user: User = Depends(get_curren
         "success_status": success
     }
 
-# get list of companies, endpoint open to all kinds of users]
-@router.get("/", response_model=list[CompanyResponse], status_code=status.HTTP_200_OK)
-def list_companies_api(session: Session = Depends(db_session_manager.get_session)):
-    companies = list_companies(session)
+# get a page of companies, endpoint open to all kinds of users]
+# filtered by domain (exact, case insensitive) and location (partial match), sorted by name or company_size, paginated in the database
+@router.get("/", response_model=Page[CompanyResponse], status_code=status.HTTP_200_OK)
+async def list_companies_api(
+    session: AsyncSession = Depends(async_db_session_manager.get_session),
+    domain: Optional[str] = None,
+    location: Optional[str] = None,
+    order_by: str = Query("name", pattern="^(name|company_size)$"),
+    order_type: str = Query("asc", pattern="^(asc|desc)$"),
+    params: Params = Depends(),
+):
+    companies = await list_companies_async(session, domain=domain, location=location, order_by=order_by, order_type=order_type, params=params)
     return companies
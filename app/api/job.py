@@ -2,23 +2,31 @@
 API endpoints for crud operations on jobs.
 Creation, updation and deletion of jobs is restricted to just recruiters and endpoints. However, all 3 user types can access company retrieval.
 Role based access control implemented through dependencies...
-SQLModel Session passed as dependency
+SQLModel Session passed as dependency, public read endpoints run on the async request path (AsyncSession)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import Session
 from uuid import UUID
-from fastapi_pagination import Page, paginate
-from app.db.session import db_session_manager
+from typing import Union
+from fastapi_pagination import Page, Params
+from app.db.session import db_session_manager, async_db_session_manager
 from app.auth.deps import *
 from app.models.user import User
 from app.core.enum import UserRole
-from app.schemas.job import JobCreate, JobUpdate, JobResponse
+from app.core.config import Config
+from app.core.bulk import TRUNCATED, iter_request_records
+from app.schemas.job import JobCreate, JobUpdate, JobResponse, JobCursorPage, TagFacet, JobBulkResult, JobBulkResponse
 from app.crud.job import *
 from app.crud.company import *
 
 router = APIRouter(prefix="/jobs", tags=["Jobs"]) # router creation for jobs APIs
 
+logger = logging.getLogger(__name__)
+
 # Job Creation API
 @router.post("/", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
 def create_job_api(job: JobCreate, current_user: User = Depends(get_current_user), session: Session = Depends(db_session_manager.get_session)):
@@ -30,43 +38,172 @@ def create_job_api(job: JobCreate, current_user: User = Depends(get_current_user
     created_job = create_job(job, company.id, session) # call to business logic for job creation
     return created_job
 
-# Job retrieval API by ID
+# per-row error messages of a failed JobCreate validation
+def _validation_errors(error: ValidationError) -> list[str]:
+    return [f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}" for detail in error.errors()]
+
+# Bulk job creation API, for recruiters and admins. Body is a JSON array of jobs or NDJSON (Content-Type application/x-ndjson, one job per line, streamed).
+# Valid rows are inserted JOB_BULK_BATCH_SIZE at a time, one multi-row INSERT and one transaction per batch. Invalid rows are reported and skipped.
+# Batches are committed independently: a failing batch does not roll back the batches before it.
+# A JSON array of more than JOB_BULK_MAX_ROWS rows is rejected with 413 before any insert. An NDJSON stream is read up to JOB_BULK_MAX_ROWS
+# rows, those are imported and the response is marked truncated: the client resumes from the first row without a result.
+@router.post("/bulk", response_model=JobBulkResponse, status_code=status.HTTP_200_OK)
+async def create_jobs_bulk_api(request: Request, current_user: User = Depends(get_current_user_async), session: AsyncSession = Depends(async_db_session_manager.get_session)):
+    if not is_recruiter(current_user) and not is_admin(current_user): # only recruiter and admin can create jobs
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only recruiters can create job postings")
+    company = await get_company_by_id_async(current_user.current_organization, session) # looked up once for the whole import
+    if not company:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Company not found")
+    results: list[JobBulkResult] = []
+    batch: list[tuple[int, JobCreate]] = []
+
+    async def flush():
+        try:
+            ids = await create_jobs_bulk_async([job for _, job in batch], company.id, session)
+        except SQLAlchemyError as error:
+            await session.rollback()
+            logger.warning("Bulk job batch failed", extra={"company_id": str(company.id), "rows": len(batch), "error": str(error.__cause__ or error)})
+            results.extend(JobBulkResult(index=index, status="error", errors=["database error, batch not inserted"]) for index, _ in batch)
+        else:
+            results.extend(JobBulkResult(index=index, status="created", id=job_id) for (index, _), job_id in zip(batch, ids))
+        batch.clear()
+
+    truncated = False
+    async for index, record in iter_request_records(request, Config.JOB_BULK_MAX_ROWS, Config.JOB_BULK_MAX_LINE_BYTES):
+        if record is TRUNCATED:
+            truncated = True
+            break
+        if isinstance(record, ValueError): # NDJSON line that is not JSON
+            results.append(JobBulkResult(index=index, status="error", errors=[f"row: invalid JSON ({record})"]))
+            continue
+        try:
+            batch.append((index, JobCreate.model_validate(record)))
+        except ValidationError as error:
+            results.append(JobBulkResult(index=index, status="error", errors=_validation_errors(error)))
+            continue
+        if len(batch) >= Config.JOB_BULK_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    results.sort(key=lambda result: result.index) # valid rows are reported when their batch is flushed, back to request order
+    created = sum(result.status == "created" for result in results)
+    logger.info("Bulk job import done", extra={"company_id": str(company.id), "jobs_created": created, "jobs_failed": len(results) - created, "truncated": truncated})
+    return JobBulkResponse(created=created, failed=len(results) - created, truncated=truncated, results=results)
+
+# Tag facets API, per-tag counts of the jobs matching the same search and filters as the listing. Public.
+# Declared before /{job_id} so that "tags" is not parsed as a job id.
+@router.get("/tags", response_model=list[TagFacet], status_code=status.HTTP_200_OK)
+async def list_job_tag_facets_api(
+    session: AsyncSession = Depends(async_db_session_manager.get_session),
+    search_query: Optional[str] = Query(None),
+    location: Optional[str] = None,
+    mode: Optional[ModeOfWork] = None,
+    employment_type: Optional[EmploymentType] = None,
+    tags: Optional[list[str]] = Query(None),
+    tag_match: str = Query("all", pattern="^(all|any)$"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    return await count_jobs_by_tag_async(
+        session,
+        search_query=search_query,
+        location=location,
+        mode=mode,
+        employment_type=employment_type,
+        tags=tags,
+        tag_match=tag_match,
+        limit=limit,
+    ) # call to business logic, counting done in the database
+
+# whether applications are embedded (include=applications): 403 unless the caller is an admin or a recruiter, recruiters only see the
+# applications of their own company's jobs (checked per job by the callers)
+def _include_applications(include: Optional[str], current_user: Optional[TokenClaims]) -> bool:
+    if include != "applications":
+        return False
+    if current_user is None or not (is_admin(current_user) or is_recruiter(current_user)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins and recruiters of the company can see applications")
+    return True
+
+# leave out the applications of jobs of other companies than the recruiter's, in a listing
+def _hide_foreign_applications(jobs: list[JobResponse], current_user: Optional[TokenClaims]):
+    if current_user is None or is_admin(current_user):
+        return
+    for job in jobs:
+        if job.company_id != current_user.current_organization:
+            job.applications = []
+
+# Job retrieval API by ID, public. Applications are embedded only with include=applications, for admins and recruiters of the job's company
 @router.get("/{job_id}", response_model=JobResponse, status_code=status.HTTP_200_OK)
-def get_job_api(job_id: UUID, session: Session = Depends(db_session_manager.get_session)):
-    job = get_job_by_id(job_id, session)
+async def get_job_api(job_id: UUID, include: Optional[str] = Query(None, pattern="^applications$"), current_user: Optional[TokenClaims] = Depends(get_optional_token_claims), session: AsyncSession = Depends(async_db_session_manager.get_session)):
+    include_applications = _include_applications(include, current_user)
+    job = await get_job_by_id_async(job_id, session, include_applications=include_applications)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if include_applications and not is_admin(current_user) and job.company_id != current_user.current_organization:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins and recruiters of the company can see applications")
     return job
 
-# API to list all jobs, list can be filtered by loction, mode, employment type, tags and searched by title and description (case insensitive search). Ordering by date of job creation is also applied.
+# API to list all jobs, list can be filtered by loction, mode, employment type, tags and searched by title, description and tags (full-text, case insensitive search). Ordering by date of job creation is also applied, order_by=relevance orders search results by rank instead.
 # Use of query and search params.
-# Paginated response model.
-@router.get("/", response_model=Page[JobResponse], status_code=status.HTTP_200_OK)
-def list_jobs_api(
-    session: Session = Depends(db_session_manager.get_session),
+# tag_match=all (default) keeps jobs having every tag passed, tag_match=any keeps jobs having at least one of them.
+# Applications of the listed jobs are left out unless include=applications is passed by an admin, or by a recruiter (applications of its company's jobs only).
+# Paginated response model. pagination=offset (default) gives page/size pages, pagination=cursor gives keyset pages navigated through next/previous cursors.
+@router.get("/", response_model=Union[Page[JobResponse], JobCursorPage], status_code=status.HTTP_200_OK)
+async def list_jobs_api(
+    session: AsyncSession = Depends(async_db_session_manager.get_session),
     search_query: Optional[str] = Query(None),
     location: Optional[str] = None,
     mode: Optional[ModeOfWork] = None,
     employment_type: Optional[EmploymentType] = None,
     tags: Optional[list[str]] = Query(None),
+    tag_match: str = Query("all", pattern="^(all|any)$"),
     order_by: str = "posted_at",
     order_type : str = "desc",
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = None,
+    include: Optional[str] = Query(None, pattern="^applications$"),
+    current_user: Optional[TokenClaims] = Depends(get_optional_token_claims),
+    params: Params = Depends(),
 ):
-    jobs = list_jobs(
+    include_applications = _include_applications(include, current_user)
+    if pagination == "cursor":
+        jobs = await list_jobs_by_cursor_async(
+            session,
+            search_query=search_query,
+            location=location,
+            mode=mode,
+            employment_type=employment_type,
+            tags=tags,
+            tag_match=tag_match,
+            order_type=order_type,
+            cursor=cursor,
+            size=params.size,
+            include_applications=include_applications,
+        ) # call to business logic, keyset pagination applied in the database
+        if jobs is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        if include_applications:
+            _hide_foreign_applications(jobs.items, current_user)
+        return jobs
+    jobs = await list_jobs_async(
         session,
         search_query=search_query,
         location=location,
         mode=mode,
         employment_type=employment_type,
         tags=tags,
+        tag_match=tag_match,
         order_by=order_by,
         order_type=order_type,
-    ) # call to business logic
-    return paginate(jobs) # pagination applied to the jobs
+        params=params,
+        include_applications=include_applications,
+    ) # call to business logic, pagination applied in the database
+    if include_applications:
+        _hide_foreign_applications(jobs.items, current_user)
+    return jobs
 
 # job updation endpoint... only recruiters and admin allowed.
 @router.put("/{job_id}", response_model=JobResponse, status_code=status.HTTP_200_OK)
-def update_job_api(job_id: UUID, job: JobUpdate, current_user: User = Depends(get_current_user), session: Session = Depends(db_session_manager.get_session)):
+def update_job_api(job_id: UUID, job: JobUpdate, include: Optional[str] = Query(None, pattern="^applications$"), current_user: User = Depends(get_current_user), session: Session = Depends(db_session_manager.get_session)):
     if not is_recruiter(current_user) and not is_admin(current_user): # prevent candidates from applying to jobs
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only recruiters can update job postings")
     current_job = get_job_by_id(job_id, session)
@@ -75,7 +212,7 @@ def update_job_api(job_id: UUID, job: JobUpdate, current_user: User = Depends(ge
     company = get_company_by_id(current_user.current_organization, session)
     if not company or current_job.company_id != company.id: # prevent other compnay's employee to update the job of this company
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions to update this job")
-    updated_job = update_job(job_id, job, session)
+    updated_job = update_job(job_id, job, session, include_applications=include == "applications")
     return updated_job
 
 # job deletion endpoint.. for only recruiters and admin
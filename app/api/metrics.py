@@ -0,0 +1,48 @@
+"""
+API endpoints exposing runtime metrics of the service.
+Restricted to admin users.
+Role based access control implemented through dependencies...
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.auth.deps import *
+from app.models.user import User
+from app.db.session import db_session_manager, async_db_session_manager
+from app.db.pool import pool_stats
+from app.core.cache import user_cache
+from app.core.upload import upload_metrics
+from app.core.hashing import password_hash_pool
+from app.schemas.metrics import PoolStats, CacheStats, UploadStats, PasswordHashStats
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"]) # router instance for metrics APIs
+
+# Live connection pool stats of the sync and async engines (checked out, overflow, checkout waits), admin only
+@router.get("/db-pool", response_model=list[PoolStats], status_code=status.HTTP_200_OK)
+async def db_pool_stats_api(current_user: TokenClaims = Depends(get_token_claims)):
+    if not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    return [
+        pool_stats("sync", db_session_manager.engine.pool),
+        pool_stats("async", async_db_session_manager.engine.pool),
+    ]
+
+# Hit/miss/eviction counters of the in-process caches of this worker, admin only
+@router.get("/caches", response_model=list[CacheStats], status_code=status.HTTP_200_OK)
+async def cache_stats_api(current_user: TokenClaims = Depends(get_token_claims)):
+    if not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    return [user_cache.stats()]
+
+# Stored/rejected resume uploads and write throughput of this worker, admin only
+@router.get("/uploads", response_model=UploadStats, status_code=status.HTTP_200_OK)
+async def upload_stats_api(current_user: TokenClaims = Depends(get_token_claims)):
+    if not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    return upload_metrics.snapshot()
+
+# Password hashing pool of this worker: saturation (pending, rejected) and hash/verify latency, admin only
+@router.get("/password-hashing", response_model=PasswordHashStats, status_code=status.HTTP_200_OK)
+async def password_hash_stats_api(current_user: TokenClaims = Depends(get_token_claims)):
+    if not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    return password_hash_pool.stats()
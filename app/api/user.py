@@ -1,12 +1,15 @@
 """
 API endpoints to CRUD users... user can only crud itself... list users only through admin creds.
 Role based access control implemented through dependencies...
-SQLModel Session passed as dependency
+SQLModel Session passed as dependency, /users/me retrieval runs on the async request path (AsyncSession)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session
-from app.db.session import db_session_manager
+from typing import Optional
+from uuid import UUID
+from fastapi_pagination import Page, Params
+from app.db.session import db_session_manager, async_db_session_manager
 from app.auth.deps import *
 from app.models.user import User
 from app.schemas.user import UserUpdate, UserResponse
@@ -17,8 +20,8 @@ router = APIRouter(prefix="/users", tags=["Users"]) # router creation for users
 
 # User can retrieve its own details through this api.
 @router.get("/me", response_model=UserResponse, status_code=status.HTTP_200_OK)
-def get_current_user_api(current_user: User = Depends(get_current_user), session: Session=Depends(db_session_manager.get_session)):
-    user= get_user_by_id(current_user.id, session) # call to business logic
+async def get_current_user_api(current_user: User = Depends(get_current_user_async), session: AsyncSession=Depends(async_db_session_manager.get_session)):
+    user= await get_user_by_id_async(current_user.id, session) # call to business logic
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
@@ -41,10 +44,18 @@ def delete_current_user_api(current_user: User = Depends(get_current_user), sess
         "success_status": success
     }
 
-# list all users.. only admin can do that...
-@router.get("/", response_model=list[UserResponse], status_code=status.HTTP_200_OK)
-def list_all_users_api(current_user: User = Depends(get_current_user), session: Session = Depends(db_session_manager.get_session)):
+# list users page by page, filtered by role and organization.. only admin can do that...
+@router.get("/", response_model=Page[UserResponse], status_code=status.HTTP_200_OK)
+def list_all_users_api(
+    role: Optional[UserRole] = None,
+    current_organization: Optional[UUID] = None,
+    order_by: str = Query("created_at", pattern="^(created_at|user_name|email)$"),
+    order_type: str = Query("desc", pattern="^(asc|desc)$"),
+    params: Params = Depends(),
+    current_user: TokenClaims = Depends(get_token_claims),
+    session: Session = Depends(db_session_manager.get_session),
+):
     if not is_admin(current_user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
-    users = list_users(session) # call to crud operation
+    users = list_users(session, role=role, current_organization=current_organization, order_by=order_by, order_type=order_type, params=params) # call to crud operation, paginated in the database
     return users
\ No newline at end of file
@@ -2,7 +2,8 @@
 Authentication and authorization dependencies.
 Provides:
 - JWT-based authentication using HTTP Bearer tokens
-- Current user resolution from access tokens
+- Current user resolution from access tokens, backed by the in-process user cache
+- Stateless authorization principal from the access token claims (role, organization, token version), optional on public routes
 - Role-based access helpers (admin, recruiter, candidate)
 - Ownership checks for company-level authorization
 """
@@ -14,72 +15,133 @@ from app.core.config import Config
 from app.core.security import Security
 from uuid import UUID
 from app.models.user import User
+from app.schemas.token import TokenClaims
 from app.core.enum import UserRole
-from app.db.session import db_session_manager
+from app.db.session import db_session_manager, async_db_session_manager
+from app.core.cache import user_cache, cache_user
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 import time
-from datetime import datetime, timezone
+import logging
 from app.crud.user import *
 from app.crud.company import *
 
+logger = logging.getLogger(__name__) # DEBUG only, silent in the request hot path by default
+
 # HTTP Bearer Authentication Scheme (Authentication: Bearer <Token>)
 auth_header_scheme = HTTPBearer()
 
-# Retrieve the current user from decoding of JWT access token
-def get_current_user(session : Session = Depends(db_session_manager.get_session), creds: HTTPAuthorizationCredentials = Depends(auth_header_scheme)) -> User:
+# Same scheme for public routes, anonymous requests are let through (credentials None)
+optional_auth_header_scheme = HTTPBearer(auto_error=False)
+
+# Decode and verify the JWT access token sent in the Authorization header, returns its claims
+def decode_access_token(creds: HTTPAuthorizationCredentials) -> dict:
     try:
-        print("Inside get_current_user... getting creds")
         token=creds.credentials # get auth credentials from containing JWT tokens from the Header
-        print("Token received: " + token)
-        print("Now (time.time):", time.time())
-        print("Now (utc):", datetime.now(timezone.utc).timestamp())
-        print("Token exp:", payload_exp := jwt.get_unverified_claims(token)["exp"])
-        print("Diff (exp - now):", payload_exp - time.time())
         payload = jwt.decode(token, Config.SECRET_KEY,algorithms=[Config.ALGORITHM]) # JWT decoding through SECRET key, checking of expiry time, etc.  
-        print("Payload decoded: " + str(payload))
         if payload: # check successful decoding
-            print("Payload exists...")
-            user_id: UUID = UUID(payload.get("sub")) # access user id in sub field
             tkn_type: str|None=payload.get("type") # get token type : access or refresh
-            if user_id is None or tkn_type is None:
-                print("user id:" + str(user_id)+" this one..")
-                if tkn_type != "access": print("token type:" + tkn_type)
-                if user_id is None: print("user id is none")
+            if payload.get("sub") is None or tkn_type is None:
+                logger.debug("Rejected access token without subject or type", extra={"token_type": tkn_type})
                 raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-            user=get_user_model_instance(user_id, session) # retrieve user from db
-            if not user:
-                raise HTTPException(status_code=401, detail="User not found...")
-            return user
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Access token accepted", extra={"user_id": payload.get("sub"), "expires_in": payload.get("exp", 0) - time.time()})
+            return payload
         else:
             raise HTTPException(status_code=401, detail="Authentication failed...")
     except JWTError as e: # raise JWT Exception for failure in decoding
-        print("JWT Error occurred...")
-        print("JWT ERROR TYPE:", type(e))
-        print("JWT ERROR:", e)
+        logger.debug("Access token rejected", extra={"error": type(e).__name__})
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+
+# Resolve the user id from the JWT access token sent in the Authorization header
+def get_user_id_from_token(creds: HTTPAuthorizationCredentials) -> UUID:
+    return UUID(decode_access_token(creds)["sub"])
+
+# Reject access tokens issued before the user's role, organization or password last changed
+def check_token_version(payload: dict, user: User) -> User:
+    if payload.get("ver", 0) != (user.token_version or 0):
+        logger.debug("Rejected access token of an older version", extra={"user_id": str(user.id), "token_version": payload.get("ver", 0)})
+        raise HTTPException(status_code=401, detail="Token revoked, please login again")
+    return user
+
+# Retrieve the current user from decoding of JWT access token
+def get_current_user(session : Session = Depends(db_session_manager.get_session), creds: HTTPAuthorizationCredentials = Depends(auth_header_scheme)) -> User:
+    payload = decode_access_token(creds)
+    user_id = UUID(payload["sub"])
+    cached = user_cache.get(user_id) # skip the db round trip for recently authenticated users
+    if cached:
+        return check_token_version(payload, cached)
+    user=get_user_model_instance(user_id, session) # retrieve user from db
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found...")
+    return check_token_version(payload, cache_user(user))
+
+# Retrieve the current user from decoding of JWT access token (async session), for routes on the async request path
+async def get_current_user_async(session : AsyncSession = Depends(async_db_session_manager.get_session), creds: HTTPAuthorizationCredentials = Depends(auth_header_scheme)) -> User:
+    payload = decode_access_token(creds)
+    user_id = UUID(payload["sub"])
+    cached = user_cache.get(user_id) # skip the db round trip for recently authenticated users
+    if cached:
+        return check_token_version(payload, cached)
+    user=await get_user_model_instance_async(user_id, session) # retrieve user from db
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found...")
+    return check_token_version(payload, cache_user(user))
+
+# Authorization principal built from the claims of the verified access token, without loading the user:
+# claims are trusted until the token expires, unless this worker's user cache already knows of a newer token version.
+def claims_from_token(creds: HTTPAuthorizationCredentials) -> TokenClaims:
+    payload = decode_access_token(creds)
+    try:
+        claims = TokenClaims(id=payload["sub"], role=payload.get("role"), current_organization=payload.get("org"), token_version=payload.get("ver", 0))
+    except ValueError: # tokens issued without the authorization claims
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    cached = user_cache.get(claims.id)
+    if cached:
+        check_token_version(payload, cached)
+    return claims
+
+# Authorization principal of the current user as token claims
+def user_claims(user: User) -> TokenClaims:
+    return TokenClaims(id=user.id, role=user.role, current_organization=user.current_organization, token_version=user.token_version or 0)
+
+# Authorization principal for read-only routes, from the token claims with AUTH_TRUST_TOKEN_CLAIMS, from the user row otherwise.
+def get_token_claims(session : Session = Depends(db_session_manager.get_session), creds: HTTPAuthorizationCredentials = Depends(auth_header_scheme)) -> TokenClaims:
+    if not Config.AUTH_TRUST_TOKEN_CLAIMS: # stateful mode, the session only opens a connection here
+        return user_claims(get_current_user(session, creds))
+    return claims_from_token(creds)
+
+# Authorization principal of public (async) routes: None for anonymous requests, the token claims otherwise (invalid tokens still get 401).
+# The async session is the route's own (dependencies are shared per request), it only opens a connection in stateful mode.
+async def get_optional_token_claims(session : AsyncSession = Depends(async_db_session_manager.get_session), creds: HTTPAuthorizationCredentials | None = Depends(optional_auth_header_scheme)) -> TokenClaims | None:
+    if creds is None:
+        return None
+    if not Config.AUTH_TRUST_TOKEN_CLAIMS:
+        return user_claims(await get_current_user_async(session, creds))
+    return claims_from_token(creds)
 
 # Authorization - RBAC 
 
 #  check if user is admin
-def is_admin(current_user: User = Depends(get_current_user)) -> bool:
+def is_admin(current_user: User | TokenClaims = Depends(get_current_user)) -> bool:
     if current_user.role != UserRole.ADMIN:
         return False
     return True
 
 #  check if user is candidate
-def is_candidate(current_user: User = Depends(get_current_user)) -> bool:
+def is_candidate(current_user: User | TokenClaims = Depends(get_current_user)) -> bool:
     if current_user.role != UserRole.CANDIDATE:
         return False
     return True
 
 #  check if user is recruiter
-def is_recruiter(current_user: User = Depends(get_current_user)) -> bool:
+def is_recruiter(current_user: User | TokenClaims = Depends(get_current_user)) -> bool:
     if current_user.role != UserRole.RECRUITER:
         return False
     return True
 
 # check if the user owns the company
-def check_ownership(current_user: User, company_id: UUID, session: Session) -> bool:
+def check_ownership(current_user: User | TokenClaims, company_id: UUID, session: Session) -> bool:
     company=get_company_by_id(company_id, session)
     if current_user.id == company.owner_id:
         return True
@@ -0,0 +1,48 @@
+"""
+Authentication service used by the login route.
+
+A login loads the user once, verifies the password on the password hashing
+pool (awaited, no thread is held while the hash waits or runs), then issues
+the access and refresh tokens. The transaction of the user lookup is ended
+before the password check, so no pooled connection sits idle in transaction
+while the hash waits for or runs on the pool. The refresh token row is then
+inserted and committed in one write transaction: a login costs one SELECT,
+one INSERT and one COMMIT. When the stored password hash uses an outdated
+scheme or cost, the rehashed password is written by the same commit.
+"""
+
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.user import User
+from app.core.security import Security
+from app.core.cache import cache_user
+from app.crud.user import get_user_model_instance_by_email_async
+from app.crud.refresh_token import add_refresh_token
+
+# raised by login when no user has the email
+class UserNotFoundError(Exception):
+    pass
+
+# raised by login when the password does not match
+class InvalidPasswordError(Exception):
+    pass
+
+# authenticate a user by email and password, returns the access and refresh tokens
+async def login(email: str, password: str, session: AsyncSession) -> dict:
+    user = await get_user_model_instance_by_email_async(session, email) # the only user lookup of the login
+    if not user:
+        raise UserNotFoundError()
+    session.expunge(user) # detached with its loaded attributes, not expired by the rollback
+    await session.rollback() # ends the read transaction, the connection goes back to the pool during the password check
+    verified, new_hash = await Security.verify_and_update_password_async(password, user.password)
+    if not verified:
+        raise InvalidPasswordError()
+    if new_hash: # transparent upgrade to the configured scheme and cost
+        user.password = new_hash
+        await session.exec(update(User).where(User.id == user.id).values(password=new_hash))
+    access_token = Security.create_access_token(Security.access_token_claims(user))
+    refresh_jwt_token = Security.create_refresh_token(str(user.id), user.role)
+    cache_user(user) # the first authenticated request after login skips the user lookup
+    add_refresh_token(refresh_jwt_token["token_id"], refresh_jwt_token["exp"], user.id, session)
+    await session.commit()
+    return {"access_token": access_token, "refresh_token": refresh_jwt_token["ref_token"], "token_type": "bearer"}
@@ -0,0 +1,83 @@
+"""
+Request body parsing for bulk endpoints.
+
+Bulk endpoints accept either a JSON array or an NDJSON stream (one JSON
+document per line, Content-Type application/x-ndjson). NDJSON bodies are
+parsed line by line while they stream in, so a large import is never held
+in memory as one document.
+
+Record limits are checked before anything is processed where possible: a
+JSON array with too many records is rejected with 413 as a whole. An NDJSON
+stream cannot be counted up front, it ends with the TRUNCATED marker once the
+limit is reached, the records after it are not read. NDJSON lines are also
+limited in size, so a record without a newline is never buffered whole: a
+line over the limit is rejected with 413 (records of earlier lines may
+already be processed).
+"""
+
+import json
+from typing import Any, AsyncIterator
+from fastapi import HTTPException, Request, status
+
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+# record yielded in place of the first NDJSON record beyond the limit, the stream is not read further
+TRUNCATED = object()
+
+# whether the request body is NDJSON
+def is_ndjson(request: Request) -> bool:
+    return request.headers.get("content-type", "").split(";")[0].strip().lower() in NDJSON_MEDIA_TYPES
+
+# (index, record) of every record of a JSON array or NDJSON body. Lines that are not valid JSON yield the ValueError as record.
+# A JSON array of more than max_records records is rejected with 413 before any record is yielded, an NDJSON stream yields
+# (max_records, TRUNCATED) instead of its next record. An NDJSON line longer than max_line_bytes raises 413 once it is buffered that far.
+async def iter_request_records(request: Request, max_records: int, max_line_bytes: int) -> AsyncIterator[tuple[int, Any]]:
+    if is_ndjson(request):
+        records = _iter_ndjson(request, max_line_bytes)
+    else:
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array or NDJSON (application/x-ndjson)")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array or NDJSON (application/x-ndjson)")
+        if len(body) > max_records:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"At most {max_records} records per request")
+        records = _iter_list(body)
+    index = 0
+    async for record in records:
+        if index >= max_records:
+            yield index, TRUNCATED
+            return
+        yield index, record
+        index += 1
+
+async def _iter_list(records: list) -> AsyncIterator[Any]:
+    for record in records:
+        yield record
+
+async def _iter_ndjson(request: Request, max_line_bytes: int) -> AsyncIterator[Any]:
+    buffer = bytearray() # current, incomplete line: only the new chunk is scanned for newlines, the buffer grows in place
+    async for chunk in request.stream():
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            buffer += chunk[start:end]
+            _check_line_size(buffer, max_line_bytes)
+            if buffer.strip():
+                yield _parse_line(buffer)
+            buffer.clear()
+            start = end + 1
+        buffer += chunk[start:]
+        _check_line_size(buffer, max_line_bytes)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+def _check_line_size(line: bytearray, max_line_bytes: int):
+    if len(line) > max_line_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"NDJSON records are limited to {max_line_bytes} bytes")
+
+def _parse_line(line: bytearray) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as error:
+        return error
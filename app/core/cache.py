@@ -0,0 +1,86 @@
+"""
+In-process caches.
+
+Provides:
+- A thread safe, size bounded LRU cache with per-entry TTL and hit/miss/eviction counters
+- The authenticated user cache used by get_current_user
+
+Caches are per process: explicit invalidations reach the current worker
+only, other workers/replicas pick changes up when the entry's TTL expires.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from app.core.config import Config
+from app.models.user import User
+
+class TTLCache:
+    # LRU cache whose entries also expire after ttl seconds, ttl <= 0 or max_size <= 0 disables caching
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None: # expired
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key) # most recently used
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size: # drop least recently used entries
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# authenticated users by id, holding detached snapshots of the user rows needed for authorization
+user_cache = TTLCache("users", max_size=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
+
+# store a detached snapshot of the user in the user cache (no password hash, no relationships) and return it
+def cache_user(user: User) -> User:
+    snapshot = User(**user.model_dump(exclude={"password"}), password="")
+    user_cache.set(snapshot.id, snapshot)
+    return snapshot
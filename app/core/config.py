@@ -38,12 +38,89 @@ class Config:
     DATABASE_URL = os.getenv("DATABASE_URL")
     TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
 
+    # Async (asyncpg) database connection URLs, derived from the ones above when not set
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+    TEST_ASYNC_DATABASE_URL = os.getenv("TEST_ASYNC_DATABASE_URL")
+
+    # Connection pool settings (per engine, per process)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # connections kept open
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # extra connections opened under load
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced, -1 disables
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # test connections on checkout (survives DB failovers)
+
+    # Authorization: trust the role/organization claims of verified access tokens on read-only routes (no user lookup).
+    # Claims stay trusted until the token expires (TOKEN_EXPIRY_TIME), role/organization/password changes revoke them on every other route.
+    AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "true").lower() == "true"
+
+    # Authenticated user cache (per process)
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # seconds a cached user is trusted, 0 disables the cache
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))  # max cached users, least recently used are evicted
+
+    # Password hashing: PASSWORD_HASH_SCHEME hashes new passwords, stored hashes of another scheme or cost are upgraded on login
+    PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")  # "bcrypt" or "argon2" (requires argon2-cffi)
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # log2 of the bcrypt iterations (4-31), each step doubles the cost
+    ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))  # argon2id passes over memory
+    ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "19456"))  # argon2id memory per hash, KiB
+    ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))  # argon2id lanes, the hashing pool already runs hashes in parallel
+
+    # Password hashing pool (hashes run off the request threads)
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))  # concurrent hashes/verifications, one core each
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))  # calls waiting for a worker, further calls get 503
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))  # Retry-After (seconds) sent with the 503
+
+    # Bulk job import settings
+    JOB_BULK_BATCH_SIZE = int(os.getenv("JOB_BULK_BATCH_SIZE", "1000"))  # jobs inserted per INSERT statement and transaction
+    JOB_BULK_MAX_ROWS = int(os.getenv("JOB_BULK_MAX_ROWS", "10000"))  # max jobs per bulk request, larger JSON arrays get 413 (nothing inserted), longer NDJSON streams are truncated
+    JOB_BULK_MAX_LINE_BYTES = int(os.getenv("JOB_BULK_MAX_LINE_BYTES", "1048576"))  # max bytes per NDJSON record (line), longer lines get 413 (rows of earlier batches stay inserted)
+
+    APPLICATION_BULK_MAX_IDS = int(os.getenv("APPLICATION_BULK_MAX_IDS", "1000"))  # max applications per bulk status update
+
+    # Streamed exports
+    EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))  # rows fetched per round trip from the server-side cursor
+    EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))  # serialized bytes buffered before a chunk is sent
+
     # File upload settings
     UPLOAD_RESUME_DIR = os.getenv("UPLOAD_RESUME_DIR", "uploads/resumes")
+    UPLOAD_RESUME_MAX_BYTES = int(os.getenv("UPLOAD_RESUME_MAX_BYTES", str(5 * 1024 * 1024)))  # max resume size, larger uploads get 413
+    UPLOAD_RESUME_CONTENT_TYPES = [content_type.strip().lower() for content_type in os.getenv(
+        "UPLOAD_RESUME_CONTENT_TYPES",
+        "application/pdf,application/msword,application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ).split(",") if content_type.strip()]  # accepted resume types, others get 415
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # bytes written to disk per chunk
+    RESUME_STORAGE_BACKEND = os.getenv("RESUME_STORAGE_BACKEND", "local")  # "local" (UPLOAD_RESUME_DIR), "s3" (shared by all replicas) or "memory" (tests)
+
+    # S3-compatible resume storage (AWS S3, MinIO, ...), used when RESUME_STORAGE_BACKEND=s3
+    S3_BUCKET = os.getenv("S3_BUCKET")
+    S3_PREFIX = os.getenv("S3_PREFIX", "resumes")  # key prefix inside the bucket
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for MinIO, unset for AWS
+    S3_REGION = os.getenv("S3_REGION")
+    S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")  # unset to use the default AWS credential chain
+    S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
+    S3_MULTIPART_CHUNK_SIZE = int(os.getenv("S3_MULTIPART_CHUNK_SIZE", str(8 * 1024 * 1024)))  # part size, files above it use multipart uploads
+    S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "10"))  # keep-alive connections of the shared client
+
+    RESUME_CACHE_MAX_AGE = int(os.getenv("RESUME_CACHE_MAX_AGE", "3600"))  # seconds clients may cache a downloaded resume (private caches only)
+    RESUME_SWEEP_INTERVAL = float(os.getenv("RESUME_SWEEP_INTERVAL", "3600"))  # seconds between sweeps of unreferenced resume blobs, 0 disables
+    RESUME_SWEEP_GRACE = float(os.getenv("RESUME_SWEEP_GRACE", "3600"))  # seconds an unreferenced blob is kept (uploads of in-flight applications)
 
     # Token expiry settings
     TOKEN_EXPIRY_TIME = int(os.getenv("TOKEN_EXPIRY_TIME", "30"))  # minutes
     REFRESH_TOKEN_EXPIRY_TIME = int(os.getenv("REFRESH_TOKEN_EXPIRY_TIME", "20"))  # days
+    REFRESH_TOKEN_PURGE_INTERVAL = float(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL", "3600"))  # seconds between purges of expired/revoked refresh tokens, 0 disables
+    REFRESH_TOKEN_PURGE_BATCH = int(os.getenv("REFRESH_TOKEN_PURGE_BATCH", "1000"))  # rows deleted per statement and transaction
+
+    # Refresh token allow-list / revocation cache
+    TOKEN_STORE_BACKEND = os.getenv("TOKEN_STORE_BACKEND", "memory")  # "memory" (per process), "redis" (shared by all replicas) or "none"
+    TOKEN_STORE_MAX_SIZE = int(os.getenv("TOKEN_STORE_MAX_SIZE", "100000"))  # max revoked tokens remembered by the memory backend
+    TOKEN_STORE_PREFIX = os.getenv("TOKEN_STORE_PREFIX", "jobboard")  # key prefix of the redis backend
+    REDIS_URL = os.getenv("REDIS_URL")  # e.g. redis://localhost:6379/0, used when TOKEN_STORE_BACKEND=redis
+
+    # Logging settings
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # global level
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # per-module levels, e.g. "app.auth=DEBUG,sqlalchemy.engine=INFO"
+    LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")  # per-module sampling of DEBUG/INFO records, e.g. "app.api=0.1"
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" (structured) or "text"
 
     # JWT signing algorithm
     ALGORITHM = os.getenv("ALGORITHM", "HS256")
@@ -72,3 +149,23 @@ if Config.DATABASE_URL and Config.DATABASE_URL.startswith("postgresql://"):
         "postgresql+psycopg2://",
         1,
     )
+
+
+# asyncio drivers swapped in for the sync driver of a database URL
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+# Derive the async database URLs from the sync ones,
+# swapping the driver for its asyncio counterpart (`asyncpg` for Postgres), other URLs are kept as they are
+def to_async_database_url(url: str | None) -> str | None:
+    if url and "://" in url:
+        scheme, rest = url.split("://", 1)
+        backend = scheme.split("+", 1)[0]
+        if backend in ASYNC_DRIVERS:
+            return f"{backend}+{ASYNC_DRIVERS[backend]}://{rest}"
+    return url
+
+
+if not Config.ASYNC_DATABASE_URL:
+    Config.ASYNC_DATABASE_URL = to_async_database_url(Config.DATABASE_URL)
+if not Config.TEST_ASYNC_DATABASE_URL:
+    Config.TEST_ASYNC_DATABASE_URL = to_async_database_url(Config.TEST_DATABASE_URL)
@@ -0,0 +1,82 @@
+"""
+Resume download responses.
+
+Provides:
+- Strong ETags for content-addressed resumes (the SHA-256 digest, identical on every replica)
+- Conditional requests: If-None-Match answered with 304 Not Modified
+- Byte ranges: Range / If-Range answered with 206 Partial Content (or 416)
+- Private cache headers
+
+Resumes on local disk are served with Starlette's FileResponse, which hands the
+file to the server for zero-copy sending (ASGI pathsend) when the server
+supports it and streams it in chunks otherwise. Resumes of remote backends are
+streamed in bounded chunks, ranges are fetched from the backend as ranges.
+"""
+
+import mimetypes
+import os
+import re
+from typing import Mapping, Optional
+from urllib.parse import quote
+from fastapi import HTTPException, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from app.core.config import Config
+from app.core.resume_store import is_resume_blob
+from app.core.storage import StorageBackend
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# strong ETag of a content-addressed resume, None for legacy files
+def resume_etag(resume_path: str) -> Optional[str]:
+    if is_resume_blob(resume_path):
+        return f'"{resume_path.rsplit("/", 1)[-1]}"'
+    return None
+
+# whether an If-None-Match header matches the ETag (weak comparison, as RFC 9110 requires for If-None-Match)
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+# byte range [start, end) requested by a single-range Range header, None to send the whole file
+def parse_range(range_header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    match = _RANGE_PATTERN.match(range_header.strip()) if range_header else None
+    if not match or match.groups() == ("", ""): # absent, malformed or multi-range: ignored, the full content is sent
+        return None
+    first, last = match.groups()
+    if first == "": # suffix range, the last N bytes
+        start, end = max(size - int(last), 0), size
+    else:
+        start, end = int(first), min(int(last) + 1, size) if last else size
+    if start >= size or start >= end:
+        raise HTTPException(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+# response serving a stored resume, honoring If-None-Match, Range and If-Range
+def resume_response(storage: StorageBackend, resume_path: str, filename: str, request_headers: Mapping[str, str]) -> Response:
+    etag = resume_etag(resume_path)
+    headers = {"Cache-Control": f"private, max-age={Config.RESUME_CACHE_MAX_AGE}"}
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] += ", immutable" # a blob key always holds the same content
+    if etag_matches(request_headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    local_path = storage.local_path(resume_path) if etag else resume_path # legacy resumes are local files
+    if local_path:
+        if not os.path.isfile(local_path):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resume not found")
+        return FileResponse(local_path, filename=filename, media_type=media_type, headers=headers) # ranges, If-Range and sendfile handled by Starlette
+    if not storage.exists(resume_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resume not found")
+    size = storage.size(resume_path)
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+    if_range = request_headers.get("if-range")
+    requested = parse_range(request_headers.get("range"), size) if not if_range or if_range == etag else None
+    start, end = requested or (0, size)
+    headers["Content-Length"] = str(end - start)
+    if requested:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    return StreamingResponse(storage.iter_range(resume_path, start, end), status_code=status.HTTP_206_PARTIAL_CONTENT if requested else status.HTTP_200_OK, media_type=media_type, headers=headers)
@@ -0,0 +1,54 @@
+"""
+Streamed exports of large result sets.
+
+Records are serialized as NDJSON (one JSON document per line) or CSV (header
+row first) while they are read from the database, and sent in chunks of about
+EXPORT_CHUNK_BYTES: memory stays bounded by the chunk and the database fetch
+size (EXPORT_YIELD_PER), whatever the number of records exported.
+"""
+
+import csv
+import io
+from enum import Enum
+from typing import AsyncIterator
+from pydantic import BaseModel
+from app.core.config import Config
+
+class ExportFormat(str, Enum):
+    # represents the serialization of an export
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+MEDIA_TYPES = {ExportFormat.NDJSON: "application/x-ndjson", ExportFormat.CSV: "text/csv; charset=utf-8"}
+
+# serialized chunks of the records, in the requested format
+def export_stream(records: AsyncIterator[BaseModel], export_format: ExportFormat, fields: list[str]) -> AsyncIterator[str]:
+    if export_format == ExportFormat.CSV:
+        return _csv_stream(records, fields)
+    return _ndjson_stream(records)
+
+async def _ndjson_stream(records: AsyncIterator[BaseModel]) -> AsyncIterator[str]:
+    chunk: list[str] = []
+    size = 0
+    async for record in records:
+        line = record.model_dump_json() + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= Config.EXPORT_CHUNK_BYTES:
+            yield "".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk)
+
+async def _csv_stream(records: AsyncIterator[BaseModel], fields: list[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for record in records:
+        values = record.model_dump(mode="json", include=set(fields))
+        writer.writerow(values.get(field) for field in fields)
+        if buffer.tell() >= Config.EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue() # at least the header row
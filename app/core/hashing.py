@@ -0,0 +1,135 @@
+"""
+Bounded worker pool for password hashing.
+
+bcrypt costs hundreds of milliseconds of CPU per hash or verification. Hashes
+and verifications run on a dedicated pool of PASSWORD_HASH_WORKERS threads
+(bcrypt releases the GIL, so they run in parallel on separate cores), with at
+most PASSWORD_HASH_QUEUE_SIZE more calls waiting for a worker. Calls beyond that
+are rejected at once with 503 and a Retry-After header instead of queueing
+without bound.
+
+Login and registration are async routes awaiting the pool (run_async): a call
+waiting for or running on the pool holds no thread of the API threadpool, so a
+burst of logins cannot starve the sync endpoints. The sync run() blocks its
+calling thread for the queue wait and the hash, it is kept for the sync routes
+hashing once in a while (password change).
+
+Latency of every call (queue wait included) is recorded for the metrics endpoint.
+"""
+
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+from fastapi import HTTPException, status
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# recent call latencies kept for the percentiles
+LATENCY_WINDOW = 1000
+
+class PasswordHashPool:
+    # thread pool with bounded admission and latency metrics, created on first use
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0 # calls running or waiting for a worker
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    # admit a call, 503 when every worker and queue slot is taken
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self.rejected += 1
+                logger.warning("Password hashing pool saturated", extra={"pending": self._pending, "workers": self.workers, "queue_size": self.queue_size})
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server busy, please retry", headers={"Retry-After": str(Config.PASSWORD_HASH_RETRY_AFTER)})
+            self._pending += 1
+
+    # submit fn(*args) to the workers, the returned list receives the start time of the call
+    def _submit(self, fn: Callable[..., T], *args) -> tuple[Future, list[float]]:
+        started = []
+        def timed():
+            started.append(time.perf_counter())
+            return fn(*args)
+        return self._get_executor().submit(timed), started
+
+    # record a finished (or failed) call
+    def _record(self, submitted: float, started: list[float]):
+        elapsed = time.perf_counter() - submitted
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+            self.wait_seconds_total += (started[0] - submitted) if started else elapsed
+            self.seconds_total += elapsed
+            self.seconds_max = max(self.seconds_max, elapsed)
+            self._latencies.append(elapsed)
+
+    # run fn(*args) on the pool and block the calling thread until its result, 503 when every worker and queue slot is taken
+    def run(self, fn: Callable[..., T], *args) -> T:
+        self._admit()
+        submitted = time.perf_counter()
+        started = []
+        try:
+            future, started = self._submit(fn, *args)
+            return future.result()
+        finally:
+            self._record(submitted, started)
+
+    # run fn(*args) on the pool and await its result without holding a thread, 503 when every worker and queue slot is taken
+    async def run_async(self, fn: Callable[..., T], *args) -> T:
+        self._admit()
+        submitted = time.perf_counter()
+        try:
+            future, started = self._submit(fn, *args)
+        except BaseException:
+            self._record(submitted, [])
+            raise
+        future.add_done_callback(lambda _: self._record(submitted, started)) # still pending while the worker runs, even when the request is cancelled
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            quantiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "latency_avg_ms": round(self.seconds_total / self.completed * 1000, 3) if self.completed else 0.0,
+                "latency_p50_ms": round(quantiles[49] * 1000, 3) if quantiles else 0.0,
+                "latency_p95_ms": round(quantiles[94] * 1000, 3) if quantiles else 0.0,
+                "latency_max_ms": round(self.seconds_max * 1000, 3),
+                "queue_wait_avg_ms": round(self.wait_seconds_total / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+    # stop the workers, the pool is recreated if used again
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+# shared password hashing pool of the worker process
+password_hash_pool = PasswordHashPool(Config.PASSWORD_HASH_WORKERS, Config.PASSWORD_HASH_QUEUE_SIZE)
@@ -0,0 +1,83 @@
+"""
+Logging setup for the application.
+
+Provides:
+- Structured (JSON) or plain text log lines on stderr
+- A global level plus per-module levels, e.g. LOG_LEVELS="app.auth=DEBUG,sqlalchemy.engine=INFO"
+  (sqlalchemy.engine=INFO logs every SQL statement, like echo=True did)
+- Sampling of low severity records per module, e.g. LOG_SAMPLING="app.api=0.1" keeps ~10% of DEBUG/INFO lines
+
+Hot paths (auth, database) only log at DEBUG, so with the default INFO level
+they cost a single level check per call and write nothing.
+"""
+
+import json
+import logging
+import random
+import sys
+from datetime import datetime, timezone
+from app.core.config import Config
+
+# attributes every LogRecord has, anything else was passed through `extra=` and is emitted as a field
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    # one JSON object per line: timestamp, level, logger, message and extra fields
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    # keeps a fraction of the records below WARNING, by longest matching logger prefix. Warnings and errors always pass.
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return rate >= 1 or random.random() < rate
+        return True
+
+# parse "name=value,name=value" settings into a dict
+def _parse_mapping(value: str | None) -> dict[str, str]:
+    mapping = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, setting = item.split("=", 1)
+            mapping[name.strip()] = setting.strip()
+    return mapping
+
+# SQL statement logging stays off unless asked for through LOG_LEVELS (it replaces the engine's echo flag)
+DEFAULT_LEVELS = {"sqlalchemy.engine": "WARNING", "sqlalchemy.pool": "WARNING"}
+
+# configure the root logger and per-module levels from Config, safe to call more than once
+def configure_logging():
+    handler = logging.StreamHandler(sys.stderr)
+    if Config.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    sampling = {name: float(rate) for name, rate in _parse_mapping(Config.LOG_SAMPLING).items()}
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if getattr(h, "_app_handler", False)]:
+        root.removeHandler(existing)
+    handler._app_handler = True
+    root.addHandler(handler)
+    root.setLevel(Config.LOG_LEVEL.upper())
+    for name, level in {**DEFAULT_LEVELS, **_parse_mapping(Config.LOG_LEVELS)}.items():
+        logging.getLogger(name).setLevel(level.upper())
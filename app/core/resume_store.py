@@ -0,0 +1,128 @@
+"""
+Content-addressed resume storage.
+
+Resumes are stored once per distinct content, keyed by their SHA-256 digest
+under the "blobs/" prefix of the resume storage backend (see app.core.storage).
+Application.resume_path holds the storage key, so every application sharing
+the same resume shares one file: the number of applications pointing to a
+key is its reference count.
+
+Deleting an application only drops its reference. A periodic sweep reclaims
+the blobs that no application references anymore, once they are older than
+a grace period (so blobs of applications being created are never swept).
+
+An application re-using a stored blob only touches it, which does not stop a
+sweep that already picked the blob. Each sweep batch (reference check and
+delete) therefore holds a Postgres advisory lock exclusively, and an
+application re-using a blob holds it shared from the check that the blob
+still exists to its commit: either the sweep sees the new reference, or the
+application finds the blob gone and stores it again.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, update
+from sqlmodel import Session, select
+from app.core.config import Config
+from app.core.storage import get_storage
+from app.core.upload import StoredUpload, record_upload
+from app.models.application import Application
+
+logger = logging.getLogger(__name__)
+
+# storage key prefix of the resume blobs
+BLOB_PREFIX = "blobs"
+
+# keys checked against the application table per query during a sweep
+SWEEP_BATCH_SIZE = 500
+
+# advisory lock key serializing sweep batches with applications re-using a blob
+SWEEP_LOCK_KEY = 0x726573756D65 # "resume"
+
+# whether a resume path is a blob key (applications created before the blob store point to per-application local files)
+def is_resume_blob(path: str) -> bool:
+    return path.startswith(BLOB_PREFIX + "/")
+
+# local path prefix of the blobs written before the storage backends ("<UPLOAD_RESUME_DIR>/blobs/"), the same files as the "blobs/" keys of the local backend
+def legacy_blob_path_prefix() -> str:
+    return os.path.join(Config.UPLOAD_RESUME_DIR, BLOB_PREFIX) + os.sep
+
+# rewrite resume paths of blobs written before the storage backends to their storage keys, so that they are counted as references
+# by the sweep and never deleted with one application. Only for the local backend, where both name the same file.
+def migrate_legacy_blob_paths(conn) -> int:
+    prefix = legacy_blob_path_prefix()
+    statement = (
+        update(Application)
+        .where(Application.resume_path.startswith(prefix, autoescape=True))
+        .values(resume_path=BLOB_PREFIX + "/" + func.substr(Application.resume_path, len(prefix) + 1))
+    )
+    migrated = conn.execute(statement).rowcount
+    if migrated:
+        logger.info("Resume paths migrated to blob keys", extra={"migrated": migrated})
+    return migrated
+
+# store a resume in the blob store, identical resumes are written once
+def store_resume(upload: UploadFile) -> StoredUpload:
+    stored = get_storage().store_content_addressed(upload.file, BLOB_PREFIX, Config.UPLOAD_RESUME_MAX_BYTES, Config.UPLOAD_CHUNK_SIZE)
+    record_upload(stored)
+    return stored
+
+# take the sweep lock in the session's transaction, released by its commit or rollback (Postgres only, other databases run no sweep concurrently)
+def lock_resume_blobs(session: Session, exclusive: bool = False):
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    lock = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+    session.exec(select(lock(SWEEP_LOCK_KEY))).one()
+
+# make sure a re-used blob survives until the application referencing it is committed by the caller: takes the sweep lock shared and
+# stores the resume again when a sweep removed the blob in the meantime. New blobs are younger than the sweep grace period, no lock needed.
+def claim_resume_blob(upload: UploadFile, stored: StoredUpload, session: Session) -> StoredUpload:
+    if not stored.deduplicated:
+        return stored
+    lock_resume_blobs(session)
+    if get_storage().exists(stored.path):
+        return stored
+    logger.info("Re-used resume blob swept before its application was created, storing it again", extra={"resume_path": stored.path})
+    return store_resume(upload)
+
+# drop the file of a resume stored before the blob store, blobs (of either path format) are reclaimed by the sweep instead
+def remove_legacy_resume(resume_path: str):
+    if resume_path and not is_resume_blob(resume_path) and not resume_path.startswith(legacy_blob_path_prefix()) and os.path.exists(resume_path):
+        os.remove(resume_path)
+
+# number of applications referencing a stored resume
+def count_resume_references(resume_path: str, session: Session) -> int:
+    return session.exec(select(func.count()).select_from(Application).where(Application.resume_path == resume_path)).one()
+
+# remove unreferenced blobs (and abandoned temp files) older than grace_seconds, returns the number of files removed
+def sweep_resume_blobs(session: Session, grace_seconds: float | None = None) -> int:
+    grace_seconds = grace_seconds if grace_seconds is not None else Config.RESUME_SWEEP_GRACE
+    storage = get_storage()
+    cutoff = time.time() - grace_seconds
+    candidates = [key for key, modified in storage.list(BLOB_PREFIX + "/") if modified <= cutoff]
+    removed = 0
+    for start in range(0, len(candidates), SWEEP_BATCH_SIZE):
+        batch = candidates[start:start + SWEEP_BATCH_SIZE]
+        lock_resume_blobs(session, exclusive=True) # applications re-using a blob wait until the batch is deleted
+        referenced = set(session.exec(select(Application.resume_path).where(Application.resume_path.in_(batch)).distinct()).all())
+        removed += storage.delete_many(key for key in batch if key not in referenced)
+        session.commit() # releases the lock
+    logger.info("Resume blob sweep done", extra={"candidates": len(candidates), "removed": removed})
+    return removed
+
+# background task sweeping the blob store every RESUME_SWEEP_INTERVAL seconds, the sweep itself runs in the threadpool
+async def run_resume_sweeper(session_factory, interval: float | None = None):
+    interval = interval if interval is not None else Config.RESUME_SWEEP_INTERVAL
+    def sweep_once():
+        with session_factory() as session:
+            return sweep_resume_blobs(session)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(sweep_once)
+        except Exception:
+            logger.exception("Resume blob sweep failed")
@@ -0,0 +1,104 @@
+"""
+Full-text search utils for jobs.
+
+On PostgreSQL, jobs are searched through a weighted tsvector document built
+over title (weight A), description (weight B) and tags (weight C). A GIN
+expression index over the very same document keeps lookups index-backed,
+and is maintained by PostgreSQL itself on every insert/update.
+
+On any other database (e.g. SQLite in local runs), the same matching and
+ranking rules are implemented in pure Python and registered as a SQL
+function on every new connection, so filtering, ordering and pagination
+still happen inside the database query.
+"""
+
+import json
+import math
+import re
+import sqlite3
+from typing import Any, Optional
+from sqlalchemy import event, func, literal_column
+from sqlalchemy.engine import Engine
+
+# text search configuration used for parsing and stemming (PostgreSQL)
+SEARCH_LANGUAGE = "english"
+
+# name of the GIN index and the SQL function registered for the fallback
+JOB_SEARCH_INDEX_NAME = "ix_job_search_document"
+JOB_SEARCH_RANK_FUNCTION = "job_search_rank"
+
+# weighted tsvector over the searchable job fields. The index and the search query must use this exact expression.
+JOB_SEARCH_DOCUMENT_SQL = (
+    f"(setweight(to_tsvector('{SEARCH_LANGUAGE}'::regconfig, coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_LANGUAGE}'::regconfig, coalesce(description, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_LANGUAGE}'::regconfig, coalesce(tags::text, '')), 'C'))"
+)
+
+# DDL for the GIN expression index backing job search (idempotent)
+JOB_SEARCH_INDEX_DDL = f"CREATE INDEX IF NOT EXISTS {JOB_SEARCH_INDEX_NAME} ON job USING gin ({JOB_SEARCH_DOCUMENT_SQL})"
+
+# field weights, same defaults PostgreSQL's ts_rank uses for weights A, B and C
+FIELD_WEIGHTS = {"title": 1.0, "description": 0.4, "tags": 0.2}
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# split a text into lowercase word tokens
+def tokenize(value: Optional[str]) -> list[str]:
+    if not value:
+        return []
+    return [token.lower() for token in _TOKEN_PATTERN.findall(value)]
+
+# terms of a user search query, each one is matched as a word prefix
+def parse_search_query(search_query: Optional[str]) -> list[str]:
+    return tokenize(search_query)
+
+# tsquery text for PostgreSQL, all terms required (AND) and matched as prefixes ("inter" finds "intern")
+def build_tsquery(search_query: Optional[str]) -> Optional[str]:
+    terms = parse_search_query(search_query)
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+# pure Python relevance of a job for a search query, 0.0 when any of the terms is missing
+def rank_job(search_query: Optional[str], title: Optional[str], description: Optional[str], tags: Any) -> float:
+    terms = parse_search_query(search_query)
+    if not terms:
+        return 0.0
+    if isinstance(tags, str): # tags arrive as JSON text from the database
+        try:
+            tags = json.loads(tags)
+        except ValueError:
+            tags = [tags]
+    fields = {
+        "title": tokenize(title),
+        "description": tokenize(description),
+        "tags": tokenize(" ".join(str(tag) for tag in tags or [])),
+    }
+    score = 0.0
+    for term in terms:
+        term_score = 0.0
+        for field, tokens in fields.items():
+            hits = sum(1 for token in tokens if token.startswith(term))
+            if hits:
+                term_score += FIELD_WEIGHTS[field] * (1 + math.log(hits)) # repeated hits count, with diminishing returns
+        if not term_score:
+            return 0.0
+        score += term_score
+    return score / len(terms)
+
+# SQL condition and rank expression searching jobs with the given query, for the given database dialect
+def job_search_clauses(search_query: str, dialect: str) -> tuple[Any, Any]:
+    if dialect == "postgresql":
+        document = literal_column(JOB_SEARCH_DOCUMENT_SQL)
+        tsquery_text = build_tsquery(search_query) or ""
+        tsquery = func.to_tsquery(literal_column(f"'{SEARCH_LANGUAGE}'::regconfig"), tsquery_text)
+        return document.bool_op("@@")(tsquery), func.ts_rank(document, tsquery)
+    from app.models.job import Job # local import, the job model imports this module for its index DDL
+    rank = getattr(func, JOB_SEARCH_RANK_FUNCTION)(search_query, Job.title, Job.description, Job.tags)
+    return rank > 0, rank
+
+# register the pure Python rank function on every new SQLite connection
+@event.listens_for(Engine, "connect")
+def _register_sqlite_search_functions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function(JOB_SEARCH_RANK_FUNCTION, 4, rank_job, deterministic=True)
@@ -2,45 +2,97 @@
 Security utils for authentication and authorization written in this file.
 """
 
+import logging
+import time
+from typing import Optional
 from passlib.context import CryptContext
+from passlib.hash import argon2
 from app.core.config import Config
+from app.core.hashing import password_hash_pool
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from enum import Enum
 from uuid import uuid4, UUID
-from app.models.refreshtoken import RefreshToken
-from sqlmodel import Session
-from fastapi import HTTPException
 from app.models.user import User
-from sqlmodel import select
+from app.schemas.token import TokenClaims
+from app.core.enum import UserRole
 
-# Password hasing context (bcrypt)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_SCHEMES = ("bcrypt", "argon2")
+
+# Password hashing context: new hashes use `scheme` with the configured cost, hashes of the other scheme (when its backend is installed)
+# or of another cost still verify and are reported as needing an update (deprecated="auto", min/max rounds pinned to the configured cost)
+def create_password_context(scheme: Optional[str] = None, bcrypt_rounds: Optional[int] = None, argon2_time_cost: Optional[int] = None, argon2_memory_cost: Optional[int] = None, argon2_parallelism: Optional[int] = None) -> CryptContext:
+    scheme = scheme or Config.PASSWORD_HASH_SCHEME
+    if scheme not in PASSWORD_HASH_SCHEMES:
+        raise ValueError(f"Unknown password hash scheme {scheme!r}, expected one of {PASSWORD_HASH_SCHEMES}")
+    if scheme == "argon2" and not argon2.has_backend(): # optional dependency, only needed by this scheme
+        raise RuntimeError("The argon2 password hash scheme requires argon2-cffi (pip install argon2-cffi)")
+    bcrypt_rounds = bcrypt_rounds or Config.BCRYPT_ROUNDS
+    argon2_time_cost = argon2_time_cost or Config.ARGON2_TIME_COST
+    schemes = [scheme] + [other for other in PASSWORD_HASH_SCHEMES if other != scheme and (other != "argon2" or argon2.has_backend())]
+    settings = {"bcrypt__rounds": bcrypt_rounds, "bcrypt__min_rounds": bcrypt_rounds, "bcrypt__max_rounds": bcrypt_rounds}
+    if "argon2" in schemes:
+        settings.update({
+            "argon2__type": "ID",
+            "argon2__rounds": argon2_time_cost,
+            "argon2__min_rounds": argon2_time_cost,
+            "argon2__max_rounds": argon2_time_cost,
+            "argon2__memory_cost": argon2_memory_cost or Config.ARGON2_MEMORY_COST,
+            "argon2__parallelism": argon2_parallelism or Config.ARGON2_PARALLELISM,
+        })
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+# Password hasing context, from Config
+pwd_context = create_password_context()
 
 class Security:
     # All helper methods defined as a collection of static methods in this class
 
-    # method to hash the plaintext password using bcrypt hashing algorithm 
+    # method to hash the plaintext password using the configured scheme (bcrypt by default), on the password hashing pool (503 when saturated)
     @staticmethod
     def hash_password(password: str) -> str:
-        return pwd_context.hash(password)
+        return password_hash_pool.run(pwd_context.hash, password)
+
+    # check a plaintext password against a stored hash, on the password hashing pool (503 when saturated)
+    @staticmethod
+    def check_password(plain_password: str, hashed_password: str) -> bool:
+        return password_hash_pool.run(pwd_context.verify, plain_password, hashed_password)
+
+    # check a plaintext password and rehash it when the stored hash uses another scheme or cost: (verified, new hash or None)
+    @staticmethod
+    def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        return password_hash_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
 
-    # verify user's password against stored hash.
+    # hash_password for async routes, awaits the password hashing pool without holding a thread
     @staticmethod
-    def verify_password(email: str, plain_password: str, session: Session) -> bool:
-        user=session.exec(select(User).where(User.email==email)).first() # retrieving user
-        if not user:
-            raise HTTPException(status_code=400, detail="User not found")
-        return pwd_context.verify(plain_password, user.password) # verify password using the specified context
+    async def hash_password_async(password: str) -> str:
+        return await password_hash_pool.run_async(pwd_context.hash, password)
+
+    # verify_and_update_password for async routes, awaits the password hashing pool without holding a thread
+    @staticmethod
+    async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        return await password_hash_pool.run_async(pwd_context.verify_and_update, plain_password, hashed_password)
+
+    # authorization claims of the access token issued to a user: role, organization and token version are trusted on read-only routes
+    @staticmethod
+    def access_token_claims(user: User | TokenClaims) -> dict:
+        return {
+            "sub": str(user.id),
+            "role": UserRole(user.role).value,
+            "org": str(user.current_organization) if user.current_organization else None,
+            "ver": user.token_version or 0,
+            "iat": time.time(),
+        }
 
     # method to create access token based on the payload passed as the argument ( a dictionary )
     @staticmethod
     def create_access_token(data: dict) -> str:
         payload = data.copy() # copy the data as payload
         expires_at=payload.get('iat') + int(Config.TOKEN_EXPIRY_TIME) * 60 # get expiry time from time of issue of token in payload 
-        print("Token issued at (iat):", int(payload.get('iat')))
         payload.update({"exp": int(expires_at)}) # add expiry time to payload
-        print("Token expiration time (exp):", int(expires_at))
+        logger.debug("Access token issued", extra={"iat": int(payload.get('iat')), "exp": int(expires_at)})
         payload.update({"type": "access"}) # as we are creating access token, we set the type to access, in payload and update it.
         encoded_jwt = jwt.encode(payload, Config.SECRET_KEY, Config.ALGORITHM) # finally we create the token using jwt.encode(), as per the algorith and key specified in configuration file.
         return encoded_jwt
@@ -58,7 +110,7 @@ class Security:
     @staticmethod
     def create_refresh_token(user_id: UUID, role: str):
         created_at=datetime.now(timezone.utc) # getting the token issue timestamp
-        exp_time=created_at + timedelta(days=20) # getting the expiry time
+        exp_time=created_at + timedelta(days=Config.REFRESH_TOKEN_EXPIRY_TIME) # getting the expiry time
         token_id=str(uuid4()) # creatingthe id of refresh token (jti)
         payload={
             "sub": user_id,
@@ -74,12 +126,4 @@ class Security:
             "token_id": token_id,
             "created_at": created_at,
             "exp": exp_time
-            } # send a dict containing required details
-
-    # a utility to store refresh token 
-    @staticmethod
-    def store_refresh_token(token_id: str, exp_time: datetime, user_id: UUID, session: Session):
-        token=RefreshToken(token_id=token_id, exp=exp_time, user_id=user_id) # create a model instance
-        session.add(token) # adding the token instance
-        session.commit() # committing the action 
-        session.refresh(token) # refreshing the session to get all latest set fileds of the token
\ No newline at end of file
+            } # send a dict containing required details
\ No newline at end of file
@@ -0,0 +1,339 @@
+"""
+Pluggable file storage for resumes.
+
+Backends store files under "/" separated keys (e.g. "blobs/ab/ab12..."):
+- LocalStorage: a directory on this node's disk (UPLOAD_RESUME_DIR), atomic writes through temp file + rename
+- S3Storage: any S3-compatible object store (AWS S3, MinIO, ...), multipart uploads for large files,
+  one client per process so its HTTP connection pool is reused across requests. Needs boto3.
+- InMemoryStorage: a process local dict, for tests and local runs
+
+With a shared backend (S3), any API replica can serve any application's resume.
+The backend is selected by RESUME_STORAGE_BACKEND and built once, see get_storage().
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterable, Iterator, Optional
+from app.core.config import Config
+from app.core.upload import StoredUpload, save_upload, upload_too_large
+
+logger = logging.getLogger(__name__)
+
+# key of a content-addressed file under prefix, fanned out like content_path
+def content_key(prefix: str, digest: str) -> str:
+    return f"{prefix}/{digest[:2]}/{digest}"
+
+class StorageBackend(ABC):
+    # base class of the storage backends, keys are "/" separated relative paths. A backend missing a method fails when it is built
+
+    @abstractmethod
+    def put(self, key: str, fileobj: BinaryIO, size: int):
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        # readable file object over the stored content, to be closed by the caller
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str) -> Iterator[tuple[str, float]]:
+        # (key, last modified unix timestamp) of every file under prefix
+        ...
+
+    @abstractmethod
+    def touch(self, key: str):
+        # refresh the last modified time of a file
+        ...
+
+    def local_path(self, key: str) -> Optional[str]:
+        # path on this node's disk when the backend stores files locally (served with sendfile), None otherwise
+        return None
+
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        # content of bytes [start, end) in bounded chunks
+        with self.open(key) as stored:
+            stored.seek(start)
+            remaining = end - start
+            while remaining > 0 and (chunk := stored.read(min(chunk_size, remaining))):
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        removed = 0
+        for key in keys:
+            if self.exists(key):
+                self.delete(key)
+                removed += 1
+        return removed
+
+    def store_content_addressed(self, fileobj: BinaryIO, prefix: str, max_bytes: int, chunk_size: int) -> StoredUpload:
+        # hash pass over the (spooled) file in bounded chunks, then a single upload when the content is new
+        started = time.perf_counter()
+        hasher = hashlib.sha256()
+        size = 0
+        fileobj.seek(0)
+        while chunk := fileobj.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise upload_too_large(max_bytes)
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        key = content_key(prefix, digest)
+        deduplicated = self.exists(key)
+        if deduplicated:
+            self.touch(key) # keeps the blob out of an in-flight sweep until it is referenced
+        else:
+            fileobj.seek(0)
+            self.put(key, fileobj, size)
+        return StoredUpload(path=key, size=size, seconds=time.perf_counter() - started, digest=digest, deduplicated=deduplicated)
+
+class LocalStorage(StorageBackend):
+    # files in a directory of the local disk, the root defaults to UPLOAD_RESUME_DIR (read on every call)
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+
+    @property
+    def root(self) -> str:
+        return self._root or Config.UPLOAD_RESUME_DIR
+
+    def path(self, key: str) -> str:
+        # local path of a key, keys never escape the root
+        parts = key.split("/")
+        if any(part in ("", ".", "..") for part in parts):
+            raise ValueError(f"Invalid storage key {key!r}")
+        return os.path.join(self.root, *parts)
+
+    def put(self, key: str, fileobj: BinaryIO, size: int):
+        save_upload(fileobj, os.path.dirname(self.path(key)), os.path.basename(key), max_bytes=size)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.path(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str) -> Iterator[tuple[str, float]]:
+        base = self.path(prefix.strip("/"))
+        for directory, _, filenames in os.walk(base):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    modified = os.path.getmtime(path)
+                except FileNotFoundError: # removed concurrently
+                    continue
+                yield os.path.relpath(path, self.root).replace(os.sep, "/"), modified
+
+    def touch(self, key: str):
+        os.utime(self.path(key))
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self.path(key)
+
+    def store_content_addressed(self, fileobj: BinaryIO, prefix: str, max_bytes: int, chunk_size: int) -> StoredUpload:
+        # single pass: hashed while written to a temp file, renamed into place (or dropped when already stored)
+        stored = save_upload(fileobj, self.path(prefix), max_bytes=max_bytes, chunk_size=chunk_size)
+        stored.path = content_key(prefix, stored.digest)
+        return stored
+
+class InMemoryStorage(StorageBackend):
+    # files kept in a dict of this process, for tests and local runs
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files: dict[str, tuple[bytes, float]] = {}
+
+    def put(self, key: str, fileobj: BinaryIO, size: int):
+        content = fileobj.read()
+        with self._lock:
+            self.files[key] = (content, time.time())
+
+    def exists(self, key: str) -> bool:
+        return key in self.files
+
+    def size(self, key: str) -> int:
+        return len(self.files[key][0])
+
+    def open(self, key: str) -> BinaryIO:
+        return io.BytesIO(self.files[key][0])
+
+    def delete(self, key: str):
+        with self._lock:
+            self.files.pop(key, None)
+
+    def list(self, prefix: str) -> Iterator[tuple[str, float]]:
+        with self._lock:
+            entries = [(key, modified) for key, (_, modified) in self.files.items() if key.startswith(prefix)]
+        yield from entries
+
+    def touch(self, key: str):
+        with self._lock:
+            content, _ = self.files[key]
+            self.files[key] = (content, time.time())
+
+# S3 error codes of a missing object or bucket
+_S3_NOT_FOUND = {"404", "NoSuchKey", "NotFound"}
+
+def _is_not_found(error: Exception) -> bool:
+    return str(getattr(error, "response", {}).get("Error", {}).get("Code")) in _S3_NOT_FOUND
+
+class S3Storage(StorageBackend):
+    # objects in an S3-compatible bucket, keys optionally namespaced by prefix
+    MAX_DELETE_BATCH = 1000 # objects per DeleteObjects request
+
+    def __init__(self, bucket: str, prefix: str = "", client=None, endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None,
+                 multipart_chunk_size: int = 8 * 1024 * 1024, max_pool_connections: int = 10):
+        if client is None:
+            try:
+                import boto3
+                from botocore.config import Config as BotoConfig
+            except ImportError as error: # optional dependency, only needed by this backend
+                raise RuntimeError("The s3 resume storage backend requires boto3 (pip install boto3)") from error
+            client = boto3.session.Session().client(
+                "s3",
+                endpoint_url=endpoint_url,
+                region_name=region,
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+                config=BotoConfig(max_pool_connections=max_pool_connections, retries={"max_attempts": 3, "mode": "standard"}),
+            )
+        self.client = client # thread safe, shared by every request of the process (keep-alive connections reused)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.multipart_chunk_size = max(multipart_chunk_size, 5 * 1024 * 1024) # S3 minimum part size
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def put(self, key: str, fileobj: BinaryIO, size: int):
+        if size <= self.multipart_chunk_size:
+            self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=fileobj.read())
+            return
+        # large files: multipart upload, one bounded chunk in memory at a time
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=self._key(key))["UploadId"]
+        try:
+            parts = []
+            while chunk := fileobj.read(self.multipart_chunk_size):
+                part_number = len(parts) + 1
+                response = self.client.upload_part(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id, PartNumber=part_number, Body=chunk)
+                parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+            self.client.complete_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id, MultipartUpload={"Parts": parts})
+        except BaseException:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id) # no orphan parts billed
+            raise
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as error:
+            if _is_not_found(error):
+                return False
+            raise
+
+    def size(self, key: str) -> int:
+        return self.client.head_object(Bucket=self.bucket, Key=self._key(key))["ContentLength"]
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        # ranged GET, only the requested bytes leave the object store
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(key), Range=f"bytes={start}-{end - 1}")["Body"]
+        try:
+            while chunk := body.read(chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        # quiet mode: the response lists the failed keys only, they are logged and not counted
+        keys = list(keys)
+        removed = 0
+        for start in range(0, len(keys), self.MAX_DELETE_BATCH):
+            batch = keys[start:start + self.MAX_DELETE_BATCH]
+            response = self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": [{"Key": self._key(key)} for key in batch], "Quiet": True})
+            errors = response.get("Errors", [])
+            for error in errors:
+                logger.warning("S3 object delete failed", extra={"key": error.get("Key"), "code": error.get("Code"), "error": error.get("Message")})
+            removed += len(batch) - len(errors)
+        return removed
+
+    def list(self, prefix: str) -> Iterator[tuple[str, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for entry in page.get("Contents", []):
+                yield entry["Key"][len(self.prefix):], entry["LastModified"].timestamp()
+
+    def touch(self, key: str):
+        # objects are immutable, an in-place copy refreshes LastModified
+        self.client.copy_object(Bucket=self.bucket, Key=self._key(key), CopySource={"Bucket": self.bucket, "Key": self._key(key)}, MetadataDirective="REPLACE")
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+# build the backend selected by RESUME_STORAGE_BACKEND
+def create_storage(backend: Optional[str] = None) -> StorageBackend:
+    backend = (backend or Config.RESUME_STORAGE_BACKEND).lower()
+    if backend == "local":
+        return LocalStorage()
+    if backend == "memory":
+        return InMemoryStorage()
+    if backend == "s3":
+        if not Config.S3_BUCKET:
+            raise RuntimeError("S3_BUCKET must be set for the s3 resume storage backend")
+        return S3Storage(
+            bucket=Config.S3_BUCKET,
+            prefix=Config.S3_PREFIX,
+            endpoint_url=Config.S3_ENDPOINT_URL,
+            region=Config.S3_REGION,
+            access_key_id=Config.S3_ACCESS_KEY_ID,
+            secret_access_key=Config.S3_SECRET_ACCESS_KEY,
+            multipart_chunk_size=Config.S3_MULTIPART_CHUNK_SIZE,
+            max_pool_connections=Config.S3_MAX_POOL_CONNECTIONS,
+        )
+    raise RuntimeError(f"Unknown resume storage backend {backend!r}, expected local, s3 or memory")
+
+# storage backend of the process, built on first use
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+# replace the storage backend of the process (tests, custom wiring), returns the previous one
+def set_storage(storage: Optional[StorageBackend]) -> Optional[StorageBackend]:
+    global _storage
+    with _storage_lock:
+        previous, _storage = _storage, storage
+    return previous
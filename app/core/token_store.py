@@ -0,0 +1,156 @@
+"""
+Refresh token revocation cache.
+
+Records the refresh token ids (jti) that were revoked (rotated away, logged
+out, owner deleted), until the token would have expired anyway. /auth/refresh
+rejects revoked tokens from this cache without touching the database. The
+database stays authoritative: a token unknown to the cache is checked by the
+rotation write itself. Entries are written after the database commit that
+revoked the token, so the cache never runs ahead of the database.
+
+Backends:
+- InMemoryTokenStore: per process, size bounded. Revocations reach the current worker only.
+- RedisTokenStore: any Redis-protocol server (Redis, Valkey, KeyDB, ...), shared by every
+  API replica so a revocation applies everywhere at once. Needs the redis package.
+  Errors of the server are logged and treated as cache misses.
+
+The backend is selected by TOKEN_STORE_BACKEND and built once, see get_token_store().
+"""
+
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+# value of the revocation entries
+TOKEN_REVOKED = "revoked"
+
+# seconds until a token expiry, at least 1 so that entries always get a TTL
+def _ttl(expires_at: datetime) -> int:
+    return max(int(expires_at.timestamp() - time.time()), 1)
+
+class TokenStore(ABC):
+    # interface of the refresh token revocation cache, a backend missing a method fails when it is built
+
+    # record a revoked refresh token, remembered until it expires
+    @abstractmethod
+    def revoke(self, token_id: str, expires_at: datetime):
+        ...
+
+    # record several revoked refresh tokens, given as (token_id, expires_at)
+    def revoke_many(self, tokens: Iterable[tuple[str, datetime]]):
+        for token_id, expires_at in tokens:
+            self.revoke(token_id, expires_at)
+
+    # whether the cache knows the token as revoked, False when it is unknown
+    @abstractmethod
+    def is_revoked(self, token_id: str) -> bool:
+        ...
+
+class NullTokenStore(TokenStore):
+    # no cache, every refresh goes to the database
+    def revoke(self, token_id: str, expires_at: datetime):
+        pass
+
+    def is_revoked(self, token_id: str) -> bool:
+        return False
+
+class InMemoryTokenStore(TokenStore):
+    # process local entries {token_id: expiry timestamp}, least recently written entries evicted beyond max_size
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def revoke(self, token_id: str, expires_at: datetime):
+        with self._lock:
+            self._entries[token_id] = expires_at.timestamp()
+            self._entries.move_to_end(token_id)
+            while len(self._entries) > self.max_size: # an evicted revocation is still enforced by the database
+                self._entries.popitem(last=False)
+
+    def is_revoked(self, token_id: str) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(token_id)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time(): # expired
+                del self._entries[token_id]
+                return False
+            return True
+
+class RedisTokenStore(TokenStore):
+    # entries are keys "<prefix>:revoked:<token_id>", expiring with the token
+    def __init__(self, url: Optional[str] = None, prefix: str = "jobboard", client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as error: # optional dependency, only needed by this backend
+                raise RuntimeError("The redis token store backend requires redis (pip install redis)") from error
+            client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1, health_check_interval=30)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, token_id: str) -> str:
+        return f"{self.prefix}:revoked:{token_id}"
+
+    def revoke(self, token_id: str, expires_at: datetime):
+        try:
+            self.client.set(self._key(token_id), TOKEN_REVOKED, ex=_ttl(expires_at))
+        except Exception:
+            logger.warning("Token store write failed", exc_info=True)
+
+    # every entry in one round trip
+    def revoke_many(self, tokens: Iterable[tuple[str, datetime]]):
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for token_id, expires_at in tokens:
+                pipeline.set(self._key(token_id), TOKEN_REVOKED, ex=_ttl(expires_at))
+            pipeline.execute()
+        except Exception:
+            logger.warning("Token store write failed", exc_info=True)
+
+    def is_revoked(self, token_id: str) -> bool:
+        try:
+            return self.client.get(self._key(token_id)) is not None
+        except Exception: # the database decides when the cache is unreachable
+            logger.warning("Token store read failed", exc_info=True)
+            return False
+
+_token_store: Optional[TokenStore] = None
+_token_store_lock = threading.Lock()
+
+# build the token store selected by TOKEN_STORE_BACKEND
+def create_token_store(backend: Optional[str] = None) -> TokenStore:
+    backend = (backend or Config.TOKEN_STORE_BACKEND).lower()
+    if backend == "memory":
+        return InMemoryTokenStore(max_size=Config.TOKEN_STORE_MAX_SIZE)
+    if backend == "redis":
+        if not Config.REDIS_URL:
+            raise RuntimeError("REDIS_URL must be set for the redis token store backend")
+        return RedisTokenStore(url=Config.REDIS_URL, prefix=Config.TOKEN_STORE_PREFIX)
+    if backend == "none":
+        return NullTokenStore()
+    raise RuntimeError(f"Unknown token store backend {backend!r}, expected memory, redis or none")
+
+# token store of the process, built on first use
+def get_token_store() -> TokenStore:
+    global _token_store
+    if _token_store is None:
+        with _token_store_lock:
+            if _token_store is None:
+                _token_store = create_token_store()
+    return _token_store
+
+# replace the token store of the process (tests, custom wiring), returns the previous one
+def set_token_store(token_store: Optional[TokenStore]) -> Optional[TokenStore]:
+    global _token_store
+    with _token_store_lock:
+        previous, _token_store = _token_store, token_store
+    return previous
@@ -0,0 +1,183 @@
+"""
+Resume upload pipeline.
+
+Provides:
+- An ASGI middleware capping the request body of upload routes, from Content-Length or while the body streams in
+- Early validation of an uploaded file's content type and size, before any database work
+- Chunked, atomic copies of uploads to disk (temp file in the target directory, then rename), hashed with SHA-256 on the way
+- Content-addressed storage of uploads, identical content is kept once
+- Throughput counters of the stored uploads for the metrics endpoint
+
+Uploads are stored in two passes. Starlette's multipart parser first spools
+the file part (in memory up to 1 MB, in an anonymous temp file beyond), then
+save_upload copies the spooled file to its final location in bounded chunks.
+Resumes over 1 MB are therefore written to disk twice. The spooled temp file
+cannot be renamed into place, and parsing the multipart body ourselves is not
+worth it at UPLOAD_RESUME_MAX_BYTES. The size middleware keeps oversized
+bodies from being spooled at all.
+
+Upload routes are sync path operations: FastAPI runs them in its threadpool, so
+the chunked disk writes never block the event loop.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+# allowance for the multipart boundaries, part headers and text fields sent along with the file
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+# routes accepting resume uploads
+UPLOAD_PATH_PATTERN = r"^/applications/jobs/[^/]+/apply/?$"
+
+class UploadMetrics:
+    # thread safe counters of stored and rejected uploads
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.rejected = 0
+        self.bytes_total = 0
+        self.seconds_total = 0.0
+
+    def record_upload(self, size: int, seconds: float):
+        with self._lock:
+            self.uploads += 1
+            self.bytes_total += size
+            self.seconds_total += seconds
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "uploads": self.uploads,
+                "rejected": self.rejected,
+                "bytes_total": self.bytes_total,
+                "seconds_total": self.seconds_total,
+                "throughput_mb_per_s": (self.bytes_total / self.seconds_total / 1_000_000) if self.seconds_total else 0.0,
+            }
+
+upload_metrics = UploadMetrics()
+
+@dataclass
+class StoredUpload:
+    # outcome of a stored upload
+    path: str # file path, or storage key when stored through a storage backend
+    size: int
+    seconds: float
+    digest: str # SHA-256 of the content, hex
+    deduplicated: bool = False # content was already stored, nothing was written
+
+    @property
+    def throughput(self) -> float: # bytes per second
+        return self.size / self.seconds if self.seconds else 0.0
+
+# path of a content-addressed file under directory, fanned out over 256 subdirectories
+def content_path(directory: str, digest: str) -> str:
+    return os.path.join(directory, digest[:2], digest)
+
+# 413 error for an upload over max_bytes, counted as rejected
+def upload_too_large(max_bytes: int) -> HTTPException:
+    upload_metrics.record_rejected()
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Upload exceeds the maximum size of {max_bytes} bytes")
+
+class UploadSizeLimitMiddleware:
+    # rejects upload requests whose body exceeds max_body_size, before the multipart body is spooled to disk
+    def __init__(self, app, max_body_size: int | None = None, path_pattern: str = UPLOAD_PATH_PATTERN):
+        self.app = app
+        self.max_body_size = max_body_size if max_body_size is not None else Config.UPLOAD_RESUME_MAX_BYTES + FORM_OVERHEAD_BYTES
+        self.path_pattern = re.compile(path_pattern)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not self.path_pattern.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_body_size: # declared size, rejected without reading the body
+            error = upload_too_large(self.max_body_size)
+            await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive():
+            # chunked or understated bodies are cut off as soon as they cross the limit, the exception reaches the app's exception handlers
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise upload_too_large(self.max_body_size)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+# reject uploads of a disallowed content type or size, cheap checks done before any database work
+def validate_upload(upload: UploadFile, max_bytes: int | None = None, content_types: list[str] | None = None):
+    max_bytes = max_bytes if max_bytes is not None else Config.UPLOAD_RESUME_MAX_BYTES
+    content_types = content_types if content_types is not None else Config.UPLOAD_RESUME_CONTENT_TYPES
+    content_type = (upload.content_type or "").split(";")[0].strip().lower()
+    if content_types and content_type not in content_types:
+        upload_metrics.record_rejected()
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=f"Unsupported resume type {content_type or 'unknown'}, allowed: {', '.join(content_types)}")
+    if upload.size is not None and upload.size > max_bytes:
+        raise upload_too_large(max_bytes)
+
+# copy an upload (UploadFile spooled by the multipart parser, or binary file object) to directory/filename in bounded chunks, through a temp file renamed into place once complete.
+# Without a filename the upload is stored content-addressed (see content_path), once per distinct content.
+def save_upload(upload: UploadFile | BinaryIO, directory: str, filename: str | None = None, max_bytes: int | None = None, chunk_size: int | None = None) -> StoredUpload:
+    max_bytes = max_bytes if max_bytes is not None else Config.UPLOAD_RESUME_MAX_BYTES
+    chunk_size = chunk_size or Config.UPLOAD_CHUNK_SIZE
+    source = getattr(upload, "file", upload)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part") # same filesystem, so the rename is atomic
+    started = time.perf_counter()
+    size = 0
+    hasher = hashlib.sha256()
+    deduplicated = False
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            source.seek(0)
+            while chunk := source.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes: # size of the spooled file was not known upfront
+                    raise upload_too_large(max_bytes)
+                hasher.update(chunk)
+                buffer.write(chunk)
+            buffer.flush()
+            os.fsync(buffer.fileno()) # content is on disk before the file becomes visible under its name
+        digest = hasher.hexdigest()
+        path = os.path.join(directory, filename) if filename else content_path(directory, digest)
+        if not filename and os.path.exists(path):
+            try:
+                os.utime(path) # identical content already stored, fresh mtime keeps the blob out of an in-flight sweep until it is referenced
+                deduplicated = True
+            except FileNotFoundError: # swept since the existence check, stored again below
+                pass
+        if deduplicated:
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path): # never leave partial files behind
+            os.remove(temp_path)
+        raise
+    return StoredUpload(path=path, size=size, seconds=time.perf_counter() - started, digest=digest, deduplicated=deduplicated)
+
+# count and log a stored upload
+def record_upload(stored: StoredUpload):
+    upload_metrics.record_upload(stored.size, stored.seconds)
+    logger.info("Upload stored", extra={"path": stored.path, "bytes": stored.size, "deduplicated": stored.deduplicated, "seconds": round(stored.seconds, 6), "throughput_mb_per_s": round(stored.throughput / 1_000_000, 3)})
@@ -6,7 +6,13 @@ and relationship management of job applications.
 """
 
 from sqlmodel import Session, select
-from typing import Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+from fastapi_pagination import Page, Params
+from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from typing import AsyncIterator, Optional
 from uuid import UUID
 from datetime import datetime, timezone
 from app.models.application import Application
@@ -15,7 +21,8 @@ from app.schemas.application import ApplicationCreate, ApplicationUpdate, Applic
 from app.models.job import Job
 from app.crud.job import get_job_by_id
 from app.core.enum import ApplicationStatus
-import os
+from app.core.config import Config
+from app.core.resume_store import remove_legacy_resume
 
 # Business Logic to create application
 def create_application(application: ApplicationCreate, user_id: UUID, job_id: UUID, resume_filename: str, resume_path: str, session: Session) -> ApplicationResponse:
@@ -34,6 +41,30 @@ def create_application(application: ApplicationCreate, user_id: UUID, job_id: UU
     session.refresh(application_instance) # reload the data with latest persisted state
     return ApplicationResponse(id=application_instance.id, user_id=application_instance.user_id, job_id=application_instance.job_id, resume_filename=application_instance.resume_filename, message=application_instance.message, status=application_instance.status, applied_at=application_instance.applied_at, updated_at=application_instance.updated_at)
 
+# raised by apply_to_job when the user already applied to the job
+class DuplicateApplicationError(Exception):
+    pass
+
+# whether an integrity error is a unique constraint violation (PostgreSQL SQLSTATE 23505, SQLite message)
+def _is_unique_violation(error: IntegrityError) -> bool:
+    return getattr(error.orig, "pgcode", None) == "23505" or "UNIQUE constraint failed" in str(error.orig)
+
+# Business logic to apply to a job in one transaction: a single INSERT, duplicates rejected by the (user_id, job_id) unique index
+# and unknown jobs by the job foreign key. Returns None when the job does not exist.
+def apply_to_job(application: ApplicationCreate, user_id: UUID, job_id: UUID, resume_filename: str, resume_path: str, session: Session) -> Optional[ApplicationResponse]:
+    application_instance=Application(**application.model_dump(), user_id=user_id, job_id=job_id, resume_filename=resume_filename, resume_path=resume_path, status=ApplicationStatus.APPLIED)
+    # every column is generated client side (id, applied_at), so the response needs no refresh after the commit
+    response=ApplicationResponse(id=application_instance.id, user_id=application_instance.user_id, job_id=application_instance.job_id, resume_filename=application_instance.resume_filename, message=application_instance.message, status=application_instance.status, applied_at=application_instance.applied_at, updated_at=application_instance.updated_at)
+    session.add(application_instance)
+    try:
+        session.commit()
+    except IntegrityError as error:
+        session.rollback()
+        if _is_unique_violation(error):
+            raise DuplicateApplicationError() from error
+        return None # foreign key violation, the job does not exist
+    return response
+
 # retrieve application from db based on the application id and send it as the response model object
 def get_application_by_id(application_id: UUID, session: Session) -> Optional[ApplicationResponse]:
     application=session.exec(select(Application).where(Application.id==application_id)).first()
@@ -41,20 +72,46 @@ def get_application_by_id(application_id: UUID, session: Session) -> Optional[Ap
         return ApplicationResponse(id=application.id, user_id=application.user_id, job_id=application.job_id, resume_filename=application.resume_filename, message=application.message, status=application.status, applied_at=application.applied_at, updated_at=application.updated_at)
     return None
 
-# retrieve all application pertainng to a particualr job
-def get_application_by_job_id(job_id: UUID, session: Session) -> list[ApplicationResponse]:
-    applications=session.exec(select(Application).where(Application.job_id==job_id)).all()
-    return [ApplicationResponse(id=application.id, user_id=application.user_id, job_id=application.job_id, resume_filename=application.resume_filename, message=application.message, status=application.status, applied_at=application.applied_at, updated_at=application.updated_at) for application in applications]
+# get the model instance of application (resume location included), not the pydantic schema
+def get_application_model_instance(application_id: UUID, session: Session) -> Optional[Application]:
+    return session.exec(select(Application).where(Application.id==application_id)).first()
+
+# page of the applications of a query, filtered by status and ordered by applied_at or updated_at (id as tie breaker so pages are stable)
+# LIMIT/OFFSET and the total COUNT are executed in the database, only the requested page is loaded
+def _applications_page(query: SelectOfScalar[Application], session: Session, status: Optional[ApplicationStatus], order_by: str, order_type: str, params: Optional[Params]) -> Page[ApplicationResponse]:
+    if status:
+        query=query.where(Application.status==status)
+    column=Application.updated_at if order_by=="updated_at" else Application.applied_at
+    query=query.order_by(column.asc(), Application.id.asc()) if order_type=="asc" else query.order_by(column.desc(), Application.id.desc())
+    return paginate(session, query, params, transformer=lambda applications: [ApplicationResponse(id=application.id, user_id=application.user_id, job_id=application.job_id, resume_filename=application.resume_filename, message=application.message, status=application.status, applied_at=application.applied_at, updated_at=application.updated_at) for application in applications])
+
+# retrieve a page of the applications pertainng to a particualr job
+def get_application_by_job_id(job_id: UUID, session: Session, status: Optional[ApplicationStatus] = None, order_by: str = "applied_at", order_type: str = "desc", params: Optional[Params] = None) -> Page[ApplicationResponse]:
+    return _applications_page(select(Application).where(Application.job_id==job_id), session, status, order_by, order_type, params)
+
+# columns of an exported application, the ApplicationResponse fields
+_EXPORT_COLUMNS=[Application.id, Application.user_id, Application.job_id, Application.resume_filename, Application.message, Application.status, Application.applied_at, Application.updated_at]
 
-#  retrieve all applications pertaining to a particular user
-def get_application_by_user_id(user_id: UUID, session: Session) -> list[ApplicationResponse]:
-    applications=session.exec(select(Application).where(Application.user_id==user_id)).all()
-    return [ApplicationResponse(id=application.id, user_id=application.user_id, job_id=application.job_id, resume_filename=application.resume_filename, message=application.message, status=application.status, applied_at=application.applied_at, updated_at=application.updated_at) for application in applications]
+# stream the applications of a job or of every job of a company (async session), in application order.
+# Rows come from a server-side cursor EXPORT_YIELD_PER at a time, plain columns so no ORM instance is kept in the session.
+async def stream_applications_async(session: AsyncSession, job_id: Optional[UUID] = None, company_id: Optional[UUID] = None) -> AsyncIterator[ApplicationResponse]:
+    query=select(*_EXPORT_COLUMNS)
+    if job_id:
+        query=query.where(Application.job_id==job_id)
+    if company_id:
+        query=query.join(Job, Job.id==Application.job_id).where(Job.company_id==company_id)
+    query=query.order_by(Application.applied_at, Application.id).execution_options(yield_per=Config.EXPORT_YIELD_PER)
+    result=await session.stream(query)
+    async for row in result.mappings():
+        yield ApplicationResponse(**row)
 
-# retrieve operation to give list of all application objects present in the system
-def list_applications(session: Session) -> list[ApplicationResponse]: 
-    applications=session.exec(select(Application)).all()
-    return [ApplicationResponse(id=application.id, user_id=application.user_id, job_id=application.job_id, resume_filename=application.resume_filename, message=application.message, status=application.status, applied_at=application.applied_at, updated_at=application.updated_at) for application in applications]
+#  retrieve a page of the applications pertaining to a particular user
+def get_application_by_user_id(user_id: UUID, session: Session, status: Optional[ApplicationStatus] = None, order_by: str = "applied_at", order_type: str = "desc", params: Optional[Params] = None) -> Page[ApplicationResponse]:
+    return _applications_page(select(Application).where(Application.user_id==user_id), session, status, order_by, order_type, params)
+
+# retrieve a page of all the application objects present in the system
+def list_applications(session: Session, status: Optional[ApplicationStatus] = None, order_by: str = "applied_at", order_type: str = "desc", params: Optional[Params] = None) -> Page[ApplicationResponse]:
+    return _applications_page(select(Application), session, status, order_by, order_type, params)
 
 # update operation on application (status update)
 def update_application(application_id: UUID, new_application: ApplicationUpdate, session: Session) -> Optional[ApplicationResponse]:
@@ -68,18 +125,27 @@ def update_application(application_id: UUID, new_application: ApplicationUpdate,
     session.refresh(application)
     return ApplicationResponse(id=application.id, user_id=application.user_id, job_id=application.job_id, resume_filename=application.resume_filename, message=application.message, status=application.status, applied_at=application.applied_at, updated_at=application.updated_at)
 
+# bulk status update of applications of one job: a single UPDATE ... WHERE job_id = ... AND id IN (...) and one commit. Returns the ids updated.
+def update_application_status_bulk(job_id: UUID, application_ids: list[UUID], new_status: ApplicationStatus, session: Session) -> list[UUID]:
+    statement=(
+        update(Application)
+        .where(Application.job_id==job_id, Application.id.in_(application_ids)) # ids of other jobs are left untouched
+        .values(status=new_status, updated_at=datetime.now(timezone.utc))
+        .returning(Application.id)
+    )
+    updated_ids=list(session.exec(statement).scalars())
+    session.commit()
+    return updated_ids
+
 # delete application crud business logic
 def delete_application(application_id: UUID, session: Session) -> bool: 
     application=session.exec(select(Application).where(Application.id==application_id)).first() # retriving application by the id
-    user_id=application.user_id # getting the user id
-    user=session.exec(select(User).where(User.id==user_id)).first() # getting the user
-    resume_path=application.resume_path # gettig resume path
     if not application:
         return False
-    session.delete(application) # deleting application
+    resume_path=application.resume_path # gettig resume path
+    session.delete(application) # deleting application, drops its reference to the resume blob (reclaimed by the sweep)
     session.commit()
-    if resume_path and os.path.exists(resume_path): # deleting associated resume
-        os.remove(resume_path)
+    remove_legacy_resume(resume_path) # per-application resume stored before the blob store
     return True
 
 # linking application to job, adding it to applications field of the job
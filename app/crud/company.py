@@ -6,6 +6,11 @@ and relationship management of companies.
 """
 
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+from sqlalchemy import func
+from fastapi_pagination import Page, Params
+from fastapi_pagination.ext.sqlalchemy import apaginate, paginate
 from typing import Optional
 from uuid import UUID
 from datetime import datetime, timezone
@@ -13,6 +18,11 @@ from app.models.company import Company
 from app.models.user import User
 from app.schemas.company import CompanyCreate, CompanyUpdate, CompanyResponse
 from app.core.security import Security
+from app.core.cache import user_cache
+
+# company response object from the company model instance
+def _company_response(company: Company) -> CompanyResponse:
+    return CompanyResponse(id=company.id, name=company.name, description=company.description, website=company.website, location=company.location, domain=company.domain, company_size=company.company_size, owner_id=company.owner_id)
 
 # company creation business logic
 def create_company(company: CompanyCreate, owner_id: UUID, session: Session) -> CompanyResponse:
@@ -23,19 +33,47 @@ def create_company(company: CompanyCreate, owner_id: UUID, session: Session) ->
     session.add(company_instance)
     session.commit()
     session.refresh(company_instance)
-    return CompanyResponse(id=company_instance.id, name=company_instance.name, description=company_instance.description, website=company_instance.website, location=company_instance.location, domain=company_instance.domain, company_size=company_instance.company_size, owner_id=company_instance.owner_id)
+    return _company_response(company_instance)
 
 # company retrieval business logic
 def get_company_by_id(company_id: UUID, session: Session) -> Optional[CompanyResponse]:
     company=session.exec(select(Company).where(Company.id==company_id)).first()
     if company:
-        return CompanyResponse(id=company.id, name=company.name, description=company.description, website=company.website, location=company.location, domain=company.domain, company_size=company.company_size, owner_id=company.owner_id)
+        return _company_response(company)
+    return None
+
+# company retrieval (async session)
+async def get_company_by_id_async(company_id: UUID, session: AsyncSession) -> Optional[CompanyResponse]:
+    company=(await session.exec(select(Company).where(Company.id==company_id))).first()
+    if company:
+        return _company_response(company)
     return None
 
-#  retriving list of companies from the database
-def list_companies(session: Session) -> list[CompanyResponse]: 
-    companies=session.exec(select(Company)).all()
-    return [CompanyResponse(id=company.id, name=company.name, description=company.description, website=company.website, location=company.location, domain=company.domain, company_size=company.company_size, owner_id=company.owner_id) for company in companies]
+# query of the companies matching the filters, ordered by name or size (id as tie breaker so pages are stable)
+def build_companies_query(domain: Optional[str] = None, # domain filter value, case insensitive
+                          location: Optional[str] = None, # location filter value, partial match
+                          order_by: str = "name", # ordering field, name or company_size
+                          order_type: str = "asc", # order type of companies list
+                          ) -> SelectOfScalar[Company]:
+    query = select(Company)
+    if domain:
+        query = query.where(func.lower(Company.domain)==domain.lower())
+    if location:
+        query = query.where(Company.location.ilike(f"%{location}%"))
+    column = Company.company_size if order_by == "company_size" else Company.name
+    if order_type == "desc":
+        return query.order_by(column.desc(), Company.id.desc())
+    return query.order_by(column.asc(), Company.id.asc())
+
+#  retriving a page of companies from the database, LIMIT/OFFSET and COUNT executed in the database
+def list_companies(session: Session, domain: Optional[str] = None, location: Optional[str] = None, order_by: str = "name", order_type: str = "asc", params: Optional[Params] = None) -> Page[CompanyResponse]:
+    query = build_companies_query(domain=domain, location=location, order_by=order_by, order_type=order_type)
+    return paginate(session, query, params, transformer=lambda companies: [_company_response(company) for company in companies])
+
+#  retriving a page of companies from the database (async session)
+async def list_companies_async(session: AsyncSession, domain: Optional[str] = None, location: Optional[str] = None, order_by: str = "name", order_type: str = "asc", params: Optional[Params] = None) -> Page[CompanyResponse]:
+    query = build_companies_query(domain=domain, location=location, order_by=order_by, order_type=order_type)
+    return await apaginate(session, query, params, transformer=lambda companies: [_company_response(company) for company in companies])
 
 # updating the company data with new data sent to the update route 
 def update_company(company_id: UUID, new_company: CompanyUpdate, session: Session) -> Optional[CompanyResponse]:
@@ -48,7 +86,7 @@ def update_company(company_id: UUID, new_company: CompanyUpdate, session: Sessio
     session.add(company)
     session.commit()
     session.refresh(company)
-    return CompanyResponse(id=company.id, name=company.name, description=company.description, website=company.website, location=company.location, domain=company.domain, company_size=company.company_size, owner_id=company.owner_id)
+    return _company_response(company)
 
 # company deletion 
 def delete_company(company_id: UUID, session: Session) -> bool:
@@ -56,9 +94,12 @@ def delete_company(company_id: UUID, session: Session) -> bool:
     users = session.exec(select(User).where(User.current_organization == company_id)).all()
     for user in users:
         user.current_organization = None
+        user.token_version = (user.token_version or 0) + 1 # revoke access tokens claiming the deleted organization
     company=session.exec(select(Company).where(Company.id==company_id)).first()
     if not company:
         return False
     session.delete(company)
     session.commit()
+    for user in users: # employees' cached organization is stale now
+        user_cache.invalidate(user.id)
     return True
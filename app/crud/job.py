@@ -6,14 +6,29 @@ and relationship management of jobs.
 """
 
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 from datetime import datetime, timezone
-from sqlalchemy import or_
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import binascii
+import json
+from sqlalchemy import func, insert, true, tuple_
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import selectinload
+from sqlmodel.sql.expression import SelectOfScalar
+from fastapi_pagination import Page, Params
+from fastapi_pagination.ext.sqlalchemy import apaginate, paginate
 from app.models.job import Job
 from app.models.application import Application
-from app.schemas.job import JobCreate, JobUpdate, JobResponse
+from app.schemas.job import JobCreate, JobUpdate, JobResponse, JobCursorPage, TagFacet
+from app.schemas.application import ApplicationResponse
 from app.core.enum import ModeOfWork, EmploymentType
+from app.core.search import job_search_clauses, parse_search_query
+
+# convert a job model instance to the response schema, applications are only read when they were loaded
+def _job_response(job: Job, include_applications: bool = False) -> JobResponse:
+    return JobResponse(id=job.id, title=job.title, description=job.description, location=job.location, mode=job.mode, employment_type=job.employment_type, remuneration_range=job.remuneration_range, company_id=job.company_id, tags=job.tags, posted_at=job.posted_at, applications=[ApplicationResponse.model_validate(application, from_attributes=True) for application in job.applications] if include_applications else [])
 
 # Job creation business logic
 def create_job(job: JobCreate, company_id: UUID, session: Session) -> JobResponse:
@@ -26,44 +41,251 @@ def create_job(job: JobCreate, company_id: UUID, session: Session) -> JobRespons
     session.refresh(job_instance)
     return JobResponse(id=job_instance.id, title=job_instance.title, description=job_instance.description, location=job_instance.location, mode=job_instance.mode, employment_type=job_instance.employment_type, remuneration_range=job_instance.remuneration_range, company_id=job_instance.company_id, tags=job_instance.tags, posted_at=job_instance.posted_at, applications=job_instance.applications)
 
+# rows of Job for a bulk insert, ids and posting time generated client side so no RETURNING/refresh is needed
+def _job_rows(jobs: list[JobCreate], company_id: UUID) -> list[dict]:
+    posted_at=datetime.now(timezone.utc)
+    return [{**job.model_dump(), "id": uuid4(), "company_id": company_id, "posted_at": posted_at} for job in jobs]
+
+# Bulk job creation business logic (async session): one multi-row INSERT (executemany) and one commit for the whole batch, returns the new ids in order
+async def create_jobs_bulk_async(jobs: list[JobCreate], company_id: UUID, session: AsyncSession) -> list[UUID]:
+    if not jobs:
+        return []
+    rows=_job_rows(jobs, company_id)
+    await session.execute(insert(Job), rows)
+    await session.commit()
+    return [row["id"] for row in rows]
+
+# query retrieving a job by id, applications are loaded (eagerly, by a second SELECT ... IN query) only when asked for
+def _job_by_id_query(job_id: UUID, include_applications: bool = False) -> SelectOfScalar[Job]:
+    query=select(Job).where(Job.id==job_id)
+    if include_applications:
+        query=query.options(selectinload(Job.applications))
+    return query
+
 # job retrieval by id
-def get_job_by_id(job_id: UUID, session: Session) -> Optional[JobResponse]:
-    job=session.exec(select(Job).where(Job.id==job_id)).first()
+def get_job_by_id(job_id: UUID, session: Session, include_applications: bool = False) -> Optional[JobResponse]:
+    job=session.exec(_job_by_id_query(job_id, include_applications)).first()
     if job:
-        return JobResponse(id=job.id, title=job.title, description=job.description, location=job.location, mode=job.mode, employment_type=job.employment_type, remuneration_range=job.remuneration_range, company_id=job.company_id, tags=job.tags, posted_at=job.posted_at, applications=job.applications)
+        return _job_response(job, include_applications)
     return None
 
-# getting list of jobs with proper search, filter, order and pagination specifications
-def list_jobs(session: Session, # SQLModel session object
-              search_query: Optional[str] = None, # search query
-              location: Optional[str] = None, # loication filter value
-              mode: Optional[ModeOfWork] = None, # mode of work filter
-              employment_type: Optional[EmploymentType] = None, # employment type filter
-              tags: Optional[list[str]] = None, # tags to fiter jobs with
-              order_by: str = "posted_at",  # ordering filed of jobs list
-              order_type : str = "desc", # order type of job list
-              ) -> list[JobResponse]: 
+# job retrieval by id (async session)
+async def get_job_by_id_async(job_id: UUID, session: AsyncSession, include_applications: bool = False) -> Optional[JobResponse]:
+    job=(await session.exec(_job_by_id_query(job_id, include_applications))).first()
+    if job:
+        return _job_response(job, include_applications)
+    return None
+
+# building the job listing query with proper search, filter and order specifications (no rows are loaded here)
+# search is full-text (index-backed tsvector match on PostgreSQL, pure Python rank function elsewhere), order_by="relevance" orders matches by rank
+def build_jobs_query(search_query: Optional[str] = None, # search query
+                     location: Optional[str] = None, # loication filter value
+                     mode: Optional[ModeOfWork] = None, # mode of work filter
+                     employment_type: Optional[EmploymentType] = None, # employment type filter
+                     tags: Optional[list[str]] = None, # tags to fiter jobs with
+                     tag_match: str = "all", # "all": job must have every tag, "any": job must have at least one of them
+                     order_by: Optional[str] = "posted_at",  # ordering filed of jobs list, None leaves the query unordered
+                     order_type : str = "desc", # order type of job list
+                     dialect: str = "postgresql", # database dialect, decides how the search is executed
+                     ) -> SelectOfScalar[Job]:
     query = select(Job)
-    if search_query: # case insensiitive search of jobs wit given query
-        query = query.where(or_(Job.title.ilike(f"%{search_query}%"), Job.description.ilike(f"%{search_query}%")))
+    search_rank = None
+    if search_query and parse_search_query(search_query): # full text search of jobs (title, description and tags) with given query
+        search_condition, search_rank = job_search_clauses(search_query, dialect)
+        query = query.where(search_condition)
     if location: # filter based on location
         query = query.where(Job.location.ilike(f"%{location}%"))
     if mode: # filter based on mode of work
         query = query.where(Job.mode==mode)
     if employment_type: # filter based on employment type
         query = query.where(Job.employment_type==employment_type)
-    if tags: # filter based on tags
-        query = query.where(Job.tags.contains(tags))
-    if order_by == "posted_at": # setting order based on field provided
+    if tags: # filter based on tags, both operators are served by the GIN index on tags
+        if tag_match == "any":
+            query = query.where(Job.tags.has_any(array(tags)))
+        else:
+            query = query.where(Job.tags.contains(tags))
+    if order_by == "relevance" and search_rank is not None: # best matches first, latest jobs first among equally relevant ones
+        query = query.order_by(search_rank.desc(), Job.posted_at.desc(), Job.id.desc())
+    elif order_by in ("posted_at", "relevance"): # setting order based on field provided
         if order_type == "asc": # setting ascending order
-            query = query.order_by(Job.posted_at.asc())
+            query = query.order_by(Job.posted_at.asc(), Job.id.asc())
         else: # setting descending order
-            query = query.order_by(Job.posted_at.desc())
-    jobs=session.exec(query).all() # retrieve all jobs matching above criteria
-    return [JobResponse(id=job.id, title=job.title, description=job.description, location=job.location, mode=job.mode, employment_type=job.employment_type, remuneration_range=job.remuneration_range, company_id=job.company_id, tags=job.tags, posted_at=job.posted_at, applications=job.applications) for job in jobs]
+            query = query.order_by(Job.posted_at.desc(), Job.id.desc())
+    return query
+
+# getting a page of jobs with proper search, filter, order and pagination specifications
+# LIMIT/OFFSET and the total COUNT are both executed in the database, only the requested page is loaded
+def list_jobs(session: Session, # SQLModel session object
+              search_query: Optional[str] = None, # search query
+              location: Optional[str] = None, # loication filter value
+              mode: Optional[ModeOfWork] = None, # mode of work filter
+              employment_type: Optional[EmploymentType] = None, # employment type filter
+              tags: Optional[list[str]] = None, # tags to fiter jobs with
+              tag_match: str = "all", # match every tag (all) or at least one of them (any)
+              order_by: str = "posted_at",  # ordering filed of jobs list
+              order_type : str = "desc", # order type of job list
+              params: Optional[Params] = None, # page number and size, resolved from the request when not passed
+              include_applications: bool = False, # load applications of the jobs in the page (one batched query)
+              ) -> Page[JobResponse]:
+    query = build_jobs_query(search_query=search_query, location=location, mode=mode, employment_type=employment_type, tags=tags, tag_match=tag_match, order_by=order_by, order_type=order_type, dialect=session.get_bind().dialect.name)
+    if include_applications: # applications of the whole page fetched with a single SELECT ... WHERE job_id IN (...)
+        query = query.options(selectinload(Job.applications))
+    return paginate(session, query, params, transformer=lambda jobs: [_job_response(job, include_applications) for job in jobs]) # only the current page is converted to response objects
+
+# getting a page of jobs (async session), same filters and pagination as list_jobs
+async def list_jobs_async(session: AsyncSession, # SQLModel async session object
+                          search_query: Optional[str] = None, # search query
+                          location: Optional[str] = None, # loication filter value
+                          mode: Optional[ModeOfWork] = None, # mode of work filter
+                          employment_type: Optional[EmploymentType] = None, # employment type filter
+                          tags: Optional[list[str]] = None, # tags to fiter jobs with
+                          tag_match: str = "all", # match every tag (all) or at least one of them (any)
+                          order_by: str = "posted_at",  # ordering filed of jobs list
+                          order_type : str = "desc", # order type of job list
+                          params: Optional[Params] = None, # page number and size, resolved from the request when not passed
+                          include_applications: bool = False, # load applications of the jobs in the page (one batched query)
+                          ) -> Page[JobResponse]:
+    query = build_jobs_query(search_query=search_query, location=location, mode=mode, employment_type=employment_type, tags=tags, tag_match=tag_match, order_by=order_by, order_type=order_type, dialect=session.get_bind().dialect.name)
+    if include_applications:
+        query = query.options(selectinload(Job.applications))
+    return await apaginate(session, query, params, transformer=lambda jobs: [_job_response(job, include_applications) for job in jobs])
+
+# per-tag job counts (facets) over the jobs matching the given search and filters, computed in the database
+def count_jobs_by_tag(session: Session, # SQLModel session object
+                      search_query: Optional[str] = None, # search query
+                      location: Optional[str] = None, # loication filter value
+                      mode: Optional[ModeOfWork] = None, # mode of work filter
+                      employment_type: Optional[EmploymentType] = None, # employment type filter
+                      tags: Optional[list[str]] = None, # tags to fiter jobs with
+                      tag_match: str = "all", # match every tag (all) or at least one of them (any)
+                      limit: int = 50, # maximum number of tags returned, most used first
+                      ) -> list[TagFacet]:
+    jobs_query = build_jobs_query(search_query=search_query, location=location, mode=mode, employment_type=employment_type, tags=tags, tag_match=tag_match, order_by=None, dialect=session.get_bind().dialect.name)
+    return [TagFacet(tag=row[0], count=row[1]) for row in session.exec(_tag_facets_query(jobs_query, limit)).all()]
+
+# per-tag job counts (async session), same filters as count_jobs_by_tag
+async def count_jobs_by_tag_async(session: AsyncSession, # SQLModel async session object
+                                  search_query: Optional[str] = None, # search query
+                                  location: Optional[str] = None, # loication filter value
+                                  mode: Optional[ModeOfWork] = None, # mode of work filter
+                                  employment_type: Optional[EmploymentType] = None, # employment type filter
+                                  tags: Optional[list[str]] = None, # tags to fiter jobs with
+                                  tag_match: str = "all", # match every tag (all) or at least one of them (any)
+                                  limit: int = 50, # maximum number of tags returned, most used first
+                                  ) -> list[TagFacet]:
+    jobs_query = build_jobs_query(search_query=search_query, location=location, mode=mode, employment_type=employment_type, tags=tags, tag_match=tag_match, order_by=None, dialect=session.get_bind().dialect.name)
+    return [TagFacet(tag=row[0], count=row[1]) for row in (await session.exec(_tag_facets_query(jobs_query, limit))).all()]
+
+# query counting jobs per tag over the jobs selected by the given job query
+def _tag_facets_query(jobs_query: SelectOfScalar[Job], limit: int):
+    jobs = jobs_query.subquery()
+    tags_table = func.jsonb_array_elements_text(jobs.c.tags).table_valued("value").lateral("job_tag") # one row per (job, tag) pair
+    tag = tags_table.c.value
+    job_count = func.count(jobs.c.id).label("count")
+    return select(tag, job_count).select_from(jobs).join(tags_table, true()).group_by(tag).order_by(job_count.desc(), tag).limit(limit)
+
+# encode the (posted_at, id) position of a job and the paging direction into an opaque cursor string
+def _encode_job_cursor(job: Job, direction: str) -> str:
+    raw = json.dumps({"posted_at": job.posted_at.isoformat(), "id": str(job.id), "direction": direction})
+    return urlsafe_b64encode(raw.encode()).decode()
+
+# decode a cursor back into (posted_at, id, direction), None if the cursor is malformed
+def _decode_job_cursor(cursor: str) -> Optional[tuple[datetime, UUID, str]]:
+    try:
+        data = json.loads(urlsafe_b64decode(cursor.encode()))
+        direction = data["direction"]
+        if direction not in ("next", "prev"):
+            return None
+        return datetime.fromisoformat(data["posted_at"]), UUID(data["id"]), direction
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+# restricting and ordering a job query for a keyset (cursor) page, returns None if the cursor passed is invalid
+# the cursor becomes a WHERE condition on the (posted_at, id) index instead of an OFFSET
+def _cursor_page_query(query: SelectOfScalar[Job], order_type: str, cursor: Optional[str], size: int) -> Optional[tuple[SelectOfScalar[Job], str]]:
+    descending = order_type != "asc"
+    direction = "next"
+    position = tuple_(Job.posted_at, Job.id)
+    if cursor:
+        decoded = _decode_job_cursor(cursor)
+        if not decoded:
+            return None
+        posted_at, job_id, direction = decoded
+        # moving forward in descending order (or backward in ascending order) means looking at smaller keys
+        if descending == (direction == "next"):
+            query = query.where(position < tuple_(posted_at, job_id))
+        else:
+            query = query.where(position > tuple_(posted_at, job_id))
+    # walking backwards is done by reversing the order, the page is flipped back afterwards
+    if descending == (direction == "next"):
+        query = query.order_by(Job.posted_at.desc(), Job.id.desc())
+    else:
+        query = query.order_by(Job.posted_at.asc(), Job.id.asc())
+    return query.limit(size + 1), direction # one extra row tells whether another page exists
+
+# building the cursor page out of the (size + 1) rows fetched by the cursor page query
+def _cursor_page(jobs: list[Job], direction: str, cursor: Optional[str], size: int, include_applications: bool) -> JobCursorPage:
+    has_more = len(jobs) > size
+    jobs = jobs[:size]
+    if direction == "prev":
+        jobs.reverse()
+    next_cursor = None
+    previous_cursor = None
+    if jobs:
+        if direction == "prev" or has_more:
+            next_cursor = _encode_job_cursor(jobs[-1], "next")
+        if (direction == "next" and cursor) or (direction == "prev" and has_more):
+            previous_cursor = _encode_job_cursor(jobs[0], "prev")
+    items = [_job_response(job, include_applications) for job in jobs]
+    return JobCursorPage(items=items, size=size, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+# getting a page of jobs through keyset (cursor) pagination, ordered by (posted_at, id)
+# deep pages cost the same as the first one, returns None if the cursor passed is invalid
+def list_jobs_by_cursor(session: Session, # SQLModel session object
+                        search_query: Optional[str] = None, # search query
+                        location: Optional[str] = None, # loication filter value
+                        mode: Optional[ModeOfWork] = None, # mode of work filter
+                        employment_type: Optional[EmploymentType] = None, # employment type filter
+                        tags: Optional[list[str]] = None, # tags to fiter jobs with
+                        tag_match: str = "all", # match every tag (all) or at least one of them (any)
+                        order_type : str = "desc", # order type of job list
+                        cursor: Optional[str] = None, # cursor received from a previous page, None for the first page
+                        size: int = 50, # number of jobs in a page
+                        include_applications: bool = False, # load applications of the jobs in the page (one batched query)
+                        ) -> Optional[JobCursorPage]:
+    query = build_jobs_query(search_query=search_query, location=location, mode=mode, employment_type=employment_type, tags=tags, tag_match=tag_match, order_by=None, dialect=session.get_bind().dialect.name)
+    if include_applications:
+        query = query.options(selectinload(Job.applications))
+    page_query = _cursor_page_query(query, order_type, cursor, size)
+    if not page_query:
+        return None
+    query, direction = page_query
+    return _cursor_page(list(session.exec(query).all()), direction, cursor, size, include_applications)
+
+# getting a page of jobs through keyset (cursor) pagination (async session), same behaviour as list_jobs_by_cursor
+async def list_jobs_by_cursor_async(session: AsyncSession, # SQLModel async session object
+                                    search_query: Optional[str] = None, # search query
+                                    location: Optional[str] = None, # loication filter value
+                                    mode: Optional[ModeOfWork] = None, # mode of work filter
+                                    employment_type: Optional[EmploymentType] = None, # employment type filter
+                                    tags: Optional[list[str]] = None, # tags to fiter jobs with
+                                    tag_match: str = "all", # match every tag (all) or at least one of them (any)
+                                    order_type : str = "desc", # order type of job list
+                                    cursor: Optional[str] = None, # cursor received from a previous page, None for the first page
+                                    size: int = 50, # number of jobs in a page
+                                    include_applications: bool = False, # load applications of the jobs in the page (one batched query)
+                                    ) -> Optional[JobCursorPage]:
+    query = build_jobs_query(search_query=search_query, location=location, mode=mode, employment_type=employment_type, tags=tags, tag_match=tag_match, order_by=None, dialect=session.get_bind().dialect.name)
+    if include_applications:
+        query = query.options(selectinload(Job.applications))
+    page_query = _cursor_page_query(query, order_type, cursor, size)
+    if not page_query:
+        return None
+    query, direction = page_query
+    return _cursor_page(list((await session.exec(query)).all()), direction, cursor, size, include_applications)
 
 # job Update business logic
-def update_job(job_id: UUID, new_job: JobUpdate, session: Session) -> Optional[JobResponse]:
+def update_job(job_id: UUID, new_job: JobUpdate, session: Session, include_applications: bool = False) -> Optional[JobResponse]:
     job=session.exec(select(Job).where(Job.id==job_id)).first()
     if not job:
         return None
@@ -73,7 +295,7 @@ def update_job(job_id: UUID, new_job: JobUpdate, session: Session) -> Optional[J
     session.add(job)
     session.commit()
     session.refresh(job)
-    return JobResponse(id=job.id, title=job.title, description=job.description, location=job.location, mode=job.mode, employment_type=job.employment_type, remuneration_range=job.remuneration_range, company_id=job.company_id, tags=job.tags, posted_at=job.posted_at, applications=job.applications)
+    return _job_response(job, include_applications)
 
 # job deletion logic
 def delete_job(job_id: UUID, session: Session) -> bool:
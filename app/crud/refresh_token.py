@@ -0,0 +1,103 @@
+"""
+Refresh token repository.
+
+Refresh tokens are looked up, rotated and revoked by their jti (token_id),
+which is unique and indexed. A rotation replaces the jti of the row in a
+single UPDATE ... RETURNING, so a refresh token can be used once: of two
+concurrent refreshes with the same token, only one finds the row.
+
+Revoked tokens are also recorded in the token store (app.core.token_store),
+once the revocation is committed, which lets /auth/refresh reject them
+without a database round trip.
+
+Expired and revoked rows are deleted in batches by a periodic purge.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, or_, update
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import Config
+from app.core.token_store import get_token_store
+from app.models.refreshtoken import RefreshToken
+from app.models.user import User
+from app.schemas.token import TokenClaims
+
+logger = logging.getLogger(__name__)
+
+# add the refresh token row to the session, committed by the caller (along with the rest of its transaction)
+def add_refresh_token(token_id: str, exp: datetime, user_id: UUID, session: Session | AsyncSession):
+    session.add(RefreshToken(token_id=token_id, exp=exp, user_id=user_id))
+
+# rotate a live refresh token (expiring at exp) of user_id to a new jti and expiry in one statement and commit. The statement also returns
+# the current authorization claims of the owner, so a refresh needs no other query. Returns None when the token is unknown, revoked,
+# expired, was already rotated or belongs to another user; tokens the token store knows as revoked are rejected without touching the database.
+def rotate_refresh_token(token_id: str, exp: datetime, user_id: UUID, new_token_id: str, new_exp: datetime, session: Session) -> Optional[TokenClaims]:
+    token_store = get_token_store()
+    if token_store.is_revoked(token_id):
+        return None
+    statement = (
+        update(RefreshToken)
+        .where(RefreshToken.token_id==token_id, RefreshToken.user_id==user_id, RefreshToken.revoked==False, RefreshToken.exp > datetime.now(timezone.utc), RefreshToken.user_id==User.id)
+        .values(token_id=new_token_id, exp=new_exp)
+        .returning(User.id, User.role, User.current_organization, User.token_version)
+    )
+    owner = session.exec(statement).first()
+    session.commit()
+    if not owner: # nothing recorded for ids matching no row, the cache only holds tokens that were issued
+        return None
+    token_store.revoke(token_id, exp) # rotated away, replays are rejected by the cache
+    return TokenClaims(id=owner.id, role=owner.role, current_organization=owner.current_organization, token_version=owner.token_version or 0)
+
+# revoke a refresh token, returns whether it existed
+def revoke_refresh_token(token_id: str, session: Session) -> bool:
+    statement = update(RefreshToken).where(RefreshToken.token_id==token_id).values(revoked=True).returning(RefreshToken.exp)
+    exp = session.exec(statement).scalar_one_or_none()
+    session.commit()
+    if exp is None:
+        return False
+    get_token_store().revoke(token_id, exp)
+    return True
+
+# delete every refresh token of a user, committed by the caller. Returns the (token_id, exp) of the deleted tokens, for the caller to
+# revoke in the token store (revoke_in_token_store) once committed.
+def delete_user_refresh_tokens(user_id: UUID, session: Session) -> list[tuple[str, datetime]]:
+    statement = delete(RefreshToken).where(RefreshToken.user_id==user_id).returning(RefreshToken.token_id, RefreshToken.exp)
+    return [(token_id, exp) for token_id, exp in session.exec(statement).all()]
+
+# record committed revocations, given as (token_id, exp), in the token store
+def revoke_in_token_store(tokens: list[tuple[str, datetime]]):
+    if tokens:
+        get_token_store().revoke_many(tokens)
+
+# delete expired and revoked refresh tokens, batch_size rows per statement and transaction, returns the number of rows deleted
+def purge_refresh_tokens(session: Session, batch_size: Optional[int] = None) -> int:
+    batch_size = batch_size or Config.REFRESH_TOKEN_PURGE_BATCH
+    removed = 0
+    while True:
+        batch = select(RefreshToken.id).where(or_(RefreshToken.exp <= datetime.now(timezone.utc), RefreshToken.revoked==True)).limit(batch_size)
+        deleted = session.exec(delete(RefreshToken).where(RefreshToken.id.in_(batch.scalar_subquery()))).rowcount
+        session.commit() # short transactions, locks are released between batches
+        removed += deleted
+        if deleted < batch_size:
+            break
+    logger.info("Refresh token purge done", extra={"removed": removed})
+    return removed
+
+# background task purging refresh tokens every REFRESH_TOKEN_PURGE_INTERVAL seconds, the purge itself runs in the threadpool
+async def run_refresh_token_purger(session_factory, interval: Optional[float] = None):
+    interval = interval if interval is not None else Config.REFRESH_TOKEN_PURGE_INTERVAL
+    def purge_once():
+        with session_factory() as session:
+            return purge_refresh_tokens(session)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(purge_once)
+        except Exception:
+            logger.exception("Refresh token purge failed")
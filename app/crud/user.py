@@ -7,23 +7,29 @@ related authentication data cleanup.
 """
 
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi_pagination import Page, Params
+from fastapi_pagination.ext.sqlalchemy import paginate
 from typing import Optional
 from uuid import UUID
 from datetime import datetime, timezone
 from app.models.user import User
-from app.models.refreshtoken import RefreshToken
+from app.crud.refresh_token import delete_user_refresh_tokens, revoke_in_token_store
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
 from app.core.security import Security
+from app.core.enum import UserRole
+from app.core.cache import user_cache, cache_user
 
-# business logic for user creation, used by register api
-def create_user(session: Session, user: UserCreate) -> UserResponse:
-    if (session.exec(select(User).where(User.email == user.email)).first()): # checking if user with email already exists 
+# business logic for user creation, used by register api (async session). The password is hashed on the password hashing pool, awaited
+# without holding a thread; the transaction of the email check is ended before, so no connection is held during the hash
+async def create_user_async(session: AsyncSession, user: UserCreate) -> Optional[UserResponse]:
+    if (await session.exec(select(User.id).where(User.email == user.email))).first(): # checking if user with email already exists
         return None # return none if it already does
-    hashed_password = Security.hash_password(user.password) # hash the password otherwise using the security util
+    await session.rollback() # releases the connection until the insert
+    hashed_password = await Security.hash_password_async(user.password) # hash the password otherwise using the security util
     user_instance=User(email=user.email, user_name=user.user_name,password=hashed_password, role=user.role, current_organization=user.current_organization) # create a user model instance
     session.add(user_instance) # add user instance to db sesion
-    session.commit() # commit the change
-    session.refresh(user_instance) # reload instance for latest data
+    await session.commit() # commit the change, attributes stay loaded (expire_on_commit=False)
     return UserResponse(id=user_instance.id, user_name=user_instance.user_name, email=user_instance.email, role=user_instance.role, created_at=user_instance.created_at, updated_at=user_instance.updated_at, current_organization=user_instance.current_organization)
 
 # user retrieval by email
@@ -48,16 +54,51 @@ def get_user_model_instance(user_id: UUID, session: Session) -> Optional[User]:
         return user
     return None
 
-#  API to list all users
-def list_users(session: Session) -> list[UserResponse]: 
-    users=session.exec(select(User)).all()
-    return [UserResponse(id=user.id, user_name=user.user_name, email=user.email, role=user.role, created_at=user.created_at, updated_at=user.updated_at, current_organization=user.current_organization) for user in users]
+# user retrival through id (async session)
+async def get_user_by_id_async(user_id: UUID, session: AsyncSession) -> Optional[UserResponse]:
+    user=await session.get(User, user_id)
+    if user:
+        return UserResponse(id=user.id, user_name=user.user_name, email=user.email, role=user.role, created_at=user.created_at, updated_at=user.updated_at, current_organization=user.current_organization)
+    return None
+
+# get the model instance of user (async session)
+async def get_user_model_instance_async(user_id: UUID, session: AsyncSession) -> Optional[User]:
+    user=(await session.exec(select(User).where(User.id==user_id))).first()
+    if user:
+        return user
+    return None
+
+# get the model instance of user through email (login)
+def get_user_model_instance_by_email(session: Session, email: str) -> Optional[User]:
+    return session.exec(select(User).where(User.email==email)).first()
+
+# get the model instance of user through email (login, async session)
+async def get_user_model_instance_by_email_async(session: AsyncSession, email: str) -> Optional[User]:
+    return (await session.exec(select(User).where(User.email==email))).first()
+
+#  page of users, filtered by role and organization
+def list_users(session: Session,
+               role: Optional[UserRole] = None, # role filter
+               current_organization: Optional[UUID] = None, # organization filter
+               order_by: str = "created_at", # ordering field, created_at, user_name or email
+               order_type: str = "desc", # order type of users list
+               params: Optional[Params] = None, # page number and size, resolved from the request when not passed
+               ) -> Page[UserResponse]:
+    query=select(User)
+    if role:
+        query=query.where(User.role==role)
+    if current_organization:
+        query=query.where(User.current_organization==current_organization)
+    column={"user_name": User.user_name, "email": User.email}.get(order_by, User.created_at)
+    query=query.order_by(column.asc(), User.id.asc()) if order_type=="asc" else query.order_by(column.desc(), User.id.desc()) # id as tie breaker so pages are stable
+    return paginate(session, query, params, transformer=lambda users: [UserResponse(id=user.id, user_name=user.user_name, email=user.email, role=user.role, created_at=user.created_at, updated_at=user.updated_at, current_organization=user.current_organization) for user in users]) # LIMIT/OFFSET and COUNT executed in the database
 
 # Business Logic to update a user
 def update_user(user_id: UUID, new_user: UserUpdate, session: Session) -> Optional[UserResponse]:
     user=session.exec(select(User).where(User.id==user_id)).first()
     if not user:
         return None
+    revoke_tokens = (new_user.password != None) or (new_user.role != None and new_user.role != user.role) or (new_user.current_organization != None and new_user.current_organization != user.current_organization)
     # set only those fields which are passed as request
     if new_user.user_name != None:
         user.user_name=new_user.user_name
@@ -69,10 +110,13 @@ def update_user(user_id: UUID, new_user: UserUpdate, session: Session) -> Option
         user.role=new_user.role
     if new_user.current_organization != None:
         user.current_organization=new_user.current_organization
+    if revoke_tokens: # access tokens carrying the old role/organization claims stop being accepted
+        user.token_version=(user.token_version or 0) + 1
     user.updated_at=datetime.now(timezone.utc) # set updated time for user
     session.add(user)
     session.commit()
     session.refresh(user)
+    cache_user(user) # refresh the cached auth snapshot, this worker then also rejects tokens of the previous version
     return UserResponse(id=user.id, user_name=user.user_name, email=user.email, role=user.role, created_at=user.created_at, updated_at=user.updated_at, current_organization=user.current_organization)
 
 # Business logic to delete a user
@@ -80,7 +124,9 @@ def delete_user(user_id: UUID, session: Session) -> bool:
     user=session.exec(select(User).where(User.id==user_id)).first() # retrieve user through id
     if not user:
         return False
-    session.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete(synchronize_session=False) # delete all refresh tokens belonging to the user
+    tokens=delete_user_refresh_tokens(user_id, session) # delete all refresh tokens belonging to the user
     session.delete(user) # delete the user
     session.commit()
+    revoke_in_token_store(tokens) # only once the deletion is committed
+    user_cache.invalidate(user_id) # deleted users must stop authenticating
     return True
\ No newline at end of file
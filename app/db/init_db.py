@@ -6,11 +6,29 @@ This module is responsible for creating all database tables defined using SQLMod
 
 from .session import db_session_manager
 from sqlmodel import SQLModel
+from sqlalchemy import text
+from app.core.config import Config
+from app.core.search import JOB_SEARCH_INDEX_DDL
+from app.core.resume_store import migrate_legacy_blob_paths
 from app.models.user import User
 from app.models.company import Company
 from app.models.application import Application
 from app.models.job import Job
+from app.models.refreshtoken import RefreshToken
 
 def init_db():
     # Initializing database. Creating all tables (imported as models) if they dont already exist in database
-    SQLModel.metadata.create_all(db_session_manager.engine)
\ No newline at end of file
+    SQLModel.metadata.create_all(db_session_manager.engine)
+    with db_session_manager.engine.begin() as conn:
+        # indexes declared on the models are also provisioned on tables created before they were declared
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("DROP INDEX IF EXISTS ix_refreshtoken_token_id")) # non-unique jti index, superseded by uq_refreshtoken_token_id
+            conn.execute(text("DROP INDEX IF EXISTS ix_application_user_id")) # covered by the leading column of uq_application_user_id_job_id
+            conn.execute(text("DROP INDEX IF EXISTS ix_application_job_id_user_id")) # job lookups served by ix_application_job_id_applied_at_id, the pair by uq_application_user_id_job_id
+            conn.execute(text(JOB_SEARCH_INDEX_DDL)) # full-text search index for jobs
+            conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0')) # access token version counter on tables created before it was declared
+        if Config.RESUME_STORAGE_BACKEND == "local":
+            migrate_legacy_blob_paths(conn) # blob paths of the first content-addressed layout, same files as the local backend keys
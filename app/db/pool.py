@@ -0,0 +1,116 @@
+"""
+Connection pool configuration and metrics.
+
+Provides:
+- Engine keyword arguments for the pool, built from Config
+- Queue pools (sync and async adapted) timing how long every checkout waits for a connection
+- A snapshot of the live pool state (checked out, overflow, waits) for the metrics endpoint
+"""
+
+import threading
+import time
+from typing import Any
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import ArgumentError, NoSuchModuleError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.config import Config
+
+class PoolMetrics:
+    # thread safe counters of connection checkouts, shared by every pool created for an engine
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record_checkout(self, wait_time: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_time_total_ms": self.wait_time_total * 1000,
+                "wait_time_max_ms": self.wait_time_max * 1000,
+                "wait_time_avg_ms": (self.wait_time_total / self.checkouts * 1000) if self.checkouts else 0.0,
+            }
+
+class _TimedPoolMixin:
+    # times the wait for a connection on every checkout from the pool, and keeps its configured max_overflow for the stats
+    metrics: PoolMetrics
+    max_overflow: int
+
+    def __init__(self, *args, metrics: PoolMetrics | None = None, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.metrics = metrics or PoolMetrics()
+        self.max_overflow = max_overflow
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError: # pool exhausted for pool_timeout seconds
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # pools are recreated on dispose/invalidation, counters carry over to the new pool
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    # QueuePool for the sync engine
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    # QueuePool for the async (asyncpg) engine
+    pass
+
+# engine keyword arguments configuring the pool from Config
+def pool_options(async_engine: bool = False) -> dict[str, Any]:
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if async_engine else TimedQueuePool,
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_timeout": Config.DB_POOL_TIMEOUT,
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_pre_ping": Config.DB_POOL_PRE_PING,
+    }
+
+# async engine keyword arguments for url: the timed async pool needs an asyncio driver, with any other driver SQLAlchemy's
+# defaults are kept and create_async_engine reports the missing async driver itself
+def async_pool_options(url: str | None) -> dict[str, Any]:
+    try:
+        is_async = make_url(url).get_dialect().is_async
+    except (ArgumentError, NoSuchModuleError): # no or malformed URL, reported when the engine is created
+        is_async = False
+    return pool_options(async_engine=True) if is_async else {}
+
+# live state of an engine's pool, with the checkout counters when the pool is timed
+def pool_stats(name: str, pool) -> dict:
+    stats: dict[str, Any] = {"name": name, "pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0), # negative while the pool is still filling up
+        })
+    if isinstance(pool, _TimedPoolMixin):
+        stats["max_overflow"] = pool.max_overflow
+    metrics = getattr(pool, "metrics", None)
+    if isinstance(metrics, PoolMetrics):
+        stats.update(metrics.snapshot())
+    return stats
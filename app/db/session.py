@@ -1,10 +1,16 @@
 """
-Creating SQLAlchemy engine and providing session dependency for api endpoints 
+Creating SQLAlchemy engines and providing session dependencies for api endpoints.
+A sync engine/session serves the existing routes, an async (asyncpg) engine/session serves the routes opted in to the async request path.
+The async engine is created on first use, so importing the application (scripts, tooling) works with any database URL.
 """
 
+import threading
 from sqlmodel import Session, create_engine
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from typing import AsyncGenerator, Generator
 from app.core.config import Config
+from app.db.pool import async_pool_options, pool_options
 
 class DatabaseSession:
     # wraps SQLModel engine and provides session generator
@@ -15,8 +21,31 @@ class DatabaseSession:
         with Session(self.engine) as session:
             yield session
 
-# creae sqlalchemy engine using database url passed
-engine= create_engine(Config.DATABASE_URL, echo=True)
+class AsyncDatabaseSession:
+    # wraps SQLModel async engine and provides async session generator, awaiting queries without holding a threadpool worker.
+    # The engine is created from url on first use
+    def __init__(self, url: str, **engine_options):
+        self.url = url
+        self.engine_options = engine_options
+        self._engine: AsyncEngine | None = None
+        self._lock = threading.Lock()
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = create_async_engine(self.url, **self.engine_options)
+        return self._engine
+    async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
+        # yield async database session, attributes stay readable after commit (no implicit lazy refresh on await-less access)
+        async with AsyncSession(self.engine, expire_on_commit=False) as session:
+            yield session
+
+# creae sqlalchemy engine using database url passed, pool configured from Config. SQL logging goes through app.core.logger (LOG_LEVELS)
+engine= create_engine(Config.DATABASE_URL, **pool_options())
 
 # shared session manager instance across application
-db_session_manager = DatabaseSession(engine)
\ No newline at end of file
+db_session_manager = DatabaseSession(engine)
+
+# shared async session manager instance across application, its engine reaches the same database through the asyncpg driver
+async_db_session_manager = AsyncDatabaseSession(Config.ASYNC_DATABASE_URL, **async_pool_options(Config.ASYNC_DATABASE_URL))
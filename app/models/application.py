@@ -7,7 +7,7 @@ from typing import Optional, TYPE_CHECKING
 from app.core.enum import ApplicationStatus
 from datetime import datetime, timezone
 from uuid import UUID, uuid4
-from sqlalchemy import Column, Enum as SAEnum
+from sqlalchemy import Column, Index, Enum as SAEnum
 
 if TYPE_CHECKING: # to prevent circular imports
     from app.models.job import Job
@@ -15,12 +15,17 @@ if TYPE_CHECKING: # to prevent circular imports
 
 # Model class, inheriting from SQLModel
 class Application(SQLModel, table=True):
+    __table_args__ = (
+        Index("uq_application_user_id_job_id", "user_id", "job_id", unique=True), # one application per user and job, enforced by the database on insert, also serves user_id lookups
+        Index("ix_application_job_id_applied_at_id", "job_id", "applied_at", "id"), # applications of a job, paginated and already in applied_at order
+        Index("ix_application_user_id_applied_at_id", "user_id", "applied_at", "id"), # paginated applications of a user, already in applied_at order
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True, index=True) # application id
     user_id: UUID = Field(foreign_key="user.id", nullable=False) # user id
     job_id: UUID = Field(foreign_key="job.id", nullable=False) # job id associated with
     job: Optional["Job"] = Relationship(back_populates="applications") # job it is related to
     resume_filename: str = Field(nullable=False) # name of resume file
-    resume_path: str = Field(nullable=False) # path at which the file is stored
+    resume_path: str = Field(nullable=False, index=True) # path at which the file is stored, content-addressed blobs are shared by applications with the same resume
     message : Optional[str] = Field(default=None, nullable=True) # message shared by user allong with the application
     status: ApplicationStatus = Field(sa_column=SAEnum(ApplicationStatus, name="applicationstatus", native_enum=True, validate_strings=True, nullable=False), default=ApplicationStatus.APPLIED) # Application status, default and initial is APPLIED, values taken from ApplicationStatus enum class
     applied_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), nullable=False) # timestamp of application
@@ -12,4 +12,4 @@ class Company(SQLModel, table=True):
     location: Optional[str] = Field(default=None, nullable=True) # location of th company
     domain: Optional[str] = Field(default=None, nullable=True) # domain the coompany works in
     company_size: int = Field(default=0, nullable=False) # total workforce ofthe company
-    owner_id: UUID = Field(foreign_key="user.id", nullable=False) # user_id of the company owner (the one who created the company)
\ No newline at end of file
+    owner_id: UUID = Field(foreign_key="user.id", nullable=False, index=True) # user_id of the company owner (the one who created the company)
\ No newline at end of file
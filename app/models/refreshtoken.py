@@ -1,12 +1,17 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from uuid import UUID, uuid4
 from datetime import datetime, timedelta, timezone
 from app.core.config import Config
 
 # Model for storing refresh token metadata
 class RefreshToken(SQLModel, table=True):
+    __table_args__ = (
+        Index("uq_refreshtoken_token_id", "token_id", unique=True), # lookup and rotation by jti, one row per jti
+        Index("ix_refreshtoken_exp", "exp"), # batched purge of expired tokens
+    )
     id: UUID=Field(default_factory=uuid4, primary_key=True, index=True) # id of the model instance
-    token_id: str=str(uuid4()) # jti (jwt token id ) stored
+    token_id: str=Field(default_factory=lambda: str(uuid4()), nullable=False) # jti (jwt token id ) stored, replaced on every rotation
     exp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc) + timedelta(days=Config.REFRESH_TOKEN_EXPIRY_TIME), nullable=False) # time stamp of token expiry
-    user_id: UUID = Field(foreign_key="user.id", nullable=False) # user_id for the user who created the tokens
-    revoked: bool=Field(default=False) #boolean ield to check whether the token is recvoked or not
\ No newline at end of file
+    user_id: UUID = Field(foreign_key="user.id", nullable=False, index=True) # user_id for the user who created the tokens
+    revoked: bool=Field(default=False) #boolean ield to check whether the token is recvoked or not
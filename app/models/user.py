@@ -16,5 +16,6 @@ class User(SQLModel, table=True):
     role: UserRole = Field(sa_column=SAEnum(UserRole, name="userrole", native_enum=True, validate_strings=True, nullable=False), default=UserRole.CANDIDATE) # user role, default CANDIDATE, takes value from UserRole enum class
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), nullable=False) # timestamp of creation
     updated_at: Optional[datetime] = Field(default=None, nullable=True) # timestamp of update
-    current_organization: Optional[UUID] = Field(default=None, nullable=True, foreign_key="company.id") # id of company user is currently associated with
+    current_organization: Optional[UUID] = Field(default=None, nullable=True, foreign_key="company.id", index=True) # id of company user is currently associated with
+    token_version: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": "0"}) # bumped when role, organization or password change, access tokens of older versions are revoked
     applications: List["Application"] = Relationship(back_populates="user") # List of applications associated with the user
\ No newline at end of file
@@ -6,10 +6,11 @@ for application-related API endpoints.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
 from app.core.enum import ApplicationStatus
+from app.core.config import Config
 
 class ApplicationCreate(BaseModel):
     # SCHEMA FOR APPLICATION CREATION PAYLOAD, ONLY MESSAGE TO BE SENT
@@ -19,6 +20,18 @@ class ApplicationUpdate(BaseModel):
     # SCHEMA FOR APPLICATION UPDATE PAYLOAD, ONLY STATUS TO BE SENT IN REQUEST
     status: ApplicationStatus
 
+class ApplicationBulkStatusUpdate(BaseModel):
+    # SCHEMA FOR BULK STATUS UPDATE PAYLOAD, APPLICATIONS OF ONE JOB MOVED TO THE SAME STATUS
+    application_ids: List[UUID] = Field(min_length=1, max_length=Config.APPLICATION_BULK_MAX_IDS)
+    status: ApplicationStatus
+
+class ApplicationBulkStatusResult(BaseModel):
+    # SCHEMA FOR BULK STATUS UPDATE RESPONSES, IDS NOT UPDATED ARE UNKNOWN OR BELONG TO ANOTHER JOB
+    job_id: UUID
+    status: ApplicationStatus
+    updated: int
+    not_found: List[UUID] = []
+
 class ApplicationResponse(BaseModel):
     # SCHEMA FOR RESPONSE RECIEVED FROM APPLICATION APIS
     id: UUID
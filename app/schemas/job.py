@@ -6,11 +6,11 @@ used by job API endpoints.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 from uuid import UUID
 from app.core.enum import EmploymentType, ModeOfWork
-from app.models.application import Application
+from app.schemas.application import ApplicationResponse
 
 class JobCreate(BaseModel):
     # SCHEMA FOR JOB CREATION
@@ -44,4 +44,32 @@ class JobResponse(BaseModel):
     company_id : UUID
     tags: List[str] = []
     posted_at : datetime
-    applications: List["Application"]=[]
\ No newline at end of file
+    applications: List[ApplicationResponse]=[] # only with include=applications, for admins and recruiters of the company
+
+class JobCursorPage(BaseModel):
+    # SCHEMA FOR KEYSET (CURSOR) PAGINATED JOB LISTINGS, CURSORS ARE OPAQUE TO CLIENTS
+    items: List[JobResponse]
+    size: int
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+
+
+class TagFacet(BaseModel):
+    # SCHEMA FOR PER-TAG JOB COUNTS
+    tag: str
+    count: int
+
+
+class JobBulkResult(BaseModel):
+    # SCHEMA FOR THE OUTCOME OF ONE ROW OF A BULK JOB IMPORT
+    index: int
+    status: Literal["created", "error"]
+    id: Optional[UUID] = None
+    errors: Optional[List[str]] = None
+
+class JobBulkResponse(BaseModel):
+    # SCHEMA FOR BULK JOB IMPORT RESPONSES, ONE RESULT PER ROW IN REQUEST ORDER
+    created: int
+    failed: int
+    truncated: bool = False # NDJSON stream longer than JOB_BULK_MAX_ROWS, rows from index JOB_BULK_MAX_ROWS on were not read
+    results: List[JobBulkResult]
@@ -0,0 +1,53 @@
+"""
+Pydantic schemas for runtime metrics endpoints.
+"""
+
+from pydantic import BaseModel
+from typing import Optional
+
+class PoolStats(BaseModel):
+    # SCHEMA FOR DATABASE CONNECTION POOL STATS
+    name: str
+    pool_class: str
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_time_total_ms: float = 0.0
+    wait_time_max_ms: float = 0.0
+    wait_time_avg_ms: float = 0.0
+
+class CacheStats(BaseModel):
+    # SCHEMA FOR IN-PROCESS CACHE STATS
+    name: str
+    size: int
+    max_size: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+class UploadStats(BaseModel):
+    # SCHEMA FOR RESUME UPLOAD STATS
+    uploads: int
+    rejected: int
+    bytes_total: int
+    seconds_total: float
+    throughput_mb_per_s: float
+
+class PasswordHashStats(BaseModel):
+    # SCHEMA FOR PASSWORD HASHING POOL STATS
+    workers: int
+    queue_size: int
+    pending: int
+    completed: int
+    rejected: int
+    latency_avg_ms: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_max_ms: float
+    queue_wait_avg_ms: float
@@ -1,4 +1,7 @@
 from pydantic import BaseModel
+from typing import Optional
+from uuid import UUID
+from app.core.enum import UserRole
 
 class Token(BaseModel):
     # BASE TOKEN SCHEMA
@@ -11,4 +14,11 @@ class AccessToken(Token):
 
 class RefreshToken(Token):
     # SCHEMA FOR REFRESH TOKEN RESPONSES, INHERITS TOKEN MODEL
-    refresh_token: str
\ No newline at end of file
+    refresh_token: str
+
+class TokenClaims(BaseModel):
+    # SCHEMA FOR THE AUTHORIZATION CLAIMS CARRIED BY A VERIFIED ACCESS TOKEN (stateless principal, no user row loaded)
+    id: UUID
+    role: UserRole
+    current_organization: Optional[UUID] = None
+    token_version: int = 0
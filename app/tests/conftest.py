@@ -5,6 +5,9 @@ import os
 import pytest
 from sqlmodel import Session, create_engine, SQLModel
 from app.db.session import DatabaseSession
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 from main import app
 from app.models.user import User
@@ -12,7 +15,7 @@ from app.core.security import Security
 from uuid import uuid4 
 from app.core.config import Config
 from jose import jwt
-from app.db.session import db_session_manager
+from app.db.session import db_session_manager, async_db_session_manager
 from app.tests.factory import user_payload
 from sqlalchemy import text
 from app.core.enum import UserRole, ApplicationStatus, ModeOfWork, EmploymentType
@@ -26,6 +29,9 @@ TEST_DATABASE_URL=Config.TEST_DATABASE_URL
 # Create a separate engine for tests
 engine=create_engine(TEST_DATABASE_URL, echo=True)
 
+# Async engine on the test database. TestClient runs every request on a fresh event loop, so connections are not pooled across requests
+async_engine=create_async_engine(Config.TEST_ASYNC_DATABASE_URL, echo=True, poolclass=NullPool)
+
 # Drops and recreates the public schema. Resets DB before every test
 def reset_db(engine):
     with engine.begin() as conn:
@@ -46,13 +52,24 @@ def db_session(db_engine):
     with Session(db_engine) as session:
         yield session       
 
+# Sync engine under the async test engine, for event listeners on the statements of async routes.
+@pytest.fixture(scope="session")
+def async_db_engine(db_engine):
+    return async_engine.sync_engine
+
 # Overrides the application's database dependency to use the test database instead of production.
 def override_get_session():
     with Session(engine) as session:
         yield session
 
+# Overrides the application's async database dependency to use the test database instead of production.
+async def override_get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
 # Apply dependency override for all tests
 app.dependency_overrides[db_session_manager.get_session] = override_get_session
+app.dependency_overrides[async_db_session_manager.get_session] = override_get_async_session
 
 # Provides a FastAPI TestClient instance for API testing.
 @pytest.fixture(scope="session")
@@ -194,6 +211,7 @@ def temp_upload_dir(tmp_path, monkeypatch):
     temp_dir = tmp_path / "resumes"
     temp_dir.mkdir()
     monkeypatch.setenv("UPLOAD_RESUME_DIR", str(temp_dir))
+    monkeypatch.setattr(Config, "UPLOAD_RESUME_DIR", str(temp_dir)) # Config is loaded once, at import
     return temp_dir
 
 # Applies to a job with a resume upload and returns the created application.
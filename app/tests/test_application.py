@@ -2,12 +2,33 @@
 Tests for application-related API endpoints.
 
 These tests cover:
-- Creating job applications
+- Creating job applications in a single statement
 - Retrieving applications
-- Updating application status
+- Updating application status, one at a time and in bulk
 - Deleting applications
+- Resume upload limits and atomic writes
+- Resume deduplication and the sweep of unreferenced resumes, racing with applications re-using them
+- Resume downloads
+- Streamed NDJSON / CSV exports
 """
 
+import csv
+import hashlib
+import io
+import json
+import os
+from uuid import UUID, uuid4
+from sqlalchemy import event, update
+from sqlmodel import Session
+import pytest
+from fastapi import HTTPException, UploadFile
+from app.core.config import Config
+from app.core.upload import save_upload
+from app.core.resume_store import count_resume_references, migrate_legacy_blob_paths, remove_legacy_resume, sweep_resume_blobs
+from app.core.storage import InMemoryStorage, get_storage, set_storage
+from app.models.application import Application
+from app.models.user import User
+from app.core.cache import user_cache
 from app.core.enum import ApplicationStatus, UserRole, EmploymentType, ModeOfWork
 
 # Test that a candidate can successfully apply for a job.
@@ -18,6 +39,62 @@ def test_create_application(client, auth_headers, application_payload, get_creat
     response=client.post(f"/applications/jobs/{job_id}/apply", headers=headers, data=application_payload, files={"resume":("test_resume.pdf", content, "application/pdf")})
     assert response.status_code==201
 
+# Test that applying is a single INSERT, with duplicates and unknown jobs rejected by the database.
+def test_apply_single_statement(client, auth_headers, application_payload, get_created_job, temp_upload_dir, db_engine):
+    url=f"/applications/jobs/{get_created_job['id']}/apply"
+    headers=auth_headers(UserRole.CANDIDATE)
+    client.get("/users/me", headers=headers) # warm the user cache, authentication needs no query
+    statements=[]
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        response=client.post(url, headers=headers, data=application_payload, files={"resume":("resume.pdf", b"resume", "application/pdf")})
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+    assert response.status_code==201
+    assert [statement.split()[0] for statement in statements]==["INSERT"]
+    response=client.post(url, headers=headers, data=application_payload, files={"resume":("resume.pdf", b"resume", "application/pdf")})
+    assert response.status_code==403
+    response=client.post(f"/applications/jobs/{uuid4()}/apply", headers=headers, data=application_payload, files={"resume":("resume.pdf", b"resume", "application/pdf")})
+    assert response.status_code==404
+
+# Test that resumes of a disallowed type or size are rejected before anything is stored.
+def test_create_application_upload_limits(client, auth_headers, application_payload, get_created_job, temp_upload_dir, monkeypatch):
+    url=f"/applications/jobs/{get_created_job['id']}/apply"
+    headers=auth_headers(UserRole.CANDIDATE)
+    response=client.post(url, headers=headers, data=application_payload, files={"resume":("resume.exe", b"MZ", "application/octet-stream")})
+    assert response.status_code==415
+    oversized=b"x" * (Config.UPLOAD_RESUME_MAX_BYTES + 128 * 1024) # body over the middleware limit
+    response=client.post(url, headers=headers, data=application_payload, files={"resume":("resume.pdf", oversized, "application/pdf")})
+    assert response.status_code==413
+    monkeypatch.setattr(Config, "UPLOAD_RESUME_MAX_BYTES", 10)
+    response=client.post(url, headers=headers, data=application_payload, files={"resume":("resume.pdf", b"x" * 11, "application/pdf")})
+    assert response.status_code==413
+    assert list(temp_upload_dir.iterdir()) == []
+
+# Test that uploads are written in chunks and that failed writes leave no partial file.
+def test_save_upload(tmp_path):
+    stored=save_upload(UploadFile(io.BytesIO(b"a" * 10), filename="resume.pdf"), str(tmp_path), "resume.pdf", max_bytes=10, chunk_size=3)
+    assert stored.size==10 and (tmp_path / "resume.pdf").read_bytes()==b"a" * 10
+    with pytest.raises(HTTPException) as error:
+        save_upload(UploadFile(io.BytesIO(b"a" * 11), filename="big.pdf"), str(tmp_path), "big.pdf", max_bytes=10, chunk_size=3)
+    assert error.value.status_code==413
+    assert sorted(path.name for path in tmp_path.iterdir())==["resume.pdf"]
+
+# Test that a blob swept between the existence check and the mtime refresh of a deduplicated upload is stored again.
+def test_save_upload_swept_blob(tmp_path, monkeypatch):
+    stored=save_upload(io.BytesIO(b"swept resume"), str(tmp_path))
+    utime=os.utime
+    def swept_utime(path, *args, **kwargs):
+        os.remove(path) # the sweep wins the race
+        return utime(path, *args, **kwargs)
+    monkeypatch.setattr(os, "utime", swept_utime)
+    again=save_upload(io.BytesIO(b"swept resume"), str(tmp_path))
+    assert again.path==stored.path and not again.deduplicated
+    assert open(again.path, "rb").read()==b"swept resume"
+    assert not [path for path in tmp_path.iterdir() if path.name.endswith(".part")]
+
 # Test retrieving applications by ID, job, and user.
 def test_get_application(client, auth_headers, get_created_job, get_created_application):
     job_id=get_created_job["id"]
@@ -28,6 +105,10 @@ def test_get_application(client, auth_headers, get_created_job, get_created_appl
     assert response.status_code==200
     response=client.get(f"/applications/jobs/{job_id}", headers=headers)
     assert response.status_code==200
+    assert [application["id"] for application in response.json()["items"]]==[application_id]
+    response=client.get(f"/applications/jobs/{job_id}?status=REJECTED", headers=headers)
+    assert response.json()["total"]==0
+    assert client.get(f"/applications/jobs/{job_id}?order_by=message", headers=headers).status_code==422
     user_reponse=client.get("/users/me", headers=headers)
     assert user_reponse.status_code == 200
     data = user_reponse.json()
@@ -35,6 +116,9 @@ def test_get_application(client, auth_headers, get_created_job, get_created_appl
     user_id=data["id"]
     response=client.get(f"/applications/users/{user_id}", headers=headers)
     assert response.status_code==200
+    assert response.json()["items"]==[] # a recruiter never applied
+    response=client.get(f"/applications/users/{get_created_application['user_id']}?status=APPLIED&order_type=asc", headers=headers)
+    assert [application["id"] for application in response.json()["items"]]==[application_id]
 
 # Test that a recruiter can update application status.
 def test_application_status_update(client, auth_headers, get_created_application):
@@ -43,9 +127,145 @@ def test_application_status_update(client, auth_headers, get_created_application
     response=client.put(f"/applications/{application_id}/?new_status=APPLIED", headers=headers)
     assert response.status_code==200
 
+# Test that a recruiter of the job's company moves many applications with one UPDATE, unknown ids reported.
+def test_application_status_bulk_update(client, auth_headers, application_payload, get_created_job, temp_upload_dir, db_engine):
+    job_id=get_created_job["id"]
+    application_ids=[]
+    for _ in range(3):
+        response=client.post(f"/applications/jobs/{job_id}/apply", headers=auth_headers(UserRole.CANDIDATE), data=application_payload, files={"resume": ("resume.pdf", b"bulk resume", "application/pdf")})
+        application_ids.append(response.json()["id"])
+    unknown=str(uuid4())
+    headers=auth_headers(role=UserRole.RECRUITER, current_organization=get_created_job["company_id"])
+    statements=[]
+    def count_update(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            statements.append(statement)
+    event.listen(db_engine, "before_cursor_execute", count_update)
+    try:
+        response=client.patch(f"/applications/jobs/{job_id}/status", json={"application_ids": application_ids+[unknown], "status": "REJECTED"}, headers=headers)
+    finally:
+        event.remove(db_engine, "before_cursor_execute", count_update)
+    assert response.status_code==200
+    assert response.json()=={"job_id": job_id, "status": "REJECTED", "updated": 3, "not_found": [unknown]}
+    assert len(statements)==1
+    response=client.get(f"/applications/{application_ids[0]}", headers=headers)
+    assert response.json()["status"]=="REJECTED"
+    other_recruiter=auth_headers(role=UserRole.RECRUITER) # recruiter of no company
+    assert client.patch(f"/applications/jobs/{job_id}/status", json={"application_ids": application_ids, "status": "APPLIED"}, headers=other_recruiter).status_code==403
+    assert client.patch(f"/applications/jobs/{uuid4()}/status", json={"application_ids": application_ids, "status": "APPLIED"}, headers=headers).status_code==404
+    assert client.patch(f"/applications/jobs/{job_id}/status", json={"application_ids": [], "status": "APPLIED"}, headers=headers).status_code==422
+
+# Test that a recruiter demoted after login can no longer bulk update applications with its earlier access token.
+def test_application_status_bulk_update_demoted(client, auth_headers, get_created_application, db_session):
+    job_id=get_created_application["job_id"]
+    company_id=client.get(f"/jobs/{job_id}").json()["company_id"]
+    headers=auth_headers(role=UserRole.RECRUITER, current_organization=company_id)
+    payload={"application_ids": [get_created_application["id"]], "status": "REJECTED"}
+    assert client.patch(f"/applications/jobs/{job_id}/status", json=payload, headers=headers).status_code==200
+    user_id=UUID(client.get("/users/me", headers=headers).json()["id"])
+    db_session.exec(update(User).where(User.id==user_id).values(role=UserRole.CANDIDATE))
+    db_session.commit()
+    user_cache.invalidate(user_id) # as on a worker that never cached this user
+    assert client.patch(f"/applications/jobs/{job_id}/status", json=payload, headers=headers).status_code==403
+
+# Test that applications of a job and of a company are exported as NDJSON and CSV, to recruiters of the company only.
+def test_export_applications(client, auth_headers, get_created_application):
+    job_id=get_created_application["job_id"]
+    company_id=client.get(f"/jobs/{job_id}").json()["company_id"]
+    headers=auth_headers(role=UserRole.RECRUITER, current_organization=company_id)
+    response=client.get(f"/applications/jobs/{job_id}/export", headers=headers)
+    assert response.status_code==200
+    assert response.headers["content-type"]=="application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()]==[get_created_application]
+    response=client.get(f"/applications/companies/{company_id}/export?format=csv", headers=headers)
+    assert response.status_code==200
+    assert response.headers["content-disposition"]==f'attachment; filename="applications-company-{company_id}.csv"'
+    rows=list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["id"], row["status"]) for row in rows]==[(get_created_application["id"], "APPLIED")]
+    assert client.get(f"/applications/jobs/{job_id}/export", headers=auth_headers(role=UserRole.RECRUITER)).status_code==403
+    assert client.get(f"/applications/jobs/{job_id}/export", headers=auth_headers(UserRole.CANDIDATE)).status_code==403
+    assert client.get(f"/applications/jobs/{uuid4()}/export", headers=headers).status_code==404
+    assert client.get(f"/applications/jobs/{job_id}/export?format=xml", headers=headers).status_code==422
+
 # Test that a recruiter can delete an application.
 def test_delete_application(client, auth_headers, get_created_application):
     headers=auth_headers(role=UserRole.RECRUITER)
     application_id=get_created_application["id"]
     response=client.delete(f"/applications/{application_id}", headers=headers)
     assert response.status_code==204
+
+# Test that identical resumes are stored once and reclaimed by the sweep when no application references them.
+def test_resume_deduplication_and_sweep(client, auth_headers, application_payload, get_created_job, temp_upload_dir, db_session):
+    application_ids=[]
+    for _ in range(2): # two candidates sending the same file
+        headers=auth_headers(UserRole.CANDIDATE)
+        response=client.post(f"/applications/jobs/{get_created_job['id']}/apply", headers=headers, data=application_payload, files={"resume":("resume.pdf", b"same resume", "application/pdf")})
+        assert response.status_code==201
+        application_ids.append(response.json()["id"])
+    paths={db_session.get(Application, UUID(application_id)).resume_path for application_id in application_ids}
+    assert len(paths)==1
+    resume_path=paths.pop()
+    assert os.path.basename(resume_path)==hashlib.sha256(b"same resume").hexdigest()
+    assert count_resume_references(resume_path, db_session)==2
+    admin_headers=auth_headers(UserRole.ADMIN)
+    assert client.delete(f"/applications/{application_ids[0]}", headers=admin_headers).status_code==204
+    db_session.expire_all()
+    assert sweep_resume_blobs(db_session, grace_seconds=0)==0 # still referenced by the second application
+    assert get_storage().exists(resume_path)
+    assert client.delete(f"/applications/{application_ids[1]}", headers=admin_headers).status_code==204
+    assert sweep_resume_blobs(db_session, grace_seconds=0)==1
+    assert not get_storage().exists(resume_path)
+
+# Test that blob paths of the first content-addressed layout are migrated to storage keys and never deleted with one application.
+def test_migrate_legacy_blob_paths(client, get_created_application, temp_upload_dir, db_engine, db_session):
+    application=db_session.get(Application, UUID(get_created_application["id"]))
+    key=application.resume_path
+    legacy_path=os.path.join(str(temp_upload_dir), *key.split("/"))
+    with db_engine.begin() as conn:
+        conn.execute(update(Application).where(Application.id==application.id).values(resume_path=legacy_path))
+    remove_legacy_resume(legacy_path)
+    assert os.path.exists(legacy_path) # shared blob, left to the sweep
+    with db_engine.begin() as conn:
+        assert migrate_legacy_blob_paths(conn)>=1
+    db_session.expire_all()
+    assert db_session.get(Application, application.id).resume_path==key
+
+# Test that a blob re-used by an application is stored again when a sweep removes it before the application is committed.
+def test_resume_sweep_race(client, auth_headers, application_payload, get_created_job, db_engine):
+    class SweptOnTouch(InMemoryStorage):
+        def touch(self, key):
+            super().touch(key)
+            with Session(db_engine) as session: # sweep that picked the blob before it was re-used
+                assert sweep_resume_blobs(session, grace_seconds=-1)==1
+    storage=SweptOnTouch()
+    previous=set_storage(storage)
+    try:
+        url=f"/applications/jobs/{get_created_job['id']}/apply"
+        response=client.post(url, headers=auth_headers(UserRole.CANDIDATE), data=application_payload, files={"resume":("resume.pdf", b"swept resume", "application/pdf")})
+        assert client.delete(f"/applications/{response.json()['id']}", headers=auth_headers(UserRole.ADMIN)).status_code==204
+        headers=auth_headers(UserRole.CANDIDATE)
+        response=client.post(url, headers=headers, data=application_payload, files={"resume":("resume.pdf", b"swept resume", "application/pdf")})
+        assert response.status_code==201
+        response=client.get(f"/applications/{response.json()['id']}/resume", headers=headers)
+        assert response.status_code==200 and response.content==b"swept resume"
+    finally:
+        set_storage(previous)
+
+# Test resume download access rules, ETag revalidation and byte ranges.
+def test_download_resume(client, auth_headers, get_created_job, get_created_application):
+    url=f"/applications/{get_created_application['id']}/resume"
+    headers=auth_headers(role=UserRole.RECRUITER, current_organization=get_created_job["company_id"])
+    response=client.get(url, headers=headers)
+    assert response.status_code==200
+    assert response.content==b"test resume content"
+    etag=response.headers["etag"]
+    assert etag=='"' + hashlib.sha256(b"test resume content").hexdigest() + '"'
+    assert response.headers["cache-control"].startswith("private")
+    response=client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code==304 and response.content==b""
+    response=client.get(url, headers={**headers, "Range": "bytes=5-10"})
+    assert response.status_code==206
+    assert response.content==b"resume"
+    assert response.headers["content-range"]=="bytes 5-10/19"
+    assert client.get(url, headers=auth_headers(UserRole.CANDIDATE)).status_code==403 # not the applicant
+    assert client.get(url, headers=auth_headers(UserRole.RECRUITER)).status_code==403 # other organization
@@ -3,11 +3,28 @@ Tests for authentication endpoints.
 
 Covers:
 - User registration
-- User login
-- Token refresh
+- User login, in one user lookup and one transaction
+- Token refresh, rotation and the purge of expired / revoked refresh tokens
+- Password hash cost and scheme upgrades on login
+- Authorization claims of access tokens and their revocation
 """
 
 
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+import pytest
+from jose import jwt
+from passlib.hash import argon2
+from sqlalchemy import event
+from sqlmodel import Session, select
+from app.core import security
+from app.core.security import create_password_context
+from app.models.user import User
+from app.models.refreshtoken import RefreshToken as RefreshTokenModel
+from app.crud.refresh_token import add_refresh_token, purge_refresh_tokens, revoke_refresh_token, rotate_refresh_token
+from app.core.config import Config
+from app.core.token_store import InMemoryTokenStore, get_token_store, set_token_store
+from app.core.enum import UserRole
 from app.tests.factory import user_payload
 
 # Test user registration.
@@ -33,9 +50,111 @@ def test_login(client):
     response=client.post("/auth/login", json=dirty_payload)
     assert response.status_code==401
 
-# Test refreshing an access token using a refresh token.
+# Test that a login runs a single SELECT of the user, ends its transaction before the password check, then a single INSERT and COMMIT.
+def test_login_single_transaction(client, async_db_engine):
+    payload=user_payload()
+    assert client.post("/auth/register", json=payload).status_code==201
+    events=[]
+    def record(conn, cursor, statement, parameters, context, executemany):
+        events.append(statement.lstrip().split()[0].upper())
+    def record_rollback(conn):
+        events.append("ROLLBACK")
+    def record_commit(conn):
+        events.append("COMMIT")
+    listeners=(("before_cursor_execute", record), ("rollback", record_rollback), ("commit", record_commit))
+    for name, listener in listeners:
+        event.listen(async_db_engine, name, listener)
+    try:
+        response=client.post("/auth/login", json=payload)
+    finally:
+        for name, listener in listeners:
+            event.remove(async_db_engine, name, listener)
+    assert response.status_code==200
+    assert events==["SELECT", "ROLLBACK", "INSERT", "COMMIT"] # no transaction open while the password is checked
+    assert client.post("/auth/login", json={**payload, "email": f"missing-{payload['email']}"}).status_code==400
+
+# Test that a stored hash of another cost is rehashed with the configured cost on the next successful login.
+def test_password_hash_upgrade(client, db_engine, monkeypatch):
+    payload=user_payload()
+    assert client.post("/auth/register", json=payload).status_code==201
+    def stored_hash():
+        with Session(db_engine) as session:
+            return session.exec(select(User.password).where(User.email==payload["email"])).one()
+    assert stored_hash().startswith(f"$2b${Config.BCRYPT_ROUNDS:02d}$")
+    monkeypatch.setattr(security, "pwd_context", create_password_context(bcrypt_rounds=4))
+    assert client.post("/auth/login", json={**payload, "password": "wrong-password"}).status_code==401
+    assert stored_hash().startswith(f"$2b${Config.BCRYPT_ROUNDS:02d}$") # never rehashed without a verified password
+    assert client.post("/auth/login", json=payload).status_code==200
+    assert stored_hash().startswith("$2b$04$")
+    assert client.post("/auth/login", json=payload).status_code==200
+    if not argon2.has_backend():
+        with pytest.raises(RuntimeError):
+            create_password_context(scheme="argon2")
+    with pytest.raises(ValueError):
+        create_password_context(scheme="md5")
+
+# Test refreshing an access token using a refresh token, each refresh token being usable once.
 def test_refresh_token(client, login_and_get_tokens):
     tkns=login_and_get_tokens()
     refresh_tkn=tkns["refresh_token"]
     response=client.post("/auth/refresh", json={"refresh_token": refresh_tkn})
     assert response.status_code==200
+    rotated=response.json()["refresh_token"]
+    assert client.post("/auth/refresh", json={"refresh_token": refresh_tkn}).status_code==401 # rotated away
+    assert client.post("/auth/refresh", json={"refresh_token": rotated}).status_code==200
+    assert client.post("/auth/refresh", json={"refresh_token": "not-a-token"}).status_code==401
+
+# Test that refresh tokens matching no live row of their subject are rejected without being revoked or cached.
+def test_refresh_token_rejected(client, login_and_get_tokens):
+    previous=set_token_store(InMemoryTokenStore())
+    try:
+        refresh_tkn=login_and_get_tokens()["refresh_token"]
+        claims=jwt.get_unverified_claims(refresh_tkn)
+        def forge(**changes):
+            return jwt.encode({**claims, **changes}, Config.REFRESH_SECRET_KEY, Config.ALGORITHM)
+        assert client.post("/auth/refresh", json={"refresh_token": forge(sub=str(uuid4()))}).status_code==401 # another subject
+        assert client.post("/auth/refresh", json={"refresh_token": forge(token_id=str(uuid4()))}).status_code==401 # unknown id
+        assert client.post("/auth/refresh", json={"refresh_token": forge(sub="not-a-uuid")}).status_code==401
+        assert not get_token_store()._entries # nothing cached for ids matching no row
+        assert client.post("/auth/refresh", json={"refresh_token": refresh_tkn}).status_code==200 # not burned
+    finally:
+        set_token_store(previous)
+
+# Test that the purge deletes expired and revoked refresh tokens in batches and keeps live ones.
+def test_purge_refresh_tokens(client, get_registered_user, db_session):
+    user_id=UUID(get_registered_user()["id"])
+    now=datetime.now(timezone.utc)
+    tokens={name: str(uuid4()) for name in ("expired", "revoked", "live")}
+    add_refresh_token(tokens["expired"], now-timedelta(seconds=1), user_id, db_session)
+    add_refresh_token(tokens["revoked"], now+timedelta(days=1), user_id, db_session)
+    add_refresh_token(tokens["live"], now+timedelta(days=1), user_id, db_session)
+    db_session.commit()
+    assert revoke_refresh_token(tokens["revoked"], db_session)
+    assert rotate_refresh_token(tokens["revoked"], now+timedelta(days=1), user_id, str(uuid4()), now+timedelta(days=1), db_session) is None
+    assert purge_refresh_tokens(db_session, batch_size=1)>=2
+    remaining=set(db_session.exec(select(RefreshTokenModel.token_id).where(RefreshTokenModel.token_id.in_(tokens.values()))).all())
+    assert remaining=={tokens["live"]}
+
+# Test that access tokens carry the authorization claims and are revoked when the role changes.
+def test_access_token_claims_revocation(client, login_and_get_tokens):
+    tokens = login_and_get_tokens(UserRole.ADMIN)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    claims = jwt.get_unverified_claims(tokens["access_token"])
+    assert (claims["role"], claims["org"], claims["ver"]) == ("ADMIN", None, 0)
+    user = client.get("/users/me", headers=headers).json()
+    payload = user_payload(uname=user["user_name"], email=user["email"], role=UserRole.CANDIDATE)
+    assert client.put("/users/me", json=payload, headers=headers).status_code == 200
+    assert client.get("/users/me", headers=headers).status_code == 401 # token of the previous version
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    claims = jwt.get_unverified_claims(response.json()["access_token"])
+    assert (claims["role"], claims["ver"]) == ("CANDIDATE", 1) # refreshed from the user row
+
+# Test that read-only routes authorize from the token claims without loading the user.
+def test_stateless_token_claims(client, auth_headers, monkeypatch):
+    headers = auth_headers(UserRole.ADMIN)
+    assert client.delete("/users/me", headers=headers).status_code == 204
+    assert client.get("/users/", headers=headers).status_code == 200 # claims trusted until the token expires
+    assert client.get("/users/me", headers=headers).status_code == 401
+    monkeypatch.setattr(Config, "AUTH_TRUST_TOKEN_CLAIMS", False)
+    assert client.get("/users/", headers=headers).status_code == 401
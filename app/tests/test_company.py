@@ -62,10 +62,24 @@ def test_delete_company(client, auth_headers, get_created_company):
     response = client.get(f"/companies/{company_id}")
     assert response.status_code == 404
 
-# Test listing all companies.
-def test_list_companies(client):
+# Test listing companies page by page, with filters and sorting.
+def test_list_companies(client, auth_headers):
     response = client.get("/companies/")
     assert response.status_code == 200
     data = response.json()
-    assert isinstance(data, list)
-    assert len(data) >= 1
\ No newline at end of file
+    assert isinstance(data["items"], list)
+    assert data["total"] >= 1
+    headers = auth_headers(role=UserRole.RECRUITER)
+    domain = f"domain-{uuid4().hex}"
+    for size in (10, 30, 20):
+        payload = {"name": f"Company {uuid4().hex}", "domain": domain, "location": "Ahmedabad, India", "company_size": size}
+        assert client.post("/companies/", json=payload, headers=headers).status_code == 201
+    response = client.get(f"/companies/?domain={domain.upper()}&location=ahmedabad&order_by=company_size&order_type=desc&size=2")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert [company["company_size"] for company in data["items"]] == [30, 20]
+    response = client.get(f"/companies/?domain={domain}&order_by=company_size&order_type=desc&size=2&page=2")
+    assert [company["company_size"] for company in response.json()["items"]] == [10]
+    assert client.get("/companies/?size=1000").status_code == 422
+    assert client.get("/companies/?order_by=owner_id").status_code == 422
\ No newline at end of file
@@ -1,3 +1,10 @@
+import asyncio
+import json
+import pytest
+from fastapi import HTTPException
+from uuid import uuid4
+from app.core.bulk import iter_request_records
+from app.core.config import Config
 from app.core.enum import UserRole, ApplicationStatus, ModeOfWork, EmploymentType
 
 # Test job creation by a recruiter.
@@ -13,6 +20,39 @@ def test_get_job_by_id(client, auth_headers, get_created_job):
     response = client.get(f"/jobs/{job_id}", headers=headers)
     assert response.status_code==200
 
+# Test that applications are only embedded in job responses when include=applications is passed by an admin or a recruiter of the company.
+def test_job_include_applications(client, auth_headers, get_created_job, get_created_application):
+    job_id=get_created_application["job_id"]
+    response=client.get(f"/jobs/{job_id}")
+    assert response.status_code==200
+    assert response.json()["applications"]==[]
+    assert client.get(f"/jobs/{job_id}?include=applications").status_code==403 # anonymous
+    assert client.get(f"/jobs/{job_id}?include=applications", headers=auth_headers(UserRole.CANDIDATE)).status_code==403
+    assert client.get("/jobs/?include=applications").status_code==403
+    headers=auth_headers(role=UserRole.RECRUITER, current_organization=get_created_job["company_id"])
+    response=client.get(f"/jobs/{job_id}?include=applications", headers=headers)
+    assert response.status_code==200
+    applications=response.json()["applications"]
+    assert [application["id"] for application in applications]==[get_created_application["id"]]
+    assert "resume_path" not in applications[0] # response schema, not the table row
+    response=client.get("/jobs/?size=100&include=applications", headers=auth_headers(UserRole.ADMIN))
+    assert response.status_code==200
+    job=next(item for item in response.json()["items"] if item["id"]==job_id)
+    assert len(job["applications"])==1
+    response=client.get("/jobs/?size=100&include=applications", headers=auth_headers(UserRole.RECRUITER)) # recruiter of no company
+    assert all(item["applications"]==[] for item in response.json()["items"])
+    response=client.get(f"/jobs/{job_id}?include=everything")
+    assert response.status_code==422
+
+# Test that with AUTH_TRUST_TOKEN_CLAIMS off, public job reads authorize from the user row.
+def test_job_include_applications_stateful(client, auth_headers, get_created_job, get_created_application, monkeypatch):
+    headers=auth_headers(role=UserRole.RECRUITER, current_organization=get_created_job["company_id"])
+    monkeypatch.setattr(Config, "AUTH_TRUST_TOKEN_CLAIMS", False)
+    response=client.get(f"/jobs/{get_created_job['id']}?include=applications", headers=headers)
+    assert response.status_code==200
+    assert len(response.json()["applications"])==1
+    assert client.get("/jobs/?include=applications", headers={"Authorization": "Bearer invalid"}).status_code==401
+
 # Test job listing with pagination and filters.
 def test_list_jobs(client, auth_headers, get_created_jobs_list):
     headers=auth_headers(role=UserRole.CANDIDATE)
@@ -38,6 +78,119 @@ def test_list_jobs(client, auth_headers, get_created_jobs_list):
     for item in response_data["items"]:
         assert "ONSITE" in item["tags"]
 
+# Test that consecutive pages are disjoint and respect the requested size.
+def test_list_jobs_pages(client, get_created_jobs_list):
+    first=client.get("/jobs/?page=1&size=2")
+    second=client.get("/jobs/?page=2&size=2")
+    assert first.status_code==200 and second.status_code==200
+    first_ids={item["id"] for item in first.json()["items"]}
+    second_ids={item["id"] for item in second.json()["items"]}
+    assert len(first_ids)==2
+    assert first_ids.isdisjoint(second_ids)
+    assert first.json()["total"]==second.json()["total"]
+
+# Test keyset pagination walking forward and back with cursors in both orders.
+def test_list_jobs_cursor(client, get_created_jobs_list):
+    for order_type in ("desc", "asc"):
+        offset_ids=[item["id"] for item in client.get(f"/jobs/?size=100&order_type={order_type}").json()["items"]]
+        first=client.get(f"/jobs/?pagination=cursor&size=2&order_type={order_type}")
+        assert first.status_code==200
+        first_data=first.json()
+        assert first_data["previous_cursor"] is None
+        assert [item["id"] for item in first_data["items"]]==offset_ids[:2]
+        second=client.get(f"/jobs/?pagination=cursor&size=2&order_type={order_type}&cursor={first_data['next_cursor']}")
+        assert second.status_code==200
+        second_data=second.json()
+        assert [item["id"] for item in second_data["items"]]==offset_ids[2:4]
+        back=client.get(f"/jobs/?pagination=cursor&size=2&order_type={order_type}&cursor={second_data['previous_cursor']}")
+        assert [item["id"] for item in back.json()["items"]]==offset_ids[:2]
+    response=client.get("/jobs/?pagination=cursor&employment_type=FULL_TIME&tags=ONSITE")
+    assert response.status_code==200
+    assert all(item["employment_type"]=="FULL_TIME" for item in response.json()["items"])
+    response=client.get("/jobs/?pagination=cursor&cursor=not-a-cursor")
+    assert response.status_code==400
+
+# Test full-text search over title, description and tags, ordered by relevance.
+def test_search_jobs_relevance(client, auth_headers, get_created_company):
+    headers=auth_headers(role=UserRole.RECRUITER, current_organization=get_created_company["id"])
+    marker=uuid4().hex[:12]
+    in_title={"title": f"Kotlin {marker} Engineer", "description": "Mobile apps", "mode": ModeOfWork.REMOTE, "employment_type": EmploymentType.FULL_TIME, "tags": []}
+    in_tags={"title": "Android Engineer", "description": "Mobile apps", "mode": ModeOfWork.REMOTE, "employment_type": EmploymentType.FULL_TIME, "tags": [marker]}
+    for payload in (in_tags, in_title):
+        assert client.post("/jobs/", json=payload, headers=headers).status_code==201
+    response=client.get(f"/jobs/?search_query={marker}&order_by=relevance")
+    assert response.status_code==200
+    titles=[item["title"] for item in response.json()["items"]]
+    assert titles==[in_title["title"], in_tags["title"]]
+    response=client.get(f"/jobs/?search_query={marker[:6]} engineer")
+    assert response.json()["total"]==2
+
+# Test any-of / all-of tag matching and per-tag facet counts.
+def test_tag_filters_and_facets(client, auth_headers, get_created_company):
+    headers=auth_headers(role=UserRole.RECRUITER, current_organization=get_created_company["id"])
+    first, second=f"tag-{uuid4().hex}", f"tag-{uuid4().hex}"
+    for tags in ([first], [first, second], [second]):
+        payload={"title": "Tagged job", "mode": ModeOfWork.HYBRID, "employment_type": EmploymentType.PART_TIME, "tags": tags}
+        assert client.post("/jobs/", json=payload, headers=headers).status_code==201
+    response=client.get(f"/jobs/?tags={first}&tags={second}")
+    assert response.json()["total"]==1
+    response=client.get(f"/jobs/?tags={first}&tags={second}&tag_match=any")
+    assert response.json()["total"]==3
+    response=client.get(f"/jobs/tags?tags={first}&tags={second}&tag_match=any")
+    assert response.status_code==200
+    assert {facet["tag"]: facet["count"] for facet in response.json()}=={first: 2, second: 2}
+    response=client.get(f"/jobs/tags?tags={first}")
+    assert {facet["tag"]: facet["count"] for facet in response.json()}=={first: 2, second: 1}
+    assert client.get("/jobs/?tag_match=some").status_code==422
+
+# Test bulk job creation from a JSON array and from NDJSON, invalid rows reported per row.
+def test_create_jobs_bulk(client, auth_headers, get_created_company, monkeypatch):
+    from app.core.config import Config
+    monkeypatch.setattr(Config, "JOB_BULK_BATCH_SIZE", 2)
+    headers=auth_headers(role=UserRole.RECRUITER, current_organization=get_created_company["id"])
+    marker=f"bulk-{uuid4().hex}"
+    job={"title": "Bulk job", "mode": ModeOfWork.REMOTE, "employment_type": EmploymentType.INTERN, "tags": [marker]}
+    rows=[job, {"title": "No mode"}, job, job]
+    response=client.post("/jobs/bulk", json=rows, headers=headers)
+    assert response.status_code==200
+    data=response.json()
+    assert (data["created"], data["failed"])==(3, 1)
+    assert [result["status"] for result in data["results"]]==["created", "error", "created", "created"]
+    assert data["results"][1]["errors"]==["mode: Field required", "employment_type: Field required"]
+    ndjson="\n".join([json.dumps(job), "{not json", json.dumps(job), ""])
+    response=client.post("/jobs/bulk", content=ndjson, headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert response.status_code==200
+    assert [result["status"] for result in response.json()["results"]]==["created", "error", "created"]
+    assert client.get(f"/jobs/?tags={marker}").json()["total"]==5
+    monkeypatch.setattr(Config, "JOB_BULK_MAX_ROWS", 2)
+    too_large={**job, "tags": [f"{marker}-limit"]}
+    assert client.post("/jobs/bulk", json=[too_large]*3, headers=headers).status_code==413
+    assert client.get(f"/jobs/?tags={marker}-limit").json()["total"]==0 # rejected before any insert
+    response=client.post("/jobs/bulk", content="\n".join([json.dumps(too_large)]*3), headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert response.status_code==200
+    assert (response.json()["created"], response.json()["truncated"])==(2, True)
+    assert client.get(f"/jobs/?tags={marker}-limit").json()["total"]==2
+    monkeypatch.setattr(Config, "JOB_BULK_MAX_LINE_BYTES", 100)
+    assert client.post("/jobs/bulk", content=b"[" + b" " * 200, headers={**headers, "Content-Type": "application/x-ndjson"}).status_code==413 # no newline, never buffered whole
+    assert client.post("/jobs/bulk", json={"title": "not a list"}, headers=headers).status_code==400
+    assert client.post("/jobs/bulk", json=[job], headers=auth_headers(role=UserRole.CANDIDATE)).status_code==403
+
+# Test that NDJSON records split across chunks are reassembled, and that a line over the size limit is rejected while it streams in.
+def test_iter_request_records_chunks():
+    class ChunkedRequest:
+        headers={"content-type": "application/x-ndjson"}
+        def __init__(self, chunks):
+            self.chunks=chunks
+        async def stream(self):
+            for chunk in self.chunks:
+                yield chunk
+    async def collect(chunks, max_line_bytes):
+        return [record async for _, record in iter_request_records(ChunkedRequest(chunks), 10, max_line_bytes)]
+    assert asyncio.run(collect([b'{"a"', b': 1}\n{"b": 2', b'}\n\n', b'[3]'], 10))==[{"a": 1}, {"b": 2}, [3]]
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(collect([b'{"a": ', b'"' + b"x" * 10], 10))
+    assert error.value.status_code==413
+
 # Test updating an existing job.
 def test_update_job(client, auth_headers, job_payload, get_created_company, get_created_job):
     company_id=get_created_company["id"]
@@ -0,0 +1,42 @@
+"""
+Tests for the logging setup.
+
+Covers:
+- Structured (JSON) log lines with extra fields
+- Sampling of low severity records per module
+- Per-module levels and silent SQL logging by default
+"""
+
+import json
+import logging
+from app.core.config import Config
+from app.core.logger import JsonFormatter, SamplingFilter, configure_logging
+
+# Test that JSON lines carry the message and the extra fields.
+def test_json_formatter():
+    record = logging.LogRecord("app.auth.deps", logging.DEBUG, __file__, 1, "Access token accepted", None, None)
+    record.user_id = "abc"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Access token accepted"
+    assert entry["logger"] == "app.auth.deps"
+    assert entry["user_id"] == "abc"
+
+# Test that sampling drops low severity records of the matching module only, never warnings.
+def test_sampling_filter():
+    sampler = SamplingFilter({"app.api": 0.0, "app.api.job": 1.0})
+    make = lambda name, level: logging.LogRecord(name, level, __file__, 1, "msg", None, None)
+    assert not sampler.filter(make("app.api.application", logging.INFO))
+    assert sampler.filter(make("app.api.application", logging.WARNING))
+    assert sampler.filter(make("app.api.job", logging.DEBUG))
+    assert sampler.filter(make("app.auth.deps", logging.DEBUG))
+
+# Test that per-module levels are applied and SQL statements are not logged unless asked for.
+def test_configure_logging(monkeypatch):
+    monkeypatch.setattr(Config, "LOG_LEVELS", "app.auth=DEBUG")
+    configure_logging()
+    assert logging.getLogger("app.auth.deps").isEnabledFor(logging.DEBUG)
+    assert not logging.getLogger("app.core.security").isEnabledFor(logging.DEBUG)
+    assert not logging.getLogger("sqlalchemy.engine.Engine").isEnabledFor(logging.INFO)
+    monkeypatch.setattr(Config, "LOG_LEVELS", "")
+    configure_logging()
+    logging.getLogger("app.auth").setLevel(logging.NOTSET)
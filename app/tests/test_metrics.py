@@ -0,0 +1,139 @@
+"""
+Tests for runtime metrics.
+
+Covers:
+- Connection pool stats endpoint access
+- Checkout counting and timeouts of the timed queue pool
+- Lazy creation and pool options of the async engine
+- The TTL cache and the authenticated user cache
+- Admission control and latency stats of the password hashing pool, sync and awaited calls
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from fastapi import HTTPException
+from uuid import UUID
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import InvalidRequestError, TimeoutError as PoolTimeoutError
+from app.core.enum import UserRole
+from app.core.config import to_async_database_url
+from app.db.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool, async_pool_options, pool_stats
+from app.db.session import AsyncDatabaseSession
+from app.core.cache import TTLCache, user_cache
+from app.core.hashing import PasswordHashPool
+
+# Test that only admins can read the pool stats of both engines.
+def test_db_pool_stats(client, auth_headers):
+    response = client.get("/metrics/db-pool", headers=auth_headers(UserRole.ADMIN))
+    assert response.status_code == 200
+    stats = {pool["name"]: pool for pool in response.json()}
+    assert set(stats) == {"sync", "async"}
+    assert "checked_out" in stats["sync"] and "wait_time_avg_ms" in stats["async"]
+    response = client.get("/metrics/db-pool", headers=auth_headers(UserRole.CANDIDATE))
+    assert response.status_code == 403
+
+# Test that checkouts, overflow and pool exhaustion are reported.
+def test_timed_queue_pool(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.05)
+    first = engine.connect()
+    second = engine.connect()
+    first.execute(text("SELECT 1"))
+    stats = pool_stats("test", engine.pool)
+    assert stats["checked_out"] == 2
+    assert stats["overflow"] == 1
+    assert stats["max_overflow"] == 1
+    assert stats["checkouts"] == 2
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    assert pool_stats("test", engine.pool)["timeouts"] == 1
+    first.close()
+    second.close()
+    assert pool_stats("test", engine.pool)["checked_out"] == 0
+    engine.dispose()
+    assert pool_stats("test", engine.pool)["max_overflow"] == 1 # kept by the recreated pool
+
+# Test that the async engine is only created on first use, with the timed pool only for asyncio drivers.
+def test_async_engine_options():
+    assert async_pool_options("postgresql+asyncpg://user@localhost/db")["poolclass"] is TimedAsyncAdaptedQueuePool
+    assert async_pool_options("postgresql+psycopg2://user@localhost/db") == {}
+    assert to_async_database_url("postgresql+psycopg2://user@localhost/db") == "postgresql+asyncpg://user@localhost/db"
+    assert to_async_database_url("sqlite:///jobs.db") == "sqlite+aiosqlite:///jobs.db"
+    manager = AsyncDatabaseSession("postgresql+psycopg2://user@localhost/db", **async_pool_options("postgresql+psycopg2://user@localhost/db"))
+    assert manager._engine is None # nothing built at import
+    with pytest.raises(InvalidRequestError):
+        manager.engine
+
+# Test LRU eviction, TTL expiry and hit/miss counting of the TTL cache.
+def test_ttl_cache(monkeypatch):
+    cache = TTLCache("test", max_size=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1 # "a" becomes most recently used
+    cache.set("c", 3) # evicts "b"
+    assert cache.get("b") is None
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None # expired
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 2, 1, 1)
+
+# Test that the user cache serves repeated requests and is invalidated when the user changes.
+def test_user_cache(client, auth_headers):
+    headers = auth_headers(UserRole.ADMIN)
+    user = client.get("/users/me", headers=headers).json()
+    hits = user_cache.stats()["hits"]
+    assert user_cache.get(UUID(user["id"])).role == UserRole.ADMIN
+    stats = {cache["name"]: cache for cache in client.get("/metrics/caches", headers=headers).json()}
+    assert stats["users"]["hits"] > hits
+    response = client.put("/users/me", json={"user_name": user["user_name"], "email": user["email"], "password": "password", "role": UserRole.CANDIDATE}, headers=headers)
+    assert response.status_code == 200
+    assert client.get("/metrics/caches", headers=headers).status_code == 401 # refreshed snapshot revokes the old admin token in this worker
+
+# Test that the hashing pool rejects calls beyond its workers and queue with 503, and records latencies.
+def test_password_hash_pool(client, auth_headers):
+    pool = PasswordHashPool(workers=1, queue_size=1)
+    release = threading.Event()
+    try:
+        running = threading.Thread(target=pool.run, args=(release.wait,))
+        queued = threading.Thread(target=pool.run, args=(lambda: "queued",))
+        running.start()
+        queued.start()
+        while pool.stats()["pending"] < 2:
+            time.sleep(0.01)
+        with pytest.raises(HTTPException) as error:
+            pool.run(lambda: "rejected")
+        assert error.value.status_code == 503
+        assert error.value.headers["Retry-After"]
+        release.set()
+        running.join()
+        queued.join()
+        assert pool.run(lambda: "done") == "done"
+        stats = pool.stats()
+        assert (stats["completed"], stats["rejected"], stats["pending"]) == (3, 1, 0)
+        assert stats["latency_max_ms"] >= stats["latency_p95_ms"] >= stats["latency_p50_ms"] > 0
+    finally:
+        release.set()
+        pool.shutdown()
+    headers = auth_headers(UserRole.ADMIN) # registration and login hash through the shared pool
+    response = client.get("/metrics/password-hashing", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["completed"] >= 2
+    assert client.get("/metrics/password-hashing", headers=auth_headers(UserRole.CANDIDATE)).status_code == 403
+
+# Test that awaited hashing calls wait for the pool without holding a thread, and are admitted like sync calls.
+def test_password_hash_pool_async():
+    pool = PasswordHashPool(workers=1, queue_size=1)
+    threads = threading.active_count()
+    async def burst():
+        return await asyncio.gather(*(pool.run_async(time.sleep, 0.05) for _ in range(3)), return_exceptions=True)
+    try:
+        results = asyncio.run(burst())
+        assert [isinstance(result, HTTPException) for result in results] == [False, False, True]
+        assert threading.active_count() == threads + 1 # the single worker, waiters hold no thread
+        stats = pool.stats()
+        assert (stats["completed"], stats["rejected"], stats["pending"]) == (2, 1, 0)
+        assert stats["queue_wait_avg_ms"] > 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,37 @@
+"""
+Tests for the pure Python job search fallback.
+
+Covers:
+- Tokenizing and prefix matching of search terms
+- Relevance weights of title, description and tags
+- The rank function registered on SQLite connections
+"""
+
+import json
+from sqlalchemy import create_engine, text
+from app.core.search import build_tsquery, rank_job
+
+# Test that every term must match (as a word prefix) for a job to rank above zero.
+def test_rank_job_matching():
+    assert rank_job("inter", "SDE-Intern", None, []) > 0
+    assert rank_job("python intern", "SDE-Intern", "Backend work", ["Python"]) > 0
+    assert rank_job("python golang", "SDE-Intern", "Backend work", ["Python"]) == 0
+    assert rank_job("!!!", "SDE-Intern", None, []) == 0
+    assert build_tsquery("Python, inter") == "python:* & inter:*"
+    assert build_tsquery("!!!") is None
+
+# Test that a title match outranks a description match, which outranks a tag match.
+def test_rank_job_weights():
+    title_rank = rank_job("kotlin", "Kotlin developer", None, [])
+    description_rank = rank_job("kotlin", "Developer", "We use Kotlin", [])
+    tags_rank = rank_job("kotlin", "Developer", None, json.dumps(["Kotlin"]))
+    assert title_rank > description_rank > tags_rank > 0
+
+# Test ranking and filtering inside a SQLite query through the registered rank function.
+def test_sqlite_rank_function():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE job (title TEXT, description TEXT, tags TEXT)"))
+        conn.execute(text("INSERT INTO job VALUES ('Developer', 'Kotlin services', '[]'), ('Kotlin developer', NULL, '[]'), ('Designer', NULL, '[]')"))
+        rows = conn.execute(text("SELECT title FROM job WHERE job_search_rank(:q, title, description, tags) > 0 ORDER BY job_search_rank(:q, title, description, tags) DESC"), {"q": "kotlin"}).all()
+    assert [row.title for row in rows] == ["Kotlin developer", "Developer"]
@@ -0,0 +1,151 @@
+"""
+Tests for the resume storage backends.
+
+Covers:
+- Content-addressed storage and deduplication on every backend
+- Multipart uploads and batch deletes of the S3 backend, against an in-process S3 stand-in
+- Resume uploads and ranged downloads through the API with a non-local backend
+"""
+
+import io
+import hashlib
+from datetime import datetime, timezone
+import pytest
+from app.core.enum import UserRole
+from app.core.storage import InMemoryStorage, LocalStorage, S3Storage, StorageBackend, set_storage
+
+class FakeS3Error(Exception):
+    # mimics botocore's ClientError
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+class FakeS3Client:
+    # in-process stand-in of the S3 API calls used by S3Storage
+    def __init__(self):
+        self.objects: dict[tuple[str, str], tuple[bytes, datetime]] = {}
+        self.uploads: dict[str, list[bytes]] = {}
+        self.calls: list[str] = []
+        self.denied: set[str] = set() # keys whose deletion fails
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append("put_object")
+        self.objects[(Bucket, Key)] = (Body, datetime.now(timezone.utc))
+
+    def create_multipart_upload(self, Bucket, Key):
+        self.calls.append("create_multipart_upload")
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = []
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append("upload_part")
+        self.uploads[UploadId].append(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append("complete_multipart_upload")
+        assert [part["PartNumber"] for part in MultipartUpload["Parts"]] == list(range(1, len(self.uploads[UploadId]) + 1))
+        self.objects[(Bucket, Key)] = (b"".join(self.uploads.pop(UploadId)), datetime.now(timezone.utc))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error("404")
+        return {"ContentLength": len(self.objects[(Bucket, Key)][0])}
+
+    def get_object(self, Bucket, Key, Range=None):
+        content = self.objects[(Bucket, Key)][0]
+        if Range: # "bytes=start-end", end inclusive
+            start, end = (int(bound) for bound in Range.removeprefix("bytes=").split("-"))
+            content = content[start:end + 1]
+        return {"Body": io.BytesIO(content)}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def delete_objects(self, Bucket, Delete):
+        errors = [{"Key": entry["Key"], "Code": "AccessDenied", "Message": "Access Denied"} for entry in Delete["Objects"] if entry["Key"] in self.denied]
+        for entry in Delete["Objects"]:
+            if entry["Key"] not in self.denied:
+                self.objects.pop((Bucket, entry["Key"]), None)
+        return {"Errors": errors} if errors else {}
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective):
+        self.calls.append("copy_object")
+        content, _ = self.objects[(CopySource["Bucket"], CopySource["Key"])]
+        self.objects[(Bucket, Key)] = (content, datetime.now(timezone.utc))
+
+    def get_paginator(self, operation):
+        client = self
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                yield {"Contents": [{"Key": key, "LastModified": modified} for (bucket, key), (_, modified) in client.objects.items() if bucket == Bucket and key.startswith(Prefix)]}
+        return Paginator()
+
+# Test that every backend stores identical content once under its SHA-256 key.
+@pytest.mark.parametrize("backend", ["local", "memory", "s3"])
+def test_store_content_addressed(backend, tmp_path):
+    storage = {"local": lambda: LocalStorage(str(tmp_path)), "memory": InMemoryStorage, "s3": lambda: S3Storage("bucket", prefix="resumes", client=FakeS3Client())}[backend]()
+    digest = hashlib.sha256(b"resume").hexdigest()
+    first = storage.store_content_addressed(io.BytesIO(b"resume"), "blobs", max_bytes=100, chunk_size=4)
+    second = storage.store_content_addressed(io.BytesIO(b"resume"), "blobs", max_bytes=100, chunk_size=4)
+    assert first.path == second.path == f"blobs/{digest[:2]}/{digest}"
+    assert (first.deduplicated, second.deduplicated) == (False, True)
+    assert [key for key, _ in storage.list("blobs/")] == [first.path]
+    with storage.open(first.path) as stored:
+        assert stored.read() == b"resume"
+    assert storage.size(first.path) == 6
+    assert b"".join(storage.iter_range(first.path, 2, 5, chunk_size=2)) == b"sum"
+    assert storage.delete_many([first.path]) == 1
+    assert not storage.exists(first.path)
+
+# Test that a backend missing part of the interface cannot be built.
+def test_storage_interface():
+    class ReadOnlyStorage(StorageBackend):
+        def exists(self, key):
+            return False
+    with pytest.raises(TypeError):
+        ReadOnlyStorage()
+
+# Test that large files are sent as a multipart upload with bounded parts.
+def test_s3_multipart_upload():
+    client = FakeS3Client()
+    storage = S3Storage("bucket", client=client, multipart_chunk_size=5 * 1024 * 1024)
+    content = b"x" * (11 * 1024 * 1024)
+    storage.put("blobs/large", io.BytesIO(content), len(content))
+    assert client.calls.count("upload_part") == 3
+    assert "put_object" not in client.calls
+    assert storage.open("blobs/large").read() == content
+
+# Test that S3 batch deletes count only the objects the response does not report as failed.
+def test_s3_delete_many():
+    client = FakeS3Client()
+    storage = S3Storage(bucket="resumes", prefix="jobboard", client=client)
+    for key in ("blobs/a", "blobs/b", "blobs/c"):
+        storage.put(key, io.BytesIO(b"resume"), 6)
+    client.denied.add("jobboard/blobs/b")
+    assert storage.delete_many(["blobs/a", "blobs/b", "blobs/c"]) == 2
+    assert [storage.exists(key) for key in ("blobs/a", "blobs/b", "blobs/c")] == [False, True, False]
+
+# Test that the apply flow stores resumes through the configured backend.
+def test_apply_with_memory_storage(client, auth_headers, application_payload, get_created_job):
+    storage = InMemoryStorage()
+    previous = set_storage(storage)
+    try:
+        headers = auth_headers(UserRole.CANDIDATE)
+        response = client.post(f"/applications/jobs/{get_created_job['id']}/apply", headers=headers, data=application_payload, files={"resume": ("resume.pdf", b"memory resume", "application/pdf")})
+        assert response.status_code == 201
+        digest = hashlib.sha256(b"memory resume").hexdigest()
+        assert storage.files[f"blobs/{digest[:2]}/{digest}"][0] == b"memory resume"
+        url = f"/applications/{response.json()['id']}/resume"
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200 and response.content == b"memory resume"
+        response = client.get(url, headers={**headers, "Range": "bytes=-6"})
+        assert response.status_code == 206 and response.content == b"resume"
+        assert response.headers["content-range"] == "bytes 7-12/13"
+        assert client.get(url, headers={**headers, "Range": "bytes=20-"}).status_code == 416
+    finally:
+        set_storage(previous)
@@ -0,0 +1,111 @@
+"""
+Tests for the refresh token revocation cache.
+
+Covers:
+- Revocation and expiry on every backend
+- A Redis-protocol store shared by two replicas, against an in-process Redis stand-in
+- Refreshes of revoked tokens rejected without touching the database
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event
+from app.core.token_store import InMemoryTokenStore, RedisTokenStore, TokenStore, set_token_store
+
+class FakeRedisClient:
+    # in-process stand-in of the redis-py calls used by RedisTokenStore
+    def __init__(self):
+        self.values: dict[str, tuple[bytes, float]] = {}
+        self.calls: list[str] = []
+
+    def set(self, key, value, ex=None):
+        self.calls.append("set")
+        self.values[key] = (value.encode(), time.time() + ex if ex else float("inf"))
+        return True
+
+    def get(self, key):
+        self.calls.append("get")
+        value, expires_at = self.values.get(key, (None, 0))
+        return value if expires_at > time.time() else None
+
+    def pipeline(self, transaction=False):
+        client = self
+        class Pipeline:
+            def __init__(self):
+                self.commands = []
+            def set(self, key, value, ex=None):
+                self.commands.append((key, value, ex))
+            def execute(self):
+                client.calls.append("pipeline")
+                return [client.set(*command) for command in self.commands]
+        return Pipeline()
+
+class BrokenRedisClient:
+    # every call fails, as with an unreachable server
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("redis unreachable")
+        return fail
+
+# Test that every backend records revoked tokens until they expire.
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_token_store(backend):
+    store = InMemoryTokenStore() if backend == "memory" else RedisTokenStore(client=FakeRedisClient())
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    store.revoke("first", expires_at)
+    assert store.is_revoked("first")
+    assert not store.is_revoked("unknown")
+    store.revoke_many([("second", expires_at), ("third", expires_at)])
+    assert store.is_revoked("second") and store.is_revoked("third")
+    store.revoke("expired", datetime.now(timezone.utc) - timedelta(seconds=1))
+    time.sleep(1.1) # expired entries get the minimum TTL of one second
+    assert not store.is_revoked("expired")
+
+# Test that a backend missing part of the interface cannot be built.
+def test_token_store_interface():
+    class RevokeOnly(TokenStore):
+        def revoke(self, token_id, expires_at):
+            pass
+    with pytest.raises(TypeError):
+        RevokeOnly()
+
+# Test that a revocation through the API reaches another replica sharing the Redis server, and that refreshes of
+# revoked tokens are rejected before any database statement.
+def test_shared_revocation(client, login_and_get_tokens, db_engine):
+    redis = FakeRedisClient()
+    previous = set_token_store(RedisTokenStore(client=redis, prefix="test"))
+    try:
+        tokens = login_and_get_tokens()
+        assert redis.calls == [] # issuing tokens writes nothing to the cache
+        refresh_token = tokens["refresh_token"]
+        assert client.post("/auth/logout", json={"refresh_token": refresh_token}).status_code == 204
+        other_replica = RedisTokenStore(client=redis, prefix="test")
+        token_id = next(key for key, (value, _) in redis.values.items() if value == b"revoked").rsplit(":", 1)[-1]
+        assert other_replica.is_revoked(token_id)
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(db_engine, "before_cursor_execute", record)
+        try:
+            assert client.post("/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
+        finally:
+            event.remove(db_engine, "before_cursor_execute", record)
+        assert statements == []
+        tokens = login_and_get_tokens()
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 200
+        assert redis.calls[-2:] == ["get", "set"] # revocation check, then the rotated token revoked after the commit
+    finally:
+        set_token_store(previous)
+
+# Test that an unreachable Redis server degrades to the database instead of failing refreshes.
+def test_token_store_unreachable(client, login_and_get_tokens):
+    previous = set_token_store(RedisTokenStore(client=BrokenRedisClient()))
+    try:
+        tokens = login_and_get_tokens()
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 200
+        assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    finally:
+        set_token_store(previous)
@@ -19,6 +19,13 @@ def test_list_users(client, auth_headers):
     headers = auth_headers(UserRole.ADMIN)
     response = client.get("/users/", headers=headers)
     assert response.status_code == 200
+    assert len(response.json()["items"]) <= 50 # default page size
+    response = client.get("/users/?role=ADMIN&order_by=email&order_type=asc&size=100", headers=headers)
+    assert response.status_code == 200
+    emails = [user["email"] for user in response.json()["items"]]
+    assert emails == sorted(emails)
+    assert {user["role"] for user in response.json()["items"]} == {"ADMIN"}
+    assert client.get("/users/?size=101", headers=headers).status_code == 422
     headers = auth_headers(UserRole.CANDIDATE)
     response = client.get("/users/", headers=headers)
     assert response.status_code == 403
@@ -0,0 +1,65 @@
+"""
+Benchmark of the password hashing settings.
+
+For every setting (bcrypt costs, and argon2id parameters when argon2-cffi is
+installed), hashes passwords on one thread for a fixed duration and prints the
+hashes per second per core and the time per hash. With --threads N the same
+setting is also measured on N threads, showing how the password hashing pool
+(PASSWORD_HASH_WORKERS) scales on this machine. Logins per second and core are
+bounded by the hashes per second per core of the configured setting.
+
+No database is needed.
+
+Usage:
+    python -m benchmarks.bench_hashing --bcrypt-rounds 10 11 12 13 --argon2 2:19456:1 3:65536:1 --threads 4
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.hash import argon2
+from app.core.security import create_password_context
+
+# hashes per second of a context on `threads` threads, over `duration` seconds
+def measure(context, threads: int, duration: float) -> float:
+    def worker() -> int:
+        count = 0
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            context.hash("bench-password")
+            count += 1
+        return count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total = sum(executor.map(lambda _: worker(), range(threads)))
+    return total / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bcrypt-rounds", type=int, nargs="*", default=[10, 11, 12, 13], help="bcrypt costs measured")
+    parser.add_argument("--argon2", nargs="*", default=["2:19456:1", "3:65536:1"], help="argon2id settings measured, as time_cost:memory_cost_kib:parallelism")
+    parser.add_argument("--threads", type=int, default=1, help="also measure every setting on this many threads")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per measurement")
+    args = parser.parse_args()
+    settings = [(f"bcrypt rounds={rounds}", create_password_context("bcrypt", bcrypt_rounds=rounds)) for rounds in args.bcrypt_rounds]
+    if args.argon2 and not argon2.has_backend():
+        print("argon2-cffi is not installed, argon2 settings skipped")
+    elif args.argon2:
+        for setting in args.argon2:
+            time_cost, memory_cost, parallelism = (int(value) for value in setting.split(":"))
+            context = create_password_context("argon2", argon2_time_cost=time_cost, argon2_memory_cost=memory_cost, argon2_parallelism=parallelism)
+            settings.append((f"argon2id t={time_cost} m={memory_cost}KiB p={parallelism}", context))
+    header = f"{'setting':<40}{'hashes/s/core':>15}{'ms/hash':>10}"
+    if args.threads > 1:
+        header += f"{f'hashes/s x{args.threads}':>18}"
+    print(header)
+    for label, context in settings:
+        context.hash("warm-up")
+        per_core = measure(context, 1, args.duration)
+        line = f"{label:<40}{per_core:>15.1f}{1000 / per_core:>10.1f}"
+        if args.threads > 1:
+            line += f"{measure(context, args.threads, args.duration):>18.1f}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
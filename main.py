@@ -3,26 +3,68 @@ Main entry point for the Job Board FastAPI application.
 
 """
 
+import asyncio
+from sqlmodel import Session
+from app.core.config import Config
+from app.core.logger import configure_logging
+from app.core.resume_store import run_resume_sweeper
+from app.core.hashing import password_hash_pool
+from app.crud.refresh_token import run_refresh_token_purger
+from app.db.session import db_session_manager
 from app.db.init_db import init_db
 from app.api.user import router as user_router
 from app.api.company import router as company_router
 from app.api.job import router as job_router
 from app.api.application import router as application_router
+from app.api.metrics import router as metrics_router
 from app.auth.routes import auth_router  
+from app.core.upload import UploadSizeLimitMiddleware
 from fastapi import FastAPI
 from fastapi_pagination import add_pagination
 
+configure_logging() # Levels, sampling and format from Config, before anything logs
+
 app = FastAPI() # Initializes the FastAPI app
 
 @app.on_event("startup") # Application startup hook.
 def on_startup():
     init_db() # Establish database connections on startup
 
+@app.on_event("startup") # Background sweep of resume blobs no application references anymore
+async def start_resume_sweeper():
+    if Config.RESUME_SWEEP_INTERVAL > 0:
+        app.state.resume_sweeper = asyncio.create_task(run_resume_sweeper(lambda: Session(db_session_manager.engine)))
+
+@app.on_event("shutdown")
+async def stop_resume_sweeper():
+    sweeper = getattr(app.state, "resume_sweeper", None)
+    if sweeper:
+        sweeper.cancel()
+
+@app.on_event("startup") # Background purge of expired and revoked refresh tokens
+async def start_refresh_token_purger():
+    if Config.REFRESH_TOKEN_PURGE_INTERVAL > 0:
+        app.state.refresh_token_purger = asyncio.create_task(run_refresh_token_purger(lambda: Session(db_session_manager.engine)))
+
+@app.on_event("shutdown")
+async def stop_refresh_token_purger():
+    purger = getattr(app.state, "refresh_token_purger", None)
+    if purger:
+        purger.cancel()
+
+@app.on_event("shutdown") # Stop the password hashing workers
+def stop_password_hash_pool():
+    password_hash_pool.shutdown()
+
+# Reject oversized resume uploads before their body is read
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Registering all API routers
 app.include_router(user_router)
 app.include_router(company_router)
 app.include_router(job_router)
 app.include_router(application_router)
+app.include_router(metrics_router)
 app.include_router(auth_router)
 
 # Enable pagination globally for supported endpoints